@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ErpConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'erp'
+
+    def ready(self):
+        from . import signals # noqa: F401 (connects the signal receivers)
+        from .services import shared_cache # noqa: F401 (registers the cache system check)
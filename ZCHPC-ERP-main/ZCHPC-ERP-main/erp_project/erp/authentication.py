@@ -0,0 +1,134 @@
+"""
+Token authentication with an in-process token -> user cache.
+
+DRF's TokenAuthentication runs a Token JOIN user query on every request. Here
+lookups are kept in a bounded LRU with a TTL. Revocation (token deleted, user
+saved, i.e. deactivated or password changed) evicts the local entries and
+leaves a short-lived marker in the Django cache, so other workers drop their
+copies on the next request rather than waiting for the TTL.
+
+The marker is read on every request, so the LRU only saves anything when the
+cache is shared and in memory. Database queries per authenticated request:
+    Redis / Memcached     0 on an LRU hit (plus one cache GET), 1 on a miss
+    DatabaseCache         1: the LRU is not used, the marker read would be a query too
+    LocMemCache / Dummy   1: the LRU is not used, markers would not reach other workers
+`manage.py check --deploy` reports erp.E002 in the last two cases. Each
+request gets its own copy of the cached user and token, never the shared
+instances.
+
+Settings:
+    TOKEN_AUTH_CACHE_SIZE  max cached tokens per process (default 10000)
+    TOKEN_AUTH_CACHE_TTL   seconds an entry may be reused (default 300)
+    TOKEN_EXPIRY_SECONDS   optional token lifetime from Token.created (default None)
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .services import shared_cache
+
+REVOKED_KEY = 'auth_token_revoked:%s'
+
+
+class TokenCache:
+    """Thread-safe LRU of key -> (user, token, cached_at) with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, token, cached_at, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user, token, cached_at
+
+    def set(self, key, user, token, cached_at):
+        with self._lock:
+            self._entries[key] = (user, token, cached_at, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_user(self, user_id):
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[0].pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 300),
+)
+
+
+def revoke_user_tokens(user_id):
+    """Forgets every cached token of a user, in this process and (via the cache) in others."""
+    token_cache.evict_user(user_id)
+    cache.set(REVOKED_KEY % user_id, time.time(), token_cache.ttl + 1)
+
+
+def token_expired(token):
+    lifetime = getattr(settings, 'TOKEN_EXPIRY_SECONDS', None)
+    return lifetime is not None and token.created < timezone.now() - timedelta(seconds=lifetime)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        if not shared_cache.is_shared_in_memory():
+            # Markers would not reach other workers, or checking one would cost a query: read the token
+            user, token = super().authenticate_credentials(key)
+            return self.check_expiry(key, user, token)
+
+        entry = token_cache.get(key)
+        if entry is not None:
+            user, token, cached_at = entry
+            revoked_at = cache.get(REVOKED_KEY % user.pk)
+            if revoked_at is not None and revoked_at >= cached_at:
+                token_cache.evict(key)
+                entry = None
+
+        if entry is None:
+            # Timestamp before the query so a revocation racing with it still wins
+            cached_at = time.time()
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token, cached_at)
+
+        # Concurrent requests must not share (and mutate) one user instance
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return self.check_expiry(key, user, token)
+
+    def check_expiry(self, key, user, token):
+        if token_expired(token):
+            token_cache.evict(key)
+            token.delete() # Lets obtain_auth_token issue a fresh one on next login
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        return (user, token)
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+from ...services import leave_accrual
+
+
+class Command(BaseCommand):
+    help = 'Accrues monthly leave (and expires carry-over above the cap at the start of the leave year). Safe to re-run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='Month to accrue, YYYY-MM (default: current month).')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be accrued without writing anything.')
+
+    def handle(self, *args, **options):
+        if options['period']:
+            try:
+                period = datetime.strptime(options['period'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('period must be YYYY-MM')
+        else:
+            period = now().date().replace(day=1)
+
+        result = leave_accrual.accrue(period, dry_run=options['dry_run'])
+
+        prefix = '[dry run] ' if result['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result['period']:%Y-%m}: {result['accrued_days']} day(s) accrued for {result['employees']} employee(s), "
+            f"{result['expired_days']} day(s) expired for {result['expired_employees']}"
+        ))
+        if not result['employees']:
+            self.stdout.write('Nothing to accrue, the month is already done for every eligible employee.')
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from ...services import payroll_archive
+
+
+class Command(BaseCommand):
+    help = 'Moves closed payroll periods older than PAYROLL_ARCHIVE_AFTER_MONTHS into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Archive closed periods older than this many months (default from settings).')
+        parser.add_argument('--period', help='Archive just this closed period (YYYY-MM), regardless of age.')
+        parser.add_argument('--restore', metavar='YYYY-MM', help='Move an archived period back into the live table.')
+        parser.add_argument('--dry-run', action='store_true', help='List the periods that would be archived.')
+
+    def _month(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f'Invalid period {value!r}, use YYYY-MM')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            period = self._month(options['restore'])
+            restored = payroll_archive.restore_period(period)
+            self.stdout.write(self.style.SUCCESS(f'{period:%Y-%m}: {restored} record(s) restored to the live table'))
+            return
+
+        try:
+            if options['period']:
+                period = self._month(options['period'])
+                if options['dry_run']:
+                    self.stdout.write(f'{period:%Y-%m} would be archived')
+                    return
+                moved = {period: payroll_archive.archive_period(period)}
+            else:
+                moved = payroll_archive.archive(options['months'], dry_run=options['dry_run'])
+        except payroll_archive.ArchiveError as e:
+            raise CommandError(str(e))
+
+        verb = 'would move' if options['dry_run'] else 'moved'
+        for period, records in moved.items():
+            self.stdout.write(f'{period:%Y-%m}: {verb} {records} record(s)')
+        self.stdout.write(self.style.SUCCESS(f'{len(moved)} period(s) {"eligible" if options["dry_run"] else "archived"}'))
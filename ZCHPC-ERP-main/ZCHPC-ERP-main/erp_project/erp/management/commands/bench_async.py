@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Max
+from django.test import RequestFactory
+
+from ...models import Payroll
+
+# name -> (sync endpoint served over WSGI, async endpoint served over ASGI)
+ENDPOINTS = {
+    'payroll': ('/payroll/records/', '/async/payroll/records/'),
+    'employees': ('/all/employees/', '/async/employees/'),
+    'tax-brackets': ('/tax-brackets/', '/async/reference/tax-brackets/'),
+    'zig-rates': ('/zig-rates/', '/async/reference/zig-rates/'),
+    'jobs': ('/jobs/', '/async/jobs/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires concurrent requests at the sync endpoints through the WSGI handler and at their '
+        'async versions through the ASGI handler, in process, and compares throughput and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=list(ENDPOINTS),
+                            help='Endpoint to measure (repeatable). Defaults to all of them.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and handler.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight on the ASGI event loop.')
+        parser.add_argument('--wsgi-threads', type=int, default=1,
+                            help='Threads of the WSGI worker (1 = a sync worker, one request at a time).')
+        parser.add_argument('--db-latency', type=float, default=0.0,
+                            help='Milliseconds added to every query, to mimic a database across the network.')
+
+    def handle(self, *args, **options):
+        if options['db_latency']:
+            self.add_query_latency(options['db_latency'] / 1000)
+
+        # Payroll records for one period, as the dashboard asks for them
+        latest = Payroll.objects.aggregate(period=Max('period'))['period']
+        names = options['endpoints'] or list(ENDPOINTS)
+
+        self.stdout.write(
+            f"{'endpoint':<14}{'handler':<9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+        )
+        for name in names:
+            sync_path, async_path = ENDPOINTS[name]
+            if name == 'payroll' and latest:
+                query = f'?period={latest:%Y-%m}'
+                sync_path, async_path = sync_path + query, async_path + query
+
+            # Views print debug lines; keep them out of the table
+            with contextlib.redirect_stdout(io.StringIO()):
+                wsgi = self.run_wsgi(sync_path, options['requests'], options['wsgi_threads'])
+                asgi = asyncio.run(self.run_asgi(async_path, options['requests'], options['concurrency']))
+
+            for handler, (results, seconds) in (('wsgi', wsgi), ('asgi', asgi)):
+                latencies = sorted(elapsed for elapsed, _ in results)
+                errors = sum(1 for _, status in results if status >= 400)
+                self.stdout.write(
+                    f"{name:<14}{handler:<9}{len(results) / seconds:>10.1f}"
+                    f"{statistics.median(latencies) * 1000:>10.2f}"
+                    f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>10.2f}{errors:>8}"
+                )
+
+    def add_query_latency(self, seconds):
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            # First, not last: connection.execute_wrapper() (PerformanceMiddleware) pops the last entry
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.insert(0, delay)
+
+        # Every thread has its own connection, so hook each one as it opens
+        connection_created.connect(install, weak=False)
+        install(None, connection)
+
+    def run_wsgi(self, path, requests, threads):
+        handler = WSGIHandler()
+        factory = RequestFactory(SERVER_NAME='localhost')
+
+        def call(_):
+            environ = factory.get(path).environ
+            statuses = []
+            started = time.perf_counter()
+            body = handler(environ, lambda status, headers: statuses.append(status))
+            b''.join(body)
+            body.close()
+            return time.perf_counter() - started, int(statuses[0].split()[0])
+
+        call(None) # Warm-up: imports and first-request setup are not measured
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(call, range(requests)))
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, path, requests, concurrency):
+        handler = ASGIHandler()
+        url = urlsplit(path)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'root_path': '',
+            'path': url.path, 'raw_path': url.path.encode(), 'query_string': url.query.encode(),
+            'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        gate = asyncio.Semaphore(concurrency)
+
+        async def call():
+            statuses = []
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait() # The client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with gate:
+                started = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                return time.perf_counter() - started, statuses[0]
+
+        await call()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(requests)))
+        return results, time.perf_counter() - started
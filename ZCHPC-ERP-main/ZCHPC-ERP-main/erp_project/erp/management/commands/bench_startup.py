@@ -0,0 +1,98 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so imports are measured cold each time
+PROBE = r'''
+import json, os, sys, time
+started = time.perf_counter()
+from erp_project.wsgi import application
+ready = time.perf_counter()
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory, override_settings
+
+factory = RequestFactory(SERVER_NAME='localhost')
+
+statuses = set()
+
+def call(handler):
+    environ = factory.get(sys.argv[1]).environ
+    t = time.perf_counter()
+    body = handler(environ, lambda status, headers: statuses.add(int(status.split()[0])))
+    b''.join(body)
+    if hasattr(body, 'close'):
+        body.close()
+    return time.perf_counter() - t
+
+first = call(application)
+requests = int(sys.argv[2])
+full = [call(application) for _ in range(requests)]
+with override_settings(MIDDLEWARE=[]):
+    bare_handler = WSGIHandler()
+bare = [call(bare_handler) for _ in range(requests)]
+full.sort(); bare.sort()
+print(json.dumps({
+    'startup': ready - started,
+    'first_request': first,
+    'request_full': full[len(full) // 2],
+    'request_bare': bare[len(bare) // 2],
+    'statuses': sorted(statuses),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measures cold start, first request and middleware overhead for one or more settings modules.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--settings-module', action='append', dest='modules',
+            help='Settings module to measure (repeatable). Defaults to erp_project.settings and erp_project.settings_production.',
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per settings module.')
+        parser.add_argument('--requests', type=int, default=200, help='Warm requests per process.')
+        parser.add_argument(
+            '--path', default='/tax-brackets/',
+            help='URL requested by the probe. Pick a public endpoint that answers 200, so the whole stack runs.',
+        )
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or ['erp_project.settings', 'erp_project.settings_production']
+        results = {}
+        for module in modules:
+            runs = [self.probe(module, options) for _ in range(options['runs'])]
+            statuses = sorted({status for run in runs for status in run['statuses']})
+            if statuses != [200]:
+                # A 403 or a redirect short-circuits the stack and would be measured as if it were a request
+                self.stderr.write(f"{module}: {options['path']} answered {statuses}, not just 200 (is the database migrated?)")
+            results[module] = {
+                key: statistics.median(run[key] for run in runs) * 1000
+                for key in ('startup', 'first_request', 'request_full', 'request_bare')
+            }
+
+        self.stdout.write(
+            f"{'settings':<34}{'startup ms':>12}{'first req ms':>14}{'request ms':>12}{'middleware ms':>15}"
+        )
+        for module, r in results.items():
+            self.stdout.write(
+                f"{module:<34}{r['startup']:>12.1f}{r['first_request']:>14.2f}"
+                f"{r['request_full']:>12.3f}{r['request_full'] - r['request_bare']:>15.3f}"
+            )
+
+    def probe(self, module, options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=module)
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, options['path'], str(options['requests'])],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            self.stderr.write(completed.stderr)
+            raise SystemExit(f'Probe failed for {module}')
+        # Views print debug lines; the measurements are on the last line
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...services import payroll_export
+
+
+class Command(BaseCommand):
+    help = 'Exports payroll history with employee dimensions as Parquet/Arrow files partitioned by period (incremental by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('out_dir', help='Dataset directory; holds month=YYYY-MM/ partitions and _manifest.json.')
+        parser.add_argument('--type', dest='fmt', choices=sorted(payroll_export.FORMATS), default='parquet')
+        parser.add_argument('--full', action='store_true', help='Rewrite every period, not just new or changed ones.')
+        parser.add_argument('--chunk-size', type=int, default=payroll_export.CHUNK_SIZE, help='Rows fetched and written per batch.')
+
+    def handle(self, *args, **options):
+        try:
+            result = payroll_export.export(
+                options['out_dir'], fmt=options['fmt'], full=options['full'], chunk_size=options['chunk_size'],
+            )
+        except payroll_export.ExportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result['exported'])} period(s) written as {result['format']}, "
+            f"{len(result['skipped'])} unchanged, {len(result['removed'])} removed"
+        ))
+        if result['exported']:
+            self.stdout.write('Written: ' + ', '.join(result['exported']))
+        if result['removed']:
+            self.stdout.write('Removed: ' + ', '.join(result['removed']))
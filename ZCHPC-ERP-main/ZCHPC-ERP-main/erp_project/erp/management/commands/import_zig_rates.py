@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from ...services import exchange_rates
+
+
+class Command(BaseCommand):
+    help = 'Imports ZiG to USD rates from a CSV (date,rate) or JSON file in one upsert, optionally forward-filling gaps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV with a date,rate header, or a JSON list of {"date", "rate"} objects.')
+        parser.add_argument('--fill', action='store_true', help='Forward-fill days with no rate using the previous rate.')
+        parser.add_argument('--until', help='With --fill, keep filling up to this date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        path = Path(options['file'])
+        try:
+            until = parse_date(options['until']) if options['until'] else None
+        except ValueError:
+            until = None
+        if options['until'] and until is None:
+            raise CommandError(f"Invalid --until date '{options['until']}'. Use YYYY-MM-DD.")
+        try:
+            text = path.read_text(encoding='utf-8-sig')
+            if path.suffix == '.json':
+                data = json.loads(text)
+                rates = exchange_rates.parse_rows(data['rates'] if isinstance(data, dict) else data)
+            else:
+                rates = exchange_rates.parse_csv(text)
+            result = exchange_rates.import_rates(rates, fill=options['fill'], until=until)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['from']} to {result['to']}: {result['created']} created, {result['updated']} updated, "
+            f"{result['filled']} filled"
+        ))
+        if result['missing_days']:
+            days = ', '.join(str(day) for day in result['missing_days'][:10])
+            more = len(result['missing_days']) - 10
+            self.stdout.write(self.style.WARNING(
+                f"{len(result['missing_days'])} day(s) without a rate: {days}" + (f' and {more} more' if more > 0 else '')
+            ))
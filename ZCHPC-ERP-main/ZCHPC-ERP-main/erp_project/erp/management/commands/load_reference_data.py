@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...services import reference_data
+
+
+class Command(BaseCommand):
+    help = 'Loads versioned reference data (tax brackets, NSSA caps, pension funds, payslip items), applying only changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='JSON/YAML files to load. Defaults to every file in erp/reference_data.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without saving it.')
+
+    def handle(self, *args, **options):
+        try:
+            results = reference_data.load(options['files'], dry_run=options['dry_run'])
+        except (reference_data.ReferenceDataError, OSError, ValueError) as e:
+            raise CommandError(str(e))
+        report(self, results, options['dry_run'])
+
+
+def report(command, results, dry_run=False):
+    """Prints the per-section counts; shared with the single-file commands."""
+    prefix = '[dry run] ' if dry_run else ''
+    for file_name, version, counts in results:
+        command.stdout.write(f'{prefix}{file_name} (version {version or "unversioned"})')
+        for section, (created, updated) in counts.items():
+            style = command.style.SUCCESS if created or updated else command.style.NOTICE
+            command.stdout.write(style(f'  {section}: {created} created, {updated} updated'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ...services import search
+
+class Command(BaseCommand):
+    help = 'Rebuilds the employee and applicant full-text search indexes.'
+
+    def handle(self, *args, **options):
+        if not search.fts_enabled():
+            self.stdout.write(self.style.WARNING('Full-text index is only used on SQLite; nothing to rebuild.'))
+            return
+
+        employees, applicants = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {employees} employees and {applicants} applicants.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from ...services import contracts
+
+
+class Command(BaseCommand):
+    help = 'Daily contract scan: lists contracts ending soon and deactivates employees and users whose contract has ended.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Report contracts ending within this many days (default 30).')
+        parser.add_argument('--dry-run', action='store_true', help='Report expired contracts without deactivating them.')
+
+    def handle(self, *args, **options):
+        for key, rows in contracts.expiring(options['days']).items():
+            self.stdout.write(f"{len(rows)} {key} with a contract ending within {options['days']} day(s)")
+            for row in rows:
+                self.stdout.write(f"  {row['contractTo']}  {row['employeeid']}  {row['firstname']} {row['surname']}")
+
+        deactivated = contracts.deactivate_expired(dry_run=options['dry_run'])
+        verb = 'would be deactivated' if options['dry_run'] else 'deactivated'
+        for key, rows in deactivated.items():
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} expired {key} {verb}"))
+            for row in rows:
+                self.stdout.write(f"  {row['contractTo']}  {row['employeeid']}  {row['firstname']} {row['surname']}")
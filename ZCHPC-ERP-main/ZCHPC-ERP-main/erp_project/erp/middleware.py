@@ -0,0 +1,224 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .services import audit, metrics
+
+try:
+    import brotli
+except ImportError: # Optional dependency; gzip only without it
+    brotli = None
+
+logger = logging.getLogger('erp.performance')
+
+METRICS_ROUTE = 'metrics/' # Scrapes are not counted in their own metrics
+
+
+class AuditContextMiddleware:
+    """Makes the current request available to the audit trail so entries record the actor."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = audit.current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            audit.current_request.reset(token)
+
+    async def __acall__(self, request):
+        # Context variables are copied into sync_to_async threads, so ORM signals still see it
+        token = audit.current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            audit.current_request.reset(token)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook that counts and times queries, keeping the slowest few."""
+
+    def __init__(self, keep=5):
+        self.keep = keep
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = [] # (seconds, sql), longest first
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.slowest) < self.keep or elapsed > self.slowest[-1][0]:
+                self.slowest.append((elapsed, sql[:300]))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[self.keep:]
+
+
+class PerformanceMiddleware:
+    """
+    Records per-route latency and response size for every request into the
+    /metrics registry. A sampled fraction of requests (PERF_SAMPLE_RATE) also
+    gets SQL and renderer timings, a Server-Timing header, and a log entry with
+    the slowest queries when it exceeds PERF_SLOW_REQUEST_MS.
+
+    Works under WSGI and ASGI. Under ASGI the ORM runs in the request's
+    thread-sensitive thread, so the query recorder is installed on that
+    thread's connection rather than the event loop's.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        self.slow_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 1000)
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+
+        recorder = None
+        if sampled:
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        return self.observe(request, response, start, recorder)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+
+        recorder = None
+        if sampled:
+            recorder = QueryRecorder()
+            # Lambdas: `connection` must be resolved in the ORM's thread, not here
+            await sync_to_async(lambda: connection.execute_wrappers.append(recorder))()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(lambda: connection.execute_wrappers.remove(recorder))()
+        else:
+            response = await self.get_response(request)
+        return self.observe(request, response, start, recorder)
+
+    def observe(self, request, response, start, recorder):
+        """Records the finished request; `recorder` is None when it was not sampled."""
+        sampled = recorder is not None
+        elapsed = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        if route == METRICS_ROUTE:
+            return response
+
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        metrics.registry.observe_request(route, request.method, response.status_code, elapsed, size)
+
+        if sampled:
+            render_started = getattr(request, '_perf_render_started', None)
+            render = time.perf_counter() - render_started if render_started is not None else 0.0
+            metrics.registry.observe_sample(route, request.method, recorder.count, recorder.seconds, render)
+            if self.server_timing:
+                response['Server-Timing'] = (
+                    f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries", '
+                    f'render;dur={render * 1000:.1f}, '
+                    f'total;dur={elapsed * 1000:.1f}'
+                )
+            if elapsed * 1000 >= self.slow_ms:
+                logger.warning(
+                    "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, render %.0f ms, %d bytes. Slowest queries:\n%s",
+                    request.method, request.path, route, elapsed * 1000, recorder.count,
+                    recorder.seconds * 1000, render * 1000, size,
+                    '\n'.join(f'  {seconds * 1000:.1f} ms  {sql}' for seconds, sql in recorder.slowest),
+                )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        request._perf_render_started = time.perf_counter()
+        return response
+
+
+def _accepted_encodings(header):
+    """{'br': 1.0, 'gzip': 0.8, ...} from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Negotiated response compression: brotli when the client prefers it and the
+    brotli package is installed, gzip otherwise. Bodies below COMPRESS_MIN_SIZE
+    are sent as is. Streaming responses are gzipped by Django's GZipMiddleware.
+    Place it right after PerformanceMiddleware so the size metric counts bytes on the wire.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESS_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'COMPRESS_BROTLI_QUALITY', 5)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        br, gzip = accepted.get('br', 0.0), accepted.get('gzip', 0.0)
+        if brotli is None or response.streaming or br <= 0 or br < gzip:
+            if gzip <= 0:
+                patch_vary_headers(response, ('Accept-Encoding',))
+                return response
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag # Strong ETags cannot survive re-encoding
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0006_job_alter_employees_bankaccount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=20)),
+                ('created_count', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Payroll Run',
+                'verbose_name_plural': 'Payroll Runs',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='tax_usd',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='tax_zig',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:38
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0007_payrollrun_payroll_tax_usd_payroll_tax_zig'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=50)),
+                ('entity_id', models.CharField(max_length=50)),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('changes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Audit Log Entry',
+                'verbose_name_plural': 'Audit Log',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['entity', 'entity_id', 'timestamp'], name='erp_auditlo_entity_70a6a3_idx'), models.Index(fields=['timestamp'], name='erp_auditlo_timesta_8a8a85_idx')],
+            },
+        ),
+    ]
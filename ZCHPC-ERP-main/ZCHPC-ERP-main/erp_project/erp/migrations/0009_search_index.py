@@ -0,0 +1,45 @@
+# Full-text search tables for erp/services/search.py (SQLite FTS5 only)
+
+from django.db import migrations
+
+TABLES = ['erp_employee_search', 'erp_applicant_search']
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        # rowid is the model primary key; prefix indexes keep "jo*" style lookups fast
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"name, identifiers, details, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    schema_editor.execute(
+        "INSERT INTO erp_employee_search (rowid, name, identifiers, details) "
+        "SELECT id, firstname || ' ' || surname, "
+        "employeeid || ' ' || email || ' ' || COALESCE(nationalid, ''), "
+        "department || ' ' || position FROM erp_employees"
+    )
+    schema_editor.execute(
+        "INSERT INTO erp_applicant_search (rowid, name, identifiers, details) "
+        "SELECT a.id, a.full_name, a.email, j.title "
+        "FROM erp_applicant a INNER JOIN erp_job j ON j.id = a.job_id"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0008_auditlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
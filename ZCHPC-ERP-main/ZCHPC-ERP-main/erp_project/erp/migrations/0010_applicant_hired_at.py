@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicant',
+            name='hired_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
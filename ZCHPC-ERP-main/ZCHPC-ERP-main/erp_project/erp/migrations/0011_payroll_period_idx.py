@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0010_applicant_hired_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['period'], name='payroll_period_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:50
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+CENT = Decimal('0.01')
+FIELDS = ['employer_nssa_usd', 'employer_nssa_zig', 'employer_pension_usd', 'employer_pension_zig']
+
+
+def backfill_employer_contributions(apps, schema_editor):
+    """Fills the new columns on existing records from the current NSSA cap and pension funds."""
+    Payroll = apps.get_model('erp', 'Payroll')
+    NSSACap = apps.get_model('erp', 'NSSACap')
+    EmployeeDeductables = apps.get_model('erp', 'EmployeeDeductables')
+
+    cap = NSSACap.objects.order_by('-id').first()
+    employer_nssa = cap is not None and cap.contribution_type in ('employer', 'employee_and_employer')
+    funds = {}
+    for deduct in EmployeeDeductables.objects.filter(active=True, pension_fund__isnull=False).select_related('pension_fund').order_by('id'):
+        funds.setdefault(deduct.employee_id, deduct.pension_fund)
+
+    def amount(value):
+        return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    batch = []
+    for payroll in Payroll.objects.order_by('id').iterator(chunk_size=1000):
+        if employer_nssa:
+            payroll.employer_nssa_usd = amount(min(payroll.base_salary_usd, cap.usd_cap) * cap.rate)
+            payroll.employer_nssa_zig = amount(min(payroll.base_salary_zig, cap.zwl_cap) * cap.rate)
+        fund = funds.get(payroll.employee_id)
+        if fund is not None:
+            if fund.currency in ('usd', 'both'):
+                payroll.employer_pension_usd = amount(payroll.base_salary_usd * fund.employer_rate)
+            if fund.currency in ('zwl', 'both'):
+                payroll.employer_pension_zig = amount(payroll.base_salary_zig * fund.employer_rate)
+        batch.append(payroll)
+        if len(batch) == 1000:
+            Payroll.objects.bulk_update(batch, FIELDS)
+            batch = []
+    if batch:
+        Payroll.objects.bulk_update(batch, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0011_payroll_period_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='employer_nssa_usd',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='employer_nssa_zig',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='employer_pension_usd',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='employer_pension_zig',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_employer_contributions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0012_payroll_employer_contributions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='allowances_usd',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='allowances_zig',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='other_deductions_usd',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='other_deductions_zig',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='PayrollLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('allowance', 'Allowance'), ('deduction', 'Deduction'), ('statutory', 'Statutory'), ('employer', 'Employer Contribution')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('currency', models.CharField(choices=[('USD', 'USD'), ('ZWG', 'ZWL/ZiG')], max_length=3)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('payroll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='erp.payroll')),
+            ],
+            options={
+                'verbose_name': 'Payroll Line Item',
+                'verbose_name_plural': 'Payroll Line Items',
+                'ordering': ['payroll', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0013_payroll_line_items'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payrolllineitem',
+            name='category',
+            field=models.CharField(choices=[('allowance', 'Allowance'), ('deduction', 'Deduction'), ('statutory', 'Statutory'), ('employer', 'Employer Contribution'), ('benefit', 'Taxable Benefit')], max_length=20),
+        ),
+    ]
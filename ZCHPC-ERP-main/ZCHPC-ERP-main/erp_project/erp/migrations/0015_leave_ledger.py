@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0014_payroll_line_item_benefit'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employees',
+            name='leave_days',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=6),
+        ),
+        migrations.CreateModel(
+            name='LeaveLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('entry_type', models.CharField(choices=[('accrual', 'Accrual'), ('expiry', 'Expiry')], max_length=10)),
+                ('days', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='erp.employees')),
+            ],
+            options={
+                'verbose_name': 'Leave Ledger Entry',
+                'verbose_name_plural': 'Leave Ledger Entries',
+                'ordering': ['employee', 'period', 'id'],
+                'unique_together': {('employee', 'period', 'entry_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0015_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='contractTo',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employees',
+            name='contractTo',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:02
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0016_contract_end_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_id', models.IntegerField(unique=True)),
+                ('period', models.DateField()),
+                ('base_salary_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('net_salary_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('base_salary_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('net_salary_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('exchange_rate', models.DecimalField(decimal_places=4, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('Draft', 'Draft'), ('Pending', 'Pending'), ('Processed', 'Processed'), ('Failed', 'Failed'), ('Paid', 'Paid')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('nssa_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('pension_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('nssa_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('pension_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tax_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tax_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('allowances_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('allowances_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('other_deductions_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('other_deductions_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('employer_nssa_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('employer_nssa_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('employer_pension_usd', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('employer_pension_zig', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('line_items', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_payrolls', to='erp.employees')),
+            ],
+            options={
+                'verbose_name': 'Archived Payroll',
+                'verbose_name_plural': 'Archived Payroll',
+                'indexes': [models.Index(fields=['period'], name='payroll_archive_period_idx')],
+                'unique_together': {('employee', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0017_payroll_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payethreshold',
+            name='threshold_to',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Leave blank (or 0) for the top band only', max_digits=12, null=True),
+        ),
+    ]
@@ -1,9 +1,31 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from datetime import date # Import date for explicit date usage
 
+class TrackedFieldsMixin:
+    """
+    Keeps the column values a record was loaded with in _loaded_values, so the
+    audit trail can diff a save without reading the row again. Costs one dict
+    per loaded row; refresh_from_db() updates it.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        refreshed = [
+            field.attname for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields)
+        ]
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **{name: self.__dict__[name] for name in refreshed}}
+
 # 1. User Model (often depends on nothing, so can be at the top)
 class CustomUser(AbstractUser):
     employeeid = models.CharField(max_length=10, unique=True, blank=True)
@@ -14,7 +36,7 @@ class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
     salary = models.IntegerField(null=True, blank=True)
     contractFrom = models.DateField(null=True, blank=True)
-    contractTo = models.DateField(null=True, blank=True)
+    contractTo = models.DateField(null=True, blank=True, db_index=True) # Range-scanned by the contract expiry job
     isActive = models.BooleanField(default=True)
 
     def save(self, *args, **kwargs):
@@ -59,7 +81,7 @@ class DeductionType(models.Model):
         return f"{self.name} (${self.amount})"
 
 # 3. Employees (depends on AllowanceType and DeductionType for ManyToMany fields)
-class Employees(models.Model):
+class Employees(TrackedFieldsMixin, models.Model):
     employeeid = models.CharField(max_length=10, unique=True, blank=True)
     firstname = models.CharField(max_length=100)
     surname = models.CharField(max_length=100)
@@ -72,9 +94,9 @@ class Employees(models.Model):
     position = models.CharField(max_length=50)
     department = models.CharField(max_length=50, default='System')
     employee_type = models.CharField(max_length=50, default='Unspecified')
-    leave_days = models.IntegerField(default=0)
+    leave_days = models.DecimalField(max_digits=6, decimal_places=2, default=0) # Current balance, maintained by leave accrual
     contractFrom = models.DateField(null=True, blank=True)
-    contractTo = models.DateField(null=True, blank=True)
+    contractTo = models.DateField(null=True, blank=True, db_index=True) # Range-scanned by the contract expiry job
     usd_salary = models.DecimalField(
         max_digits=12,
         decimal_places=2,
@@ -127,7 +149,7 @@ class Employees(models.Model):
         return f"{self.employeeid} - {self.email}"
 
 # 4. ZiGRateToUSD and TaxBracket (independent, but Payroll will depend on TaxBracket)
-class ZiGRateToUSD(models.Model):
+class ZiGRateToUSD(TrackedFieldsMixin, models.Model):
     date = models.DateField(unique=True) # Only one rate per day
     rate = models.DecimalField(
         max_digits=10,
@@ -143,7 +165,7 @@ class ZiGRateToUSD(models.Model):
     def __str__(self):
         return f"{self.date}: 1 ZIG = {self.rate} USD"
 
-class TaxBracket(models.Model):
+class TaxBracket(TrackedFieldsMixin, models.Model):
     currency_choices = [
         ('USD', 'USD'),
         ('ZWG', 'ZWL/ZiG') # Use ZWG for consistency with your code
@@ -164,7 +186,7 @@ class TaxBracket(models.Model):
         return f"{self.currency} {self.min_income}-{self.max_income or 'Max'} @ {self.rate*100}%"
 
 # 5. Payroll (depends on Employees and TaxBracket)
-class Payroll(models.Model):
+class Payroll(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('Draft', 'Draft'),
         ('Pending', 'Pending'),
@@ -172,6 +194,16 @@ class Payroll(models.Model):
         ('Failed', 'Failed'),
         ('Paid', 'Paid'),
     ]
+
+    # Allowed status changes: Draft -> Pending -> Processed -> Paid. Any unpaid
+    # record can be marked Failed, and Failed records go back to Draft for a rerun.
+    STATUS_TRANSITIONS = {
+        'Draft': ['Pending', 'Failed'],
+        'Pending': ['Processed', 'Failed'],
+        'Processed': ['Paid', 'Failed'],
+        'Failed': ['Draft'],
+        'Paid': [],
+    }
     
     employee = models.ForeignKey(
         Employees, # This is now defined above
@@ -222,15 +254,35 @@ class Payroll(models.Model):
     pension_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     nssa_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     pension_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Totals of the allowance and non-statutory deduction line items
+    allowances_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    allowances_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    other_deductions_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    other_deductions_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Employer contributions (not deducted from pay; part of the cost of employment)
+    employer_nssa_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_nssa_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_pension_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_pension_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     
     class Meta:
         unique_together = ['employee', 'period'] # One payroll per employee per period
         ordering = ['-period', 'employee__firstname']
+        indexes = [
+            models.Index(fields=['period'], name='payroll_period_idx'), # Period range reports
+        ]
     
     def __str__(self):
         return f"{self.employee} - {self.period.strftime('%B %Y')} - {self.get_status_display()}"
     
+    @classmethod
+    def allowed_source_statuses(cls, new_status):
+        """Statuses a record may be in to move to new_status."""
+        return [current for current, targets in cls.STATUS_TRANSITIONS.items() if new_status in targets]
+
     def save(self, *args, **kwargs):
         # Automatically set period to first day of month if not specified
         if not self.period:
@@ -385,7 +437,7 @@ class Union(models.Model):
         verbose_name_plural = "Unions"
 
 # Employee-specific deductions (depends on Employees, MedicalAidPlan, PensionFund, InsuranceOption, Union)
-class EmployeeDeductables(models.Model):
+class EmployeeDeductables(TrackedFieldsMixin, models.Model):
     CURRENCY_CHOICES = [
         ('USD', 'US Dollar'),
         ('ZWL', 'Zimbabwe Dollar'),
@@ -490,6 +542,15 @@ class Applicant(models.Model):
     application_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=3, choices=APPLICATION_STATUSES, default='NEW')
     notes = models.TextField(blank=True, null=True)
+    hired_at = models.DateTimeField(null=True, blank=True) # Set when status first becomes Hired
+
+    def save(self, *args, **kwargs):
+        # Record the hire time for time-to-hire reporting
+        if self.status == 'HIR' and self.hired_at is None:
+            self.hired_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'hired_at'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.full_name} - {self.job.title}"
@@ -499,7 +560,7 @@ class PAYEThreshold(models.Model):
     deduction_type = models.ForeignKey(DeductionType, on_delete=models.CASCADE)
     currency = models.CharField(max_length=3, choices=[('USD', 'US Dollar'), ('ZWL', 'Zimbabwe Dollar')])
     threshold_from = models.DecimalField(max_digits=12, decimal_places=2)
-    threshold_to = models.DecimalField(max_digits=12, decimal_places=2)
+    threshold_to = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Leave blank (or 0) for the top band only")
     rate = models.DecimalField(max_digits=5, decimal_places=4)
     fixed_amount = models.DecimalField(max_digits=12, decimal_places=2)
     
@@ -528,4 +589,149 @@ class NSSACap(models.Model):
     
     class Meta:
         verbose_name = "NSSA Cap"
-        verbose_name_plural = "NSSA Caps"
\ No newline at end of file
+        verbose_name_plural = "NSSA Caps"
+
+# 12. PayrollRun (one row per period, doubles as the generation lock)
+class PayrollRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+    ]
+
+    period = models.DateField(unique=True) # First day of the pay period month
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    created_count = models.IntegerField(default=0) # Records created by the last run
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Payroll Run"
+        verbose_name_plural = "Payroll Runs"
+        ordering = ['-period']
+
+    def __str__(self):
+        return f"{self.period.strftime('%B %Y')} - {self.get_status_display()}"
+
+
+# 13. AuditLog (append-only change history, written in batches by services/audit.py)
+class AuditLog(models.Model):
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    entity = models.CharField(max_length=50) # Model name, e.g. "payroll"
+    entity_id = models.CharField(max_length=50)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(encoder=DjangoJSONEncoder) # Only the fields that changed
+    actor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Audit Log Entry"
+        verbose_name_plural = "Audit Log"
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['entity', 'entity_id', 'timestamp']),
+            models.Index(fields=['timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.entity}#{self.entity_id} at {self.timestamp}"
+
+
+# 14. PayrollLineItem (itemized payslip lines, written in bulk with their Payroll)
+class PayrollLineItem(models.Model):
+    CATEGORY_CHOICES = [
+        ('allowance', 'Allowance'),
+        ('deduction', 'Deduction'),
+        ('statutory', 'Statutory'), # PAYE, NSSA, pension
+        ('employer', 'Employer Contribution'),
+        ('benefit', 'Taxable Benefit'), # Taxed but not paid out
+    ]
+    CURRENCY_CHOICES = [
+        ('USD', 'USD'),
+        ('ZWG', 'ZWL/ZiG'),
+    ]
+
+    payroll = models.ForeignKey(Payroll, on_delete=models.CASCADE, related_name='line_items')
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    name = models.CharField(max_length=100)
+    currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Payroll Line Item"
+        verbose_name_plural = "Payroll Line Items"
+        ordering = ['payroll', 'id']
+
+    def __str__(self):
+        return f"{self.payroll_id}: {self.name} {self.currency} {self.amount}"
+
+
+# 15. LeaveLedger (one row per employee, month and entry type; written by leave accrual)
+class LeaveLedger(models.Model):
+    ENTRY_TYPES = [
+        ('accrual', 'Accrual'),
+        ('expiry', 'Expiry'), # Balance above the carry-over cap at the start of a leave year
+    ]
+
+    employee = models.ForeignKey(Employees, on_delete=models.CASCADE, related_name='leave_ledger')
+    period = models.DateField() # First day of the month
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPES)
+    days = models.DecimalField(max_digits=6, decimal_places=2) # Negative for expiry
+    balance = models.DecimalField(max_digits=6, decimal_places=2) # leave_days after this entry
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Leave Ledger Entry"
+        verbose_name_plural = "Leave Ledger Entries"
+        unique_together = ('employee', 'period', 'entry_type')
+        ordering = ['employee', 'period', 'id']
+
+    def __str__(self):
+        return f"{self.employee_id} {self.period} {self.entry_type} {self.days}"
+
+
+# 16. PayrollArchive (closed periods moved out of Payroll; same columns, payslip lines inlined)
+class PayrollArchive(models.Model):
+    archived_id = models.IntegerField(unique=True) # Payroll.id before archiving, so ids stay stable
+    employee = models.ForeignKey(Employees, on_delete=models.PROTECT, related_name='archived_payrolls')
+    period = models.DateField()
+    base_salary_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    net_salary_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    base_salary_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    net_salary_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    exchange_rate = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    status = models.CharField(max_length=20, choices=Payroll.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    nssa_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    pension_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    nssa_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    pension_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    allowances_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    allowances_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    other_deductions_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    other_deductions_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_nssa_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_nssa_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_pension_usd = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    employer_pension_zig = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    line_items = models.JSONField(default=list, encoder=DjangoJSONEncoder) # [{category, name, currency, amount}]
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Archived Payroll"
+        verbose_name_plural = "Archived Payroll"
+        unique_together = ['employee', 'period']
+        indexes = [
+            models.Index(fields=['period'], name='payroll_archive_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.period.strftime('%B %Y')} (archived)"
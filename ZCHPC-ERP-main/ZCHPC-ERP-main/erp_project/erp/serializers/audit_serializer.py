@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from ..models import AuditLog
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    actor = serializers.CharField(source='actor.employeeid', read_only=True, default=None)
+
+    class Meta:
+        model = AuditLog
+        fields = ['id', 'entity', 'entity_id', 'action', 'changes', 'actor', 'timestamp']
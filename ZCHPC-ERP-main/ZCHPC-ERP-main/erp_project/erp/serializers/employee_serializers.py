@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from ..serializers.payroll_serializer import AllowanceTypeSerializer, DeductionTypeSerializer
+from .mixins import FieldSelectionMixin
 from ..models import AllowanceType, CustomUser, DeductionType, Employees
 from datetime import datetime
 
@@ -51,6 +52,9 @@ class EmployeeRegistrationSerializer(serializers.ModelSerializer):
             'nssaNumber', 'zimraTaxNumber', 'payeNumber', 'aidsLevyNumber',
             'emegencyContactName', 'emegencyContactNumber', 'emegencyContactRelationship'
         ]
+        extra_kwargs = {
+            'leave_days': {'coerce_to_string': False}, # A JSON number, as when it was an IntegerField
+        }
     
     def validate(self, data):
         
@@ -72,11 +76,15 @@ class EmployeeRegistrationSerializer(serializers.ModelSerializer):
         return Employees.objects.create(**validated_data)
     
 # --- Modified: EmployeePayslipSerializer ---
-class EmployeePayslipSerializer(serializers.ModelSerializer):
-    # Option 1: Nested Read-Only for GET requests (displaying full allowance/deduction objects)
-    # This shows the full allowance/deduction object on GET requests including id, name, and amount.
-    allowances = AllowanceTypeSerializer(many=True, read_only=True)
-    deductions = DeductionTypeSerializer(many=True, read_only=True)
+class EmployeePayslipSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    # Option 1: Nested read-only allowance/deduction objects (id, name and amount) on GET
+    # requests. ?expand= without them (e.g. ?expand=none) renders them as id lists instead.
+    allowances = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    deductions = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    expandable_fields = {
+        'allowances': (AllowanceTypeSerializer, {'many': True, 'read_only': True}),
+        'deductions': (DeductionTypeSerializer, {'many': True, 'read_only': True}),
+    }
 
     # Option 2: Write-Only for PUT/PATCH requests (sending only IDs for updates)
     # This field is used when you send data to update the allowances/deductions for an employee.
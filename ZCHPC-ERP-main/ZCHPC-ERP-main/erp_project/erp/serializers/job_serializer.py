@@ -11,4 +11,5 @@ class ApplicantSerializer(serializers.ModelSerializer):
     job_title = serializers.CharField(source='job.title', read_only=True) # To display job title in applicant list
     class Meta:
         model = Applicant
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['hired_at']
\ No newline at end of file
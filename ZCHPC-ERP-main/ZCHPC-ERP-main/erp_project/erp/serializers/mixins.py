@@ -0,0 +1,131 @@
+"""
+Sparse fieldsets and selective expansion for model serializers.
+
+    ?fields=id,employee,currency            only these fields
+    ?fields=id,employee.firstname           dotted names select fields of a nested relation
+    ?expand=employee                        nest only these relations, the others render as ids
+    ?expand=none                            render every relation as ids
+
+Relations that can be nested are listed in `expandable_fields` as
+name -> (serializer class, kwargs). Without ?expand= they are all nested, as
+they always were. optimize_queryset() reads the same selection and narrows the
+queryset to match: only() for the selected columns, select_related and
+prefetch_related only for what is rendered.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+_UNSET = object()
+
+
+def _split(names):
+    """'a,b.c,b.d' -> ({'a', 'b'}, {'b': {'c', 'd'}})"""
+    top, nested = set(), {}
+    for name in names:
+        head, _, rest = name.partition('.')
+        top.add(head)
+        if rest:
+            nested.setdefault(head, set()).add(rest)
+    return top, nested
+
+
+def _param(request, name):
+    # .GET rather than .query_params: plain Django requests (async views) have no query_params
+    value = request.GET.get(name, '') if request is not None else ''
+    return [part.strip() for part in value.split(',') if part.strip()] or None
+
+
+class FieldSelectionMixin:
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=_UNSET, expand=_UNSET, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the outermost serializer reads the query string; nested ones get their share passed in
+        request = self.context.get('request')
+        if fields is _UNSET:
+            fields = _param(request, 'fields')
+        if expand is _UNSET:
+            expand = _param(request, 'expand')
+
+        selected, nested_fields = _split(fields or [])
+        expanded, nested_expand = _split(expand or [])
+        if expand is None:
+            expanded = set(self.expandable_fields)
+        # Selecting a sub-field implies expanding its relation
+        expanded |= set(nested_fields) & set(self.expandable_fields)
+
+        for name in expanded & set(self.expandable_fields):
+            if selected and name not in selected:
+                continue
+            serializer_class, options = self.expandable_fields[name]
+            if issubclass(serializer_class, FieldSelectionMixin):
+                options = {**options, 'fields': sorted(nested_fields.get(name, ())) or None,
+                           'expand': sorted(nested_expand.get(name, ())) or None}
+            self.fields[name] = serializer_class(**options)
+
+        if selected:
+            for name in list(self.fields):
+                if name not in selected and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request=None, fields=_UNSET, expand=_UNSET):
+        """Applies only()/select_related/prefetch_related for the fields the request renders."""
+        serializer = cls(context={'request': request}, fields=fields, expand=expand)
+        only, select, prefetch = _plan(serializer, queryset.model, '')
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if only is not None:
+            queryset = queryset.only(*only)
+        return queryset
+
+
+def _plan(serializer, model, prefix):
+    """
+    (only, select_related, prefetch_related) for a serializer over `model`.
+    `only` is None when a field's data cannot be traced to columns
+    (source='*', method fields), in which case every column is loaded.
+    """
+    only, select, prefetch = {prefix + model._meta.pk.name}, [], []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            only = None
+            continue
+        head = field.source.split('.')[0]
+        try:
+            model_field = model._meta.get_field(head)
+        except FieldDoesNotExist:
+            only = None # Property or other attribute
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(nested, serializers.BaseSerializer):
+                sub_only, sub_select, sub_prefetch = _plan(nested, model_field.related_model, '')
+                related = model_field.related_model.objects.all()
+                if sub_select:
+                    related = related.select_related(*sub_select)
+                if sub_only is not None and model_field.many_to_many:
+                    related = related.only(*sub_only)
+                prefetch.append(Prefetch(prefix + head, queryset=related))
+            else:
+                prefetch.append(prefix + head)
+        elif model_field.is_relation:
+            if isinstance(nested, serializers.BaseSerializer) or '.' in field.source:
+                select.append(prefix + head)
+                if isinstance(nested, serializers.BaseSerializer):
+                    sub_only, sub_select, sub_prefetch = _plan(nested, model_field.related_model, prefix + head + '__')
+                    select.extend(sub_select)
+                    prefetch.extend(sub_prefetch)
+                    if only is not None and sub_only is not None:
+                        only |= sub_only
+            if only is not None:
+                only.add(prefix + head)
+        elif only is not None:
+            only.add(prefix + head)
+    return only, select, prefetch
@@ -1,6 +1,6 @@
 # erp/app_serializers/payroll_serializer.py
 from rest_framework import serializers
-from ..models import AllowanceType, DeductionType, Payroll, Employees, PayrollPeriod, ZiGRateToUSD
+from ..models import AllowanceType, DeductionType, Payroll, PayrollArchive, PayrollLineItem, Employees, PayrollPeriod, ZiGRateToUSD
 from django.utils.timezone import now
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -85,6 +85,57 @@ class PayrollSerializer(serializers.ModelSerializer):
             
         return representation
 
+class PayrollLineItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PayrollLineItem
+        fields = ['category', 'name', 'currency', 'amount']
+
+class PayslipSerializer(serializers.ModelSerializer):
+    """Read-only itemized payslip. Use with select_related('employee') and prefetch_related('line_items')."""
+    employee_name = serializers.SerializerMethodField()
+    employee_id = serializers.CharField(source='employee.employeeid', read_only=True)
+    department = serializers.CharField(source='employee.department', read_only=True)
+    line_items = PayrollLineItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Payroll
+        fields = [
+            'id', 'employee_id', 'employee_name', 'department', 'period', 'status', 'exchange_rate',
+            'base_salary_usd', 'allowances_usd', 'tax_usd', 'nssa_usd', 'pension_usd', 'other_deductions_usd', 'net_salary_usd',
+            'base_salary_zig', 'allowances_zig', 'tax_zig', 'nssa_zig', 'pension_zig', 'other_deductions_zig', 'net_salary_zig',
+            'line_items',
+        ]
+        read_only_fields = fields
+
+    def get_employee_name(self, obj):
+        return f"{obj.employee.firstname} {obj.employee.surname}"
+
+class ArchivedPayrollSerializer(PayrollSerializer):
+    """PayrollSerializer output for PayrollArchive rows (read-only); id is the original payroll id."""
+    id = serializers.IntegerField(source='archived_id', read_only=True)
+
+    class Meta:
+        model = PayrollArchive
+        exclude = ['archived_id', 'line_items']
+        extra_kwargs = {
+            'employee': {'write_only': True}
+        }
+
+class ArchivedPayslipSerializer(PayslipSerializer):
+    """PayslipSerializer output for PayrollArchive rows; the lines are stored inline."""
+    id = serializers.IntegerField(source='archived_id', read_only=True)
+    line_items = serializers.JSONField(read_only=True)
+
+    class Meta(PayslipSerializer.Meta):
+        model = PayrollArchive
+
+def serialize_records(rows):
+    """PayrollSerializer data for a mix of Payroll and PayrollArchive rows (payroll_archive.records), in order."""
+    archived = [isinstance(row, PayrollArchive) for row in rows]
+    live_data = iter(PayrollSerializer([row for row, a in zip(rows, archived) if not a], many=True).data)
+    archived_data = iter(ArchivedPayrollSerializer([row for row, a in zip(rows, archived) if a], many=True).data)
+    return [next(archived_data) if a else next(live_data) for a in archived]
+
 class PayrollPeriodSerializer(serializers.ModelSerializer):
     class Meta:
         model = PayrollPeriod
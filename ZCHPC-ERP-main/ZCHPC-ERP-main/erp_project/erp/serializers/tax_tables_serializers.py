@@ -3,11 +3,15 @@ from ..models import (
     Employees, Payroll, ZiGRateToUSD, NSSACap, PensionFund,
     EmployeeDeductables, TaxBracket
 )
+from .mixins import FieldSelectionMixin
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Employees
         fields = '__all__'
+        extra_kwargs = {
+            'leave_days': {'coerce_to_string': False}, # A JSON number, as when it was an IntegerField
+        }
 
 class ZiGRateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,14 +23,17 @@ class NSSACapSerializer(serializers.ModelSerializer):
         model = NSSACap
         fields = '__all__'
 
-class PensionFundSerializer(serializers.ModelSerializer):
+class PensionFundSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = PensionFund
         fields = '__all__'
 
-class EmployeeDeductablesSerializer(serializers.ModelSerializer):
-    employee = EmployeeSerializer(read_only=True)
-    pension_fund = PensionFundSerializer(read_only=True)
+class EmployeeDeductablesSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    # Nested by default; ?expand= naming only one of them renders the other as an id
+    expandable_fields = {
+        'employee': (EmployeeSerializer, {'read_only': True}),
+        'pension_fund': (PensionFundSerializer, {'read_only': True}),
+    }
 
     class Meta:
         model = EmployeeDeductables
@@ -37,8 +44,10 @@ class TaxBracketSerializer(serializers.ModelSerializer):
         model = TaxBracket
         fields = '__all__'
 
-class PayrollSerializer(serializers.ModelSerializer):
-    employee = EmployeeSerializer(read_only=True) # Nested serializer for employee details
+class PayrollSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'employee': (EmployeeSerializer, {'read_only': True}), # Nested employee details; ?expand=none for the id
+    }
 
     class Meta:
         model = Payroll
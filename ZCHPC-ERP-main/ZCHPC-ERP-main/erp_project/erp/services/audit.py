@@ -0,0 +1,172 @@
+"""
+Append-only audit trail.
+
+Changes are collected in a buffer while a transaction runs and written with
+one bulk_create when it commits, so auditing adds no INSERT per save. Each
+savepoint (nested atomic block) gets its own buffer, registered as that
+block's on_commit callback. Django drops the callback when the block rolls
+back, and the buffer and its entries go with it, so only committed changes
+reach the audit table.
+
+Old values come from the row as it was loaded (TrackedFieldsMixin), so a save
+is diffed without reading the record again. Only an instance that was never
+loaded from the database (built with a pk and saved) is read once before
+its save.
+"""
+import threading
+import weakref
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from ..models import AuditLog
+
+# Set by AuditContextMiddleware so entries can record who made the change
+current_request = ContextVar('audit_current_request', default=None)
+
+_state = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _field_map(model):
+    return {field.attname: field for field in model._meta.concrete_fields}
+
+
+def field_values(instance):
+    """{attname: value} of the concrete fields loaded on the instance."""
+    # Deferred fields (only()/defer()) are absent from __dict__ and simply not tracked
+    return {attname: instance.__dict__[attname] for attname in _field_map(type(instance)) if attname in instance.__dict__}
+
+
+def take_snapshot(instance):
+    """pre_save: makes sure an existing record has its stored values to diff against."""
+    if instance.pk is None or hasattr(instance, '_loaded_values'):
+        return
+    # Never loaded (e.g. Model(pk=...).save()): the only case that reads the row
+    loaded = field_values(instance)
+    stored = None
+    if loaded:
+        stored = (
+            type(instance)._base_manager.using(instance._state.db or 'default')
+            .filter(pk=instance.pk).values(*loaded).first()
+        )
+    instance._loaded_values = stored or {}
+
+
+def diff_instance(instance):
+    """Returns {field: [old, new]} for the fields that changed since the record was loaded or saved."""
+    fields = _field_map(type(instance))
+    snapshot = getattr(instance, '_loaded_values', None) or {}
+    changes = {}
+    for attname, old in snapshot.items():
+        field = fields[attname]
+        new = getattr(instance, attname)
+        try:
+            changed = field.to_python(old) != field.to_python(new)
+        except Exception:
+            changed = old != new
+        if changed:
+            changes[attname] = [old, new]
+    return changes
+
+
+class _Buffer:
+    """Entries recorded in one savepoint; runs as that savepoint's on_commit callback."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def __call__(self):
+        _write(self.entries)
+
+
+def _buffer():
+    """The buffer of the current atomic block, or None in autocommit mode."""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    # Only Django's on_commit list holds buffers strongly: once a buffer has run,
+    # or has been discarded by a rollback, it drops out of this mapping by itself.
+    buffers = getattr(_state, 'buffers', None)
+    if buffers is None:
+        buffers = _state.buffers = weakref.WeakValueDictionary()
+    key = (connection.alias, tuple(connection.savepoint_ids))
+    buffer = buffers.get(key)
+    if buffer is None:
+        buffer = buffers[key] = _Buffer()
+        transaction.on_commit(buffer, robust=True)
+    return buffer
+
+
+def _enqueue(entity, entity_id, action, changes):
+    key = (entity, str(entity_id), action)
+    buffer = _buffer()
+    if buffer is None:
+        _write({key: changes})
+        return
+
+    pending = buffer.entries
+    if key in pending and action == 'update':
+        # Several saves of one record in a transaction collapse into one entry
+        merged = pending[key]
+        for attname, (old, new) in changes.items():
+            merged[attname] = [merged[attname][0], new] if attname in merged else [old, new]
+    else:
+        pending[key] = changes
+
+
+def _write(pending):
+    """Writes entries in one INSERT."""
+    if not pending:
+        return
+
+    request = current_request.get()
+    user = getattr(request, 'user', None) if request is not None else None
+    actor_id = user.pk if user is not None and user.is_authenticated else None
+
+    timestamp = now()
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            entity=entity,
+            entity_id=entity_id,
+            action=action,
+            changes=changes,
+            actor_id=actor_id,
+            timestamp=timestamp,
+        )
+        for (entity, entity_id, action), changes in pending.items()
+        if changes or action != 'update'
+    ])
+
+
+def record_save(instance, created):
+    entity = instance._meta.model_name
+    if created:
+        _enqueue(entity, instance.pk, 'create', field_values(instance))
+    else:
+        changes = diff_instance(instance)
+        if changes:
+            _enqueue(entity, instance.pk, 'update', changes)
+    # The saved values are what the next save is diffed against
+    instance._loaded_values = field_values(instance)
+
+
+def record_delete(instance):
+    _enqueue(instance._meta.model_name, instance.pk, 'delete', field_values(instance))
+
+
+def record_related(instance, field_name, ids):
+    """Records the new id list of a many-to-many field."""
+    _enqueue(instance._meta.model_name, instance.pk, 'update', {field_name: [None, sorted(ids)]})
+
+
+def record_bulk(model, changes_by_pk, action='update'):
+    """
+    Records changes applied with QuerySet.update() or bulk_create(), which bypass signals.
+    changes_by_pk maps primary key -> {field: [old, new]} (or {field: value} for creates).
+    """
+    entity = model._meta.model_name
+    for pk, changes in changes_by_pk.items():
+        _enqueue(entity, pk, action, changes)
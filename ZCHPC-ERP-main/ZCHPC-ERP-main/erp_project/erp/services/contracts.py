@@ -0,0 +1,73 @@
+"""
+Contract expiry for employees and system users.
+
+Both Employees and CustomUser carry contractTo (indexed). The scanner lists
+contracts ending within the next N days with one range query per model, and
+deactivates expired ones with one UPDATE per model. QuerySet.update() skips
+signals, so the audit trail and cached tokens are handled here.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from ..authentication import revoke_user_tokens
+from ..models import CustomUser, Employees
+from . import audit
+
+MODELS = {
+    'employees': (Employees, ['id', 'employeeid', 'firstname', 'surname', 'department', 'position', 'contractTo']),
+    'users': (CustomUser, ['id', 'employeeid', 'firstname', 'surname', 'department', 'role', 'contractTo']),
+}
+
+
+def in_contract_during(start, end):
+    """Q for records whose contract overlaps [start, end]; open-ended dates always match."""
+    return (
+        (Q(contractFrom__isnull=True) | Q(contractFrom__lte=end))
+        & (Q(contractTo__isnull=True) | Q(contractTo__gte=start))
+    )
+
+
+def expiring(days, today=None):
+    """Active employees and users whose contract ends within `days` days from today (inclusive)."""
+    today = today or now().date()
+    return {
+        key: list(
+            model.objects.filter(isActive=True, contractTo__range=(today, today + timedelta(days=days)))
+            .order_by('contractTo', 'id').values(*fields)
+        )
+        for key, (model, fields) in MODELS.items()
+    }
+
+
+def expired(today=None):
+    """Querysets of still-active employees and users whose contract ended before today."""
+    today = today or now().date()
+    return {key: model.objects.filter(isActive=True, contractTo__lt=today) for key, (model, _) in MODELS.items()}
+
+
+def deactivate_expired(today=None, dry_run=False):
+    """
+    Deactivates everything expired() returns, one UPDATE per model. Users also
+    lose is_active so they can no longer log in, and their cached tokens are
+    dropped once the transaction commits. Returns the affected records.
+    """
+    result = {}
+    with transaction.atomic():
+        for key, queryset in expired(today).items():
+            model, fields = MODELS[key]
+            rows = list(queryset.order_by('contractTo', 'id').values(*fields))
+            result[key] = rows
+            if dry_run or not rows:
+                continue
+
+            ids = [row['id'] for row in rows]
+            if model is CustomUser:
+                queryset.update(isActive=False, is_active=False)
+                transaction.on_commit(lambda ids=ids: [revoke_user_tokens(pk) for pk in ids])
+            else:
+                queryset.update(isActive=False)
+                audit.record_bulk(model, {pk: {'isActive': [True, False]} for pk in ids})
+    return result
@@ -0,0 +1,126 @@
+"""
+Medical aid, insurance, union and taxable-benefit amounts for a payroll run.
+
+All active EmployeeDeductables are loaded in one query with every related plan,
+fund, cover and union joined in. Each plan/option is turned into a small rule
+(fixed amount, or rate with optional min/max clamp) once per currency and
+reused for every employee that references it, so evaluating an employee is
+plain arithmetic with no further queries.
+
+Amounts apply in the deductable's own currency (USD or ZWL/ZiG).
+"""
+from dataclasses import dataclass, field
+
+from ..models import EmployeeDeductables
+
+# EmployeeDeductables currency code -> payroll currency code
+PAYROLL_CURRENCY = {'USD': 'USD', 'ZWL': 'ZWG'}
+
+
+@dataclass
+class DeductionResult:
+    deductions: list = field(default_factory=list) # (name, amount), taken from net pay
+    benefits: list = field(default_factory=list) # (name, amount), added to taxable income only
+
+    @property
+    def total_deductions(self):
+        return round(sum(amount for _, amount in self.deductions), 2)
+
+    @property
+    def total_benefits(self):
+        return round(sum(amount for _, amount in self.benefits), 2)
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+class DeductionEvaluator:
+    def __init__(self, deductables):
+        # Keep the first active record per employee, as the old per-employee .first() did
+        self.deductables = {}
+        for deduct in deductables:
+            self.deductables.setdefault(deduct.employee_id, deduct)
+        self._rules = {}
+
+    @classmethod
+    def load(cls):
+        return cls(
+            EmployeeDeductables.objects.filter(active=True)
+            .select_related('pension_fund', 'medical_aid', 'funeral_cover', 'life_insurance', 'union')
+            .order_by('id')
+        )
+
+    def get(self, employee_id):
+        return self.deductables.get(employee_id)
+
+    def _rule(self, kind, obj, usd):
+        """(fixed amount, rate, minimum, maximum) for one plan/option in one currency, built once."""
+        key = (kind, obj.pk, usd)
+        rule = self._rules.get(key)
+        if rule is None:
+            amount = obj.usd_amount if usd else obj.zwl_amount
+            if kind == 'insurance' and obj.calculation_type == 'percentage':
+                rule = (
+                    None,
+                    _float(obj.rate) or 0.0,
+                    _float(obj.min_amount_usd if usd else obj.min_amount_zwl),
+                    _float(obj.max_amount_usd if usd else obj.max_amount_zwl),
+                )
+            elif kind == 'union' and obj.frequency == 'annual':
+                rule = ((_float(amount) or 0.0) / 12, None, None, None) # Spread over the year
+            else:
+                rule = (_float(amount) or 0.0, None, None, None)
+            self._rules[key] = rule
+        return rule
+
+    @staticmethod
+    def _apply(rule, salary):
+        fixed, rate, minimum, maximum = rule
+        if fixed is not None:
+            return round(fixed, 2)
+        amount = salary * rate
+        if minimum is not None:
+            amount = max(amount, minimum)
+        if maximum is not None:
+            amount = min(amount, maximum)
+        return round(amount, 2)
+
+    def evaluate(self, employee_id, salaries):
+        """
+        Returns {payroll currency: DeductionResult} for the employee's deductable.
+        salaries maps payroll currency ('USD'/'ZWG') to the basic salary used for
+        percentage-based cover.
+        """
+        deduct = self.deductables.get(employee_id)
+        if deduct is None:
+            return {}
+        currency = PAYROLL_CURRENCY.get(deduct.currency)
+        if currency is None:
+            return {}
+        usd = currency == 'USD'
+        salary = salaries.get(currency, 0.0)
+        result = DeductionResult()
+
+        items = [
+            ('plan', f'Medical Aid ({deduct.medical_aid.name})' if deduct.medical_aid else None, deduct.medical_aid),
+            ('insurance', 'Funeral Cover', deduct.funeral_cover),
+            ('insurance', 'Life Insurance', deduct.life_insurance),
+            ('union', f'Union ({deduct.union.name})' if deduct.union else None, deduct.union),
+        ]
+        for kind, name, obj in items:
+            if obj is None:
+                continue
+            amount = self._apply(self._rule(kind, obj, usd), salary)
+            if amount:
+                result.deductions.append((name, amount))
+
+        for name, value in (
+            ('School Fees Benefit', deduct.school_fees_benefit),
+            ('Housing Benefit', deduct.housing_benefit),
+            ('Loan Benefit', deduct.loan_benefit),
+        ):
+            if value:
+                result.benefits.append((name, float(value)))
+
+        return {currency: result}
@@ -0,0 +1,168 @@
+"""
+ZiG -> USD rate lookups over the ZiGRateToUSD series, and bulk rate import.
+
+The series is loaded once (one row per day) and searched with bisect, so
+converting any number of periods or dates costs a single query. A date uses
+the latest rate on or before it, the same rule payroll generation applies.
+
+Imports upsert a whole date range in one statement and can forward-fill
+weekends and holidays, so every day in the range has its own row.
+"""
+import csv
+import io
+from bisect import bisect_right
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from ..models import ZiGRateToUSD
+from . import audit
+
+class MissingExchangeRateError(Exception):
+    pass
+
+
+class RateImportError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+class RateSeries:
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.dates = [d for d, _ in rows]
+        self.rates = [Decimal(r) for _, r in rows]
+
+    @classmethod
+    def load(cls, until=None):
+        """Loads every rate up to `until` (inclusive), or the whole series."""
+        queryset = ZiGRateToUSD.objects.order_by()
+        if until is not None:
+            queryset = queryset.filter(date__lte=until)
+        return cls(queryset.values_list('date', 'rate'))
+
+    def rate_on(self, day):
+        """USD value of 1 ZiG on `day`, or None if no rate had been entered yet."""
+        index = bisect_right(self.dates, day) - 1
+        return self.rates[index] if index >= 0 else None
+
+    def __len__(self):
+        return len(self.dates)
+
+
+def rate_for(day):
+    """
+    The rate payroll uses for `day`: the latest on or before it (an indexed
+    lookup). Raises MissingExchangeRateError when there is none, or when it is
+    older than ZIG_RATE_MAX_AGE_DAYS, instead of falling back to a stale value.
+    """
+    row = ZiGRateToUSD.objects.filter(date__lte=day).order_by('-date').first()
+    if row is None:
+        raise MissingExchangeRateError(f'No ZiG rate on or before {day}. Import rates first.')
+    max_age = getattr(settings, 'ZIG_RATE_MAX_AGE_DAYS', 7)
+    if max_age is not None and (day - row.date).days > max_age:
+        raise MissingExchangeRateError(
+            f'Latest ZiG rate before {day} is from {row.date}. Import or forward-fill the missing days.'
+        )
+    return row.rate
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def parse_rows(items):
+    """Validates [{'date': ..., 'rate': ...}] into {date: Decimal}. Later rows win."""
+    rates, errors = {}, []
+    for number, item in enumerate(items, start=1):
+        try:
+            day = parse_date(str(item.get('date', '')).strip())
+            rate = Decimal(str(item.get('rate', '')).strip())
+        except (AttributeError, InvalidOperation, ValueError):
+            day, rate = None, None
+        if day is None or rate is None or not rate.is_finite():
+            errors.append(f'row {number}: expected a YYYY-MM-DD date and a numeric rate')
+        elif rate <= 0:
+            errors.append(f'row {number}: rate must be positive')
+        else:
+            rates[day] = rate
+    if errors:
+        raise RateImportError(errors)
+    return rates
+
+
+def parse_csv(text):
+    """CSV with a header row containing 'date' and 'rate' columns."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'date', 'rate'} <= {name.strip().lower() for name in reader.fieldnames}:
+        raise RateImportError(["CSV needs a header row with 'date' and 'rate' columns"])
+    return parse_rows({key.strip().lower(): value for key, value in row.items() if key} for row in reader)
+
+
+def missing_days(start, end):
+    """Days in [start, end] with no rate row."""
+    present = set(ZiGRateToUSD.objects.filter(date__range=(start, end)).values_list('date', flat=True))
+    return [day for day in _days(start, end) if day not in present]
+
+
+def import_rates(rates, fill=False, until=None):
+    """
+    Upserts {date: rate} in one INSERT ... ON CONFLICT(date) DO UPDATE.
+    With fill=True, days between the first imported date and `until` (default:
+    the last imported date) that have no rate get the previous day's rate.
+    Existing rows are never overwritten by filled values.
+    """
+    if not rates:
+        raise RateImportError(['no rates to import'])
+    start, end = min(rates), max(max(rates), until or max(rates))
+
+    with transaction.atomic():
+        existing = {row.date: row for row in ZiGRateToUSD.objects.filter(date__range=(start, end))}
+        gaps = [day for day in _days(start, end) if day not in rates and day not in existing]
+
+        rows = dict(rates)
+        if fill:
+            current = None
+            for day in _days(start, end):
+                if day in rates:
+                    current = rates[day]
+                elif day in existing:
+                    current = existing[day].rate
+                else:
+                    rows[day] = current # start is always an imported day, so current is set
+
+        ZiGRateToUSD.objects.bulk_create(
+            [ZiGRateToUSD(date=day, rate=rate) for day, rate in sorted(rows.items())],
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['rate'],
+        )
+        # bulk_create skips signals, so new (imported or filled) and changed rates are audited here
+        ids = dict(ZiGRateToUSD.objects.filter(date__range=(start, end)).values_list('date', 'id'))
+        audit.record_bulk(ZiGRateToUSD, {
+            ids[day]: audit.field_values(ZiGRateToUSD(id=ids[day], date=day, rate=rate))
+            for day, rate in rows.items()
+            if day not in existing
+        }, action='create')
+        audit.record_bulk(ZiGRateToUSD, {
+            existing[day].pk: {'rate': [existing[day].rate, rate]}
+            for day, rate in rates.items()
+            if day in existing and existing[day].rate != rate
+        })
+
+    return {
+        'from': start,
+        'to': end,
+        'imported': len(rates),
+        'created': sum(1 for day in rates if day not in existing),
+        'updated': sum(1 for day, rate in rates.items() if day in existing and existing[day].rate != rate),
+        'filled': len(gaps) if fill else 0,
+        'missing_days': [] if fill else gaps,
+    }
@@ -0,0 +1,107 @@
+"""
+Cached public job board.
+
+Anonymous visitors only ever see open jobs whose application deadline has not
+passed, so the whole board is rendered once and kept in the Django cache. The
+entry is dropped when a Job is saved or deleted (see signals.py) and expires on
+its own when the earliest listed deadline passes. Invalidation reaches every
+worker only when the cache is shared (see shared_cache.py).
+
+Anonymous list and detail reads never query Job once the board is built. With
+Redis or Memcached they touch no database at all; with the database cache
+(settings_production.py without DJANGO_REDIS_URL) each read is still one
+primary-key lookup in the cache table, in place of the Job query and
+serialization.
+"""
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from ..models import Job
+from ..serializers.job_serializer import JobSerializer
+
+CACHE_KEY = 'job_board:public'
+VALIDATORS_KEY = 'job_board:validators' # Outlives the board so Last-Modified never moves back
+MAX_CACHE_SECONDS = 60 * 60
+
+
+def _etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return '"%s"' % hashlib.md5(payload).hexdigest()
+
+
+def _seconds_until_expiry(jobs):
+    """Seconds until the first listed deadline passes (deadlines are inclusive)."""
+    if not jobs:
+        return MAX_CACHE_SECONDS
+    first_deadline = min(job.application_deadline for job in jobs)
+    expires = timezone.make_aware(datetime.combine(first_deadline + timedelta(days=1), time.min))
+    remaining = int((expires - timezone.now()).total_seconds())
+    return max(1, min(remaining, MAX_CACHE_SECONDS))
+
+
+def _open_jobs():
+    return Job.objects.filter(status='OP', application_deadline__gte=timezone.localdate()).order_by('-posted_date')
+
+
+def _last_modified(etag, previous):
+    """
+    Last-Modified of the listing: kept while its content is unchanged, otherwise
+    the build time, and always later than the previous value. Using the newest
+    surviving job instead would move it backwards when that job closes.
+    HTTP dates have 1 s resolution, hence the bump.
+    """
+    if previous and previous['etag'] == etag:
+        return previous['last_modified']
+    stamp = timezone.now().replace(microsecond=0)
+    if previous and stamp <= previous['last_modified']:
+        stamp = previous['last_modified'] + timedelta(seconds=1)
+    return stamp
+
+
+def _board(jobs, previous):
+    listing = JobSerializer(jobs, many=True).data
+    etag = _etag(listing)
+    return {
+        'list': listing,
+        'etag': etag,
+        'last_modified': _last_modified(etag, previous),
+        'jobs': {
+            job.id: {'data': data, 'etag': _etag(data), 'last_modified': job.updated_date}
+            for job, data in zip(jobs, listing)
+        },
+    }
+
+
+def build_public_board():
+    jobs = list(_open_jobs())
+    board = _board(jobs, cache.get(VALIDATORS_KEY))
+    cache.set(VALIDATORS_KEY, {'etag': board['etag'], 'last_modified': board['last_modified']}, None)
+    cache.set(CACHE_KEY, board, _seconds_until_expiry(jobs))
+    return board
+
+
+def get_public_board():
+    board = cache.get(CACHE_KEY)
+    if board is None:
+        board = build_public_board()
+    return board
+
+
+async def aget_public_board():
+    """get_public_board() for async views; the cache read and any rebuild are awaited."""
+    board = await cache.aget(CACHE_KEY)
+    if board is None:
+        jobs = [job async for job in _open_jobs()]
+        board = _board(jobs, await cache.aget(VALIDATORS_KEY))
+        await cache.aset(VALIDATORS_KEY, {'etag': board['etag'], 'last_modified': board['last_modified']}, None)
+        await cache.aset(CACHE_KEY, board, _seconds_until_expiry(jobs))
+    return board
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
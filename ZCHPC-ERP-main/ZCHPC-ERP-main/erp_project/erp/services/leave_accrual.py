@@ -0,0 +1,122 @@
+"""
+Monthly leave accrual.
+
+One run per month credits every active, in-contract employee with the monthly
+days for their employee_type (settings.LEAVE_ACCRUAL_POLICY), prorated when
+the contract starts or ends inside the month. On the first month of the leave
+year, balances above the type's carry-over cap expire first.
+
+Every entry is written to LeaveLedger and applied to Employees.leave_days,
+which stays the balance everything else reads. Balances move with
+leave_days = F('leave_days') + n, grouped by amount, so there is one UPDATE per
+distinct accrual instead of one per employee. The ledger's unique
+(employee, period, entry_type) makes a month idempotent: a re-run only picks up
+employees that have no accrual for it yet.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from ..models import Employees, LeaveLedger
+from . import audit, contracts
+from .periods import month_bounds
+
+CENT = Decimal('0.01')
+UPDATE_CHUNK = 500 # Keeps id__in lists under SQLite's parameter limit
+
+
+def policy_for(employee_type):
+    """(monthly_days, carry_over_cap) as Decimals for an employee_type."""
+    policies = getattr(settings, 'LEAVE_ACCRUAL_POLICY', {})
+    policy = policies.get(employee_type) or policies.get('default') or {}
+    cap = policy.get('carry_over_cap')
+    return Decimal(str(policy.get('monthly_days', 0))), (Decimal(str(cap)) if cap is not None else None)
+
+
+def contract_fraction(start, end, contract_from, contract_to):
+    """Share of the month [start, end] covered by the contract."""
+    first = max(start, contract_from) if contract_from else start
+    last = min(end, contract_to) if contract_to else end
+    if last < first:
+        return Decimal(0)
+    return Decimal((last - first).days + 1) / Decimal((end - start).days + 1)
+
+
+def employees_missing_accrual(period):
+    """Active employees in contract during the month with no accrual entry for it yet."""
+    start, end = month_bounds(period)
+    done = LeaveLedger.objects.filter(period=start, entry_type='accrual').values('employee_id')
+    return (
+        Employees.objects.filter(isActive=True)
+        .filter(contracts.in_contract_during(start, end))
+        .exclude(id__in=done)
+    )
+
+
+def _update_in_chunks(ids, **values):
+    for i in range(0, len(ids), UPDATE_CHUNK):
+        Employees.objects.filter(id__in=ids[i:i + UPDATE_CHUNK]).update(**values)
+
+
+def accrue(period, dry_run=False):
+    """
+    Runs accrual (and expiry, at the start of a leave year) for the month
+    containing `period`. Returns a summary; with dry_run nothing is written.
+    """
+    start, end = month_bounds(period)
+    new_leave_year = start.month == getattr(settings, 'LEAVE_YEAR_START_MONTH', 1)
+
+    with transaction.atomic():
+        rows = list(
+            employees_missing_accrual(start).order_by('id')
+            .values_list('id', 'employee_type', 'contractFrom', 'contractTo', 'leave_days')
+        )
+
+        entries = []
+        changes = {}
+        expire_to = defaultdict(list) # cap -> employee ids
+        add = defaultdict(list) # accrued days -> employee ids
+        expired_days = Decimal(0)
+        for employee_id, employee_type, contract_from, contract_to, balance in rows:
+            monthly, cap = policy_for(employee_type)
+            old = balance
+
+            if new_leave_year and cap is not None and balance > cap:
+                expired_days += balance - cap
+                entries.append(LeaveLedger(employee_id=employee_id, period=start, entry_type='expiry', days=cap - balance, balance=cap))
+                expire_to[cap].append(employee_id)
+                balance = cap
+
+            days = (monthly * contract_fraction(start, end, contract_from, contract_to)).quantize(CENT, rounding=ROUND_HALF_UP)
+            balance += days
+            # Zero accruals are still recorded so the month counts as done for the employee
+            entries.append(LeaveLedger(employee_id=employee_id, period=start, entry_type='accrual', days=days, balance=balance))
+            if days:
+                add[days].append(employee_id)
+            if balance != old:
+                changes[employee_id] = {'leave_days': [old, balance]}
+
+        if not dry_run:
+            # Ledger first: a concurrent run for the same month hits the unique
+            # constraint here and rolls back before touching any balance.
+            LeaveLedger.objects.bulk_create(entries, batch_size=1000)
+            for cap, ids in expire_to.items():
+                _update_in_chunks(ids, leave_days=cap)
+            for days, ids in add.items():
+                _update_in_chunks(ids, leave_days=F('leave_days') + days)
+            # QuerySet.update() bypasses signals, so hand the changes to the audit trail
+            audit.record_bulk(Employees, changes)
+
+    accruals = [entry for entry in entries if entry.entry_type == 'accrual']
+    return {
+        'period': start,
+        'employees': len(accruals),
+        'accrued_days': sum((entry.days for entry in accruals), Decimal(0)),
+        'expired_employees': len(entries) - len(accruals),
+        'expired_days': expired_days,
+        'updates': len(expire_to) + len(add),
+        'dry_run': dry_run,
+    }
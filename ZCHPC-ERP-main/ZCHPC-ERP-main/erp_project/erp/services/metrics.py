@@ -0,0 +1,186 @@
+"""
+Request metrics, exposed in Prometheus text format at /metrics.
+
+PerformanceMiddleware feeds every request's latency and response size, plus
+SQL and renderer timings for sampled requests, into the registry of the worker
+process that served it. Renderer time is DRF turning response.data into bytes;
+serializer.data runs inside the view and only shows in the request latency.
+
+A scrape is answered by whichever worker the server hands it to, so with more
+than one worker each registry alone is a random fraction of the traffic. Set
+PERF_METRICS_DIR (gunicorn.conf.py does) and every worker writes its registry
+to <pid>.json there at most once per FLUSH_SECONDS; /metrics then adds up all
+the files. Files of workers that exited are kept so their counts do not drop,
+and the directory is cleared when the server starts.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+# Latency buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLUSH_SECONDS = 1.0
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def dump(self):
+        return [self.counts, self.total, self.count]
+
+    def add(self, dumped):
+        counts, total, count = dumped
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.total += total
+        self.count += count
+
+
+class Summary:
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+
+    def dump(self):
+        return [self.total, self.count]
+
+    def add(self, dumped):
+        total, count = dumped
+        self.total += total
+        self.count += count
+
+
+class MetricsRegistry:
+    SERIES = ('latency', 'response_bytes', 'db_queries', 'db_seconds', 'render_seconds')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+        self.reset()
+
+    def reset(self):
+        self.latency = {} # (route, method, status) -> Histogram
+        self.response_bytes = {} # (route, method) -> Summary
+        self.db_queries = {} # (route, method) -> Summary, sampled requests only
+        self.db_seconds = {}
+        self.render_seconds = {}
+
+    def observe_request(self, route, method, status_code, seconds, size):
+        status = f'{status_code // 100}xx'
+        with self._lock:
+            self.latency.setdefault((route, method, status), Histogram()).observe(seconds)
+            self.response_bytes.setdefault((route, method), Summary()).observe(size)
+        self._maybe_flush()
+
+    def observe_sample(self, route, method, queries, db_seconds, render_seconds):
+        key = (route, method)
+        with self._lock:
+            self.db_queries.setdefault(key, Summary()).observe(queries)
+            self.db_seconds.setdefault(key, Summary()).observe(db_seconds)
+            self.render_seconds.setdefault(key, Summary()).observe(render_seconds)
+        self._maybe_flush()
+
+    def dump(self):
+        """JSON-ready copy of every series, read back by merge()."""
+        with self._lock:
+            return {
+                name: [[*key, metric.dump()] for key, metric in getattr(self, name).items()]
+                for name in self.SERIES
+            }
+
+    def merge(self, dumped):
+        """Adds another registry's dump() to this one."""
+        with self._lock:
+            for name in self.SERIES:
+                series = getattr(self, name)
+                kind = Histogram if name == 'latency' else Summary
+                for *key, values in dumped.get(name, ()):
+                    series.setdefault(tuple(key), kind()).add(values)
+
+    def flush(self, directory):
+        """Writes dump() to <directory>/<pid>.json, replacing this worker's previous file."""
+        self._next_flush = time.monotonic() + FLUSH_SECONDS
+        os.makedirs(directory, exist_ok=True)
+        # Written aside and renamed, so a scrape never reads half a file
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+            json.dump(self.dump(), f)
+        os.replace(f.name, os.path.join(directory, f'{os.getpid()}.json'))
+
+    def _maybe_flush(self):
+        directory = getattr(settings, 'PERF_METRICS_DIR', None)
+        if directory and time.monotonic() >= self._next_flush:
+            self.flush(directory)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            lines = [
+                '# HELP erp_http_request_duration_seconds Request latency by route.',
+                '# TYPE erp_http_request_duration_seconds histogram',
+            ]
+            for (route, method, status), hist in sorted(self.latency.items()):
+                labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), hist.counts):
+                    cumulative += count
+                    lines.append(f'erp_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'erp_http_request_duration_seconds_sum{{{labels}}} {hist.total:.6f}')
+                lines.append(f'erp_http_request_duration_seconds_count{{{labels}}} {hist.count}')
+
+            summaries = [
+                ('erp_http_response_size_bytes', 'Response body size by route.', self.response_bytes),
+                ('erp_db_queries_per_request', 'SQL queries per sampled request.', self.db_queries),
+                ('erp_db_duration_seconds', 'SQL time per sampled request.', self.db_seconds),
+                ('erp_renderer_duration_seconds', 'DRF renderer time per sampled request; excludes serializer.data.', self.render_seconds),
+            ]
+            for name, help_text, series in summaries:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} summary')
+                for (route, method), summary in sorted(series.items()):
+                    labels = f'route="{_escape(route)}",method="{method}"'
+                    lines.append(f'{name}_sum{{{labels}}} {summary.total:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {summary.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def exposition():
+    """
+    Prometheus text for the whole server: the sum of every worker's file in
+    PERF_METRICS_DIR, or this worker's registry when it is not set.
+    """
+    directory = getattr(settings, 'PERF_METRICS_DIR', None)
+    if not directory:
+        return registry.render()
+    registry.flush(directory) # This worker's file is up to date; the others lag by at most FLUSH_SECONDS
+    combined = MetricsRegistry()
+    for path in Path(directory).glob('*.json'):
+        combined.merge(json.loads(path.read_text()))
+    return combined.render()
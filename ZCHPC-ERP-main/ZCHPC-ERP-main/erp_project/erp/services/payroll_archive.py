@@ -0,0 +1,196 @@
+"""
+Hot/cold payroll storage.
+
+Closed periods (every record Paid) older than PAYROLL_ARCHIVE_AFTER_MONTHS are
+moved from Payroll into PayrollArchive, with their payslip lines inlined as
+JSON, so the live table only holds recent and open periods. A period lives in
+exactly one of the two tables. model_for(period) tells readers which one to
+query; both have the same column names, so the same filters and aggregates
+work on either. Reads that span periods (an employee's history) go through
+records(), which returns the matching rows of both tables in Payroll's order.
+Archived periods are never regenerated; see
+PayrollProcessor.employees_missing_payroll.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Count, F, Q, Value
+from django.utils.timezone import now
+
+from ..models import Payroll, PayrollArchive, PayrollLineItem
+from . import audit
+
+CHUNK_SIZE = 1000
+# Payroll columns copied to the archive (archived_id takes Payroll.id)
+COPIED_FIELDS = [field.attname for field in Payroll._meta.concrete_fields if field.attname != 'id']
+LINE_FIELDS = ['category', 'name', 'currency', 'amount']
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def is_archived(period):
+    return PayrollArchive.objects.filter(period=period).exists()
+
+
+async def ais_archived(period):
+    return await PayrollArchive.objects.filter(period=period).aexists()
+
+
+def model_for(period):
+    """Payroll or PayrollArchive, whichever holds `period`."""
+    return PayrollArchive if is_archived(period) else Payroll
+
+
+def combined(build, order_by=()):
+    """
+    build(model) returns a values() queryset; runs it over Payroll and
+    PayrollArchive as a single UNION ALL query, for reports spanning periods
+    that may be in either table.
+    """
+    queryset = build(Payroll).order_by().union(build(PayrollArchive).order_by(), all=True)
+    return queryset.order_by(*order_by) if order_by else queryset
+
+
+def _record_keys(filters):
+    """The matching rows of both tables in Payroll's order (-period, employee first name), as one UNION."""
+    def build(model):
+        archived = model is PayrollArchive
+        return model.objects.filter(**filters).values(
+            'period',
+            record_id=F('archived_id' if archived else 'id'),
+            archived=Value(archived, output_field=BooleanField()),
+            firstname=F('employee__firstname'),
+        )
+    return combined(build, order_by=('-period', 'firstname'))
+
+
+def _in_order(keys, live, archived):
+    rows = {(False, row.id): row for row in live}
+    rows.update({(True, row.archived_id): row for row in archived})
+    return [rows[(bool(key['archived']), key['record_id'])] for key in keys]
+
+
+def records(filters):
+    """
+    Payroll and PayrollArchive rows matching `filters` (with their employees),
+    merged in Payroll's order. Three queries, whichever table each period is in.
+    """
+    keys = list(_record_keys(filters))
+    live, archived = [], []
+    if not all(key['archived'] for key in keys):
+        live = Payroll.objects.filter(**filters).select_related('employee')
+    if any(key['archived'] for key in keys):
+        archived = PayrollArchive.objects.filter(**filters).select_related('employee')
+    return _in_order(keys, live, archived)
+
+
+async def arecords(filters):
+    keys = [key async for key in _record_keys(filters)]
+    live, archived = [], []
+    if not all(key['archived'] for key in keys):
+        live = [row async for row in Payroll.objects.filter(**filters).select_related('employee')]
+    if any(key['archived'] for key in keys):
+        archived = [row async for row in PayrollArchive.objects.filter(**filters).select_related('employee')]
+    return _in_order(keys, live, archived)
+
+
+def cutoff(months=None, today=None):
+    """First period that stays live: periods before it are old enough to archive."""
+    months = getattr(settings, 'PAYROLL_ARCHIVE_AFTER_MONTHS', 24) if months is None else months
+    first = (today or now().date()).replace(day=1)
+    index = first.year * 12 + first.month - 1 - months
+    return first.replace(year=index // 12, month=index % 12 + 1)
+
+
+def archivable_periods(months=None, today=None):
+    """Closed live periods older than the cutoff, oldest first."""
+    return list(
+        Payroll.objects.filter(period__lt=cutoff(months, today))
+        .values('period')
+        .annotate(unpaid=Count('id', filter=~Q(status='Paid')))
+        .filter(unpaid=0)
+        .order_by('period')
+        .values_list('period', flat=True)
+    )
+
+
+def _delete_period(model, period):
+    # Plain DELETE: QuerySet.delete() would load every row to send delete signals
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} WHERE period = %s',
+            [connection.ops.adapt_datefield_value(period)],
+        )
+        return cursor.rowcount
+
+
+def archive_period(period):
+    """Moves one closed period into the archive. Returns the number of records moved."""
+    from .payroll_processor import PayrollProcessor
+
+    with transaction.atomic():
+        # The run lock keeps payroll generation for this period out while rows move
+        PayrollProcessor._lock_run(period)
+        live = Payroll.objects.filter(period=period).order_by('id')
+        if live.exclude(status='Paid').exists():
+            raise ArchiveError(f'{period:%Y-%m} still has records that are not Paid')
+
+        moved = []
+        while True:
+            # Keyset pagination keeps memory bounded by CHUNK_SIZE
+            rows = list(live.filter(id__gt=moved[-1] if moved else 0).values('id', *COPIED_FIELDS)[:CHUNK_SIZE])
+            if not rows:
+                break
+            lines = {}
+            for item in (
+                PayrollLineItem.objects.filter(payroll_id__in=[row['id'] for row in rows])
+                .order_by('id').values('payroll_id', *LINE_FIELDS)
+            ):
+                lines.setdefault(item.pop('payroll_id'), []).append(item)
+            PayrollArchive.objects.bulk_create([
+                PayrollArchive(archived_id=row['id'], line_items=lines.get(row['id'], []), **{name: row[name] for name in COPIED_FIELDS})
+                for row in rows
+            ])
+            moved.extend(row['id'] for row in rows)
+
+        PayrollLineItem.objects.filter(payroll__period=period).delete()
+        _delete_period(Payroll, period)
+        audit.record_bulk(Payroll, {pk: {'archived': period.isoformat()} for pk in moved}, action='delete')
+    return len(moved)
+
+
+def restore_period(period):
+    """Moves an archived period back into Payroll (ids and payslip lines included)."""
+    with transaction.atomic():
+        archived = PayrollArchive.objects.filter(period=period).order_by('archived_id')
+        restored = []
+        while True:
+            rows = list(
+                archived.filter(archived_id__gt=restored[-1] if restored else 0)
+                .values('archived_id', 'line_items', *COPIED_FIELDS)[:CHUNK_SIZE]
+            )
+            if not rows:
+                break
+            Payroll.objects.bulk_create([
+                Payroll(id=row['archived_id'], **{name: row[name] for name in COPIED_FIELDS}) for row in rows
+            ])
+            PayrollLineItem.objects.bulk_create([
+                PayrollLineItem(payroll_id=row['archived_id'], **item) for row in rows for item in row['line_items']
+            ], batch_size=CHUNK_SIZE)
+            restored.extend(row['archived_id'] for row in rows)
+        _delete_period(PayrollArchive, period)
+        audit.record_bulk(Payroll, {pk: {'restored': period.isoformat()} for pk in restored}, action='create')
+    return len(restored)
+
+
+def archive(months=None, dry_run=False):
+    """Archives every eligible period. Returns {period: records moved} (or to be moved)."""
+    periods = archivable_periods(months)
+    if dry_run:
+        counts = dict(
+            Payroll.objects.filter(period__in=periods).values('period').annotate(records=Count('id'))
+            .order_by().values_list('period', 'records')
+        )
+        return {period: counts.get(period, 0) for period in periods}
+    return {period: archive_period(period) for period in periods}
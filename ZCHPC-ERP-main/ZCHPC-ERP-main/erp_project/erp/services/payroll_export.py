@@ -0,0 +1,230 @@
+"""
+Columnar export of payroll history for analytics.
+
+Payroll rows (live or archived) joined with the employee dimensions (department, position,
+employee_type) are written as one Parquet or Arrow IPC file per period, in a
+hive-style layout that pyarrow, DuckDB, Polars and Spark read as a partitioned
+dataset:
+
+    <out>/month=2024-03/payroll.parquet
+    <out>/_manifest.json     (underscore: dataset readers skip it)
+
+Rows are streamed from the database in chunks and written batch by batch, so
+memory stays bounded by the chunk size whatever the period size. The manifest
+remembers each period's row count, highest id and latest updated_at. An
+incremental run rewrites only periods whose fingerprint changed, and removes
+partitions for periods that no longer exist. Employee dimension edits do not
+change a fingerprint; use a full export to pick those up.
+
+pyarrow is optional and only imported here.
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.db.models import Count, Max
+from django.utils.timezone import now
+
+from ..models import Payroll
+from . import payroll_archive
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError: # Optional dependency
+    pa = None
+
+FORMATS = {'parquet': 'payroll.parquet', 'arrow': 'payroll.arrow'}
+MANIFEST = '_manifest.json'
+CHUNK_SIZE = 5000
+
+# (output column, queryset lookup, arrow type name)
+COLUMNS = [
+    ('payroll_id', 'id', 'int64'),
+    ('period', 'period', 'date'),
+    ('employee_id', 'employee__employeeid', 'string'),
+    ('department', 'employee__department', 'string'),
+    ('position', 'employee__position', 'string'),
+    ('employee_type', 'employee__employee_type', 'string'),
+    ('status', 'status', 'string'),
+    ('exchange_rate', 'exchange_rate', 'rate'),
+    ('base_salary_usd', 'base_salary_usd', 'money'),
+    ('allowances_usd', 'allowances_usd', 'money'),
+    ('tax_usd', 'tax_usd', 'money'),
+    ('nssa_usd', 'nssa_usd', 'money'),
+    ('pension_usd', 'pension_usd', 'money'),
+    ('other_deductions_usd', 'other_deductions_usd', 'money'),
+    ('net_salary_usd', 'net_salary_usd', 'money'),
+    ('employer_nssa_usd', 'employer_nssa_usd', 'money'),
+    ('employer_pension_usd', 'employer_pension_usd', 'money'),
+    ('base_salary_zig', 'base_salary_zig', 'money'),
+    ('allowances_zig', 'allowances_zig', 'money'),
+    ('tax_zig', 'tax_zig', 'money'),
+    ('nssa_zig', 'nssa_zig', 'money'),
+    ('pension_zig', 'pension_zig', 'money'),
+    ('other_deductions_zig', 'other_deductions_zig', 'money'),
+    ('net_salary_zig', 'net_salary_zig', 'money'),
+    ('employer_nssa_zig', 'employer_nssa_zig', 'money'),
+    ('employer_pension_zig', 'employer_pension_zig', 'money'),
+    ('created_at', 'created_at', 'timestamp'),
+    ('updated_at', 'updated_at', 'timestamp'),
+]
+
+
+class ExportError(Exception):
+    pass
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ExportError('Columnar export needs pyarrow. Install it with: pip install pyarrow')
+
+
+def schema():
+    _require_pyarrow()
+    types = {
+        'int64': pa.int64(),
+        'date': pa.date32(),
+        'string': pa.string(),
+        'money': pa.decimal128(12, 2),
+        'rate': pa.decimal128(10, 4),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in COLUMNS])
+
+
+def period_fingerprints():
+    """
+    {period: {'rows', 'max_id', 'last_update'}} for every period, live or archived,
+    from one grouped query. Archiving keeps ids and timestamps, so it leaves the fingerprint unchanged.
+    """
+    return {
+        row['period']: {
+            'rows': row['rows'],
+            'max_id': row['max_id'],
+            'last_update': row['last_update'].isoformat() if row['last_update'] else None,
+        }
+        for row in payroll_archive.combined(
+            lambda model: model.objects.values('period').annotate(
+                rows=Count('id'),
+                max_id=Max('id' if model is Payroll else 'archived_id'),
+                last_update=Max('updated_at'),
+            ),
+            order_by=('period',),
+        )
+    }
+
+
+def partition_name(period):
+    return f'month={period:%Y-%m}'
+
+
+def write_period(period, path, fmt='parquet', chunk_size=CHUNK_SIZE):
+    """Streams one period into a Parquet or Arrow file at `path`; returns the row count."""
+    _require_pyarrow()
+    target_schema = schema()
+    model = payroll_archive.model_for(period)
+    id_field = 'id' if model is Payroll else 'archived_id'
+    lookups = [id_field if lookup == 'id' else lookup for _, lookup, _ in COLUMNS]
+    rows = (
+        model.objects.filter(period=period)
+        .order_by(id_field) # Replaces Meta.ordering, which would sort by employee name
+        .values_list(*lookups)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    if fmt == 'parquet':
+        writer = pa.parquet.ParquetWriter(path, target_schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(path, target_schema)
+
+    written = 0
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                writer.write_batch(_batch(chunk, target_schema))
+                written += len(chunk)
+                chunk = []
+        if chunk or not written: # An empty period still gets a file with the schema
+            writer.write_batch(_batch(chunk, target_schema))
+            written += len(chunk)
+    finally:
+        writer.close()
+    return written
+
+
+def _batch(rows, target_schema):
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, target_schema)],
+        schema=target_schema,
+    )
+
+
+def read_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST
+    if not path.exists():
+        return {'format': None, 'periods': {}}
+    return json.loads(path.read_text())
+
+
+def export(out_dir, fmt='parquet', full=False, chunk_size=CHUNK_SIZE):
+    """
+    Writes changed (or, with full=True, all) periods under out_dir and updates
+    the manifest. Each file is written to a temporary name and renamed into
+    place, so readers never see a half-written partition.
+    """
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(FORMATS)}")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(out_dir)
+    if manifest.get('format') != fmt:
+        full = True # Switching format rewrites everything
+    known = manifest['periods']
+
+    current = period_fingerprints()
+    exported, skipped = [], []
+    for period, fingerprint in current.items():
+        key = f'{period:%Y-%m}'
+        previous = known.get(key)
+        if not full and previous and {k: previous.get(k) for k in fingerprint} == fingerprint:
+            skipped.append(key)
+            continue
+
+        partition = out_dir / partition_name(period)
+        partition.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=partition, prefix='.', suffix='.tmp') # Hidden from dataset readers
+        os.close(fd)
+        try:
+            rows = write_period(period, tmp, fmt, chunk_size)
+            os.replace(tmp, partition / FORMATS[fmt])
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        for name in FORMATS.values():
+            if name != FORMATS[fmt] and (partition / name).exists():
+                (partition / name).unlink()
+
+        known[key] = {**fingerprint, 'rows': rows, 'file': f'{partition_name(period)}/{FORMATS[fmt]}', 'exported_at': now().isoformat()}
+        exported.append(key)
+
+    live = {f'{period:%Y-%m}' for period in current}
+    removed = sorted(key for key in known if key not in live)
+    for key in removed:
+        shutil.rmtree(out_dir / f'month={key}', ignore_errors=True)
+        del known[key]
+
+    manifest = {'format': fmt, 'updated_at': now().isoformat(), 'periods': dict(sorted(known.items()))}
+    tmp = out_dir / ('.' + MANIFEST + '.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, out_dir / MANIFEST)
+
+    return {'exported': exported, 'skipped': skipped, 'removed': removed, 'format': fmt}
@@ -1,11 +1,18 @@
+from collections import Counter
 from datetime import datetime
 from django.db import transaction
 from django.utils.timezone import now
 from django.conf import settings
 from ..models import (
-    Employees, Payroll, ZiGRateToUSD,
-    EmployeeDeductables, NSSACap, PensionFund, TaxBracket
+    Employees, Payroll, PayrollLineItem, PayrollRun, ZiGRateToUSD,
+    NSSACap, PAYETaxCredit, PAYEThreshold, PensionFund, TaxBracket
 )
+from . import audit, contracts, exchange_rates, payroll_archive, periods
+from .deduction_evaluator import DeductionEvaluator
+
+class PAYEThresholdError(Exception):
+    """A PAYE threshold table whose bands cannot be turned into brackets."""
+
 
 class PayrollProcessor:
     @staticmethod
@@ -15,10 +22,35 @@ class PayrollProcessor:
         return ZiGRateToUSD.objects.order_by('-date').first()
 
     @staticmethod
-    def calculate_tax(amount, brackets):
-        print(f"[PayrollProcessor] Calculating tax for amount: {amount} with brackets: {brackets}")
+    def load_tax_brackets(currency, period):
+        """
+        Loads the latest bracket set active on `period` for a currency as
+        (upper, rate, deduction) tuples, the shape calculate_tax expects.
+        """
+        brackets = list(
+            TaxBracket.objects.filter(currency=currency, active_from__lte=period)
+            .order_by('-active_from', 'min_income')
+        )
+        if not brackets:
+            return []
+
+        latest_active_from = brackets[0].active_from
+        return [
+            (
+                float(b.max_income) if b.max_income is not None else float('inf'),
+                float(b.rate),
+                float(b.deduction),
+            )
+            for b in brackets if b.active_from == latest_active_from
+        ]
+
+    @staticmethod
+    def calculate_tax(amount, brackets, credit=0.0):
+        """
+        PAYE on `amount` from (upper, rate, deduction) brackets. Tax credits come
+        off the bracket tax before the AIDS levy is added.
+        """
         if not brackets:
-            print("[PayrollProcessor] No tax brackets provided for calculation.")
             return 0.0
 
         tax_payable = 0.0
@@ -28,47 +60,85 @@ class PayrollProcessor:
         for upper, rate, deduct in sorted_brackets:
             if amount <= upper:
                 base_tax = amount * rate - deduct
-                base_tax = max(base_tax, 0) # Tax cannot be negative
+                base_tax = max(base_tax - credit, 0) # Tax cannot be negative
                 aids_levy = base_tax * 0.03 # 3% AIDS Levy
-                total_tax = round(base_tax + aids_levy, 2)
-                print(f"[PayrollProcessor] Tax breakdown - Base: {base_tax}, AIDS Levy: {aids_levy}, Total: {total_tax}")
-                return total_tax
+                return round(base_tax + aids_levy, 2)
         return 0.0 # Should ideally not be reached if max_income is inf for last bracket
 
     @staticmethod
-    def get_nssa_contribution(salary: float, currency: str, period: datetime.date) -> dict:
-        print(f"[PayrollProcessor] NSSA Calculation - salary: {salary}, currency: {currency}")
-        
-        # Get the latest active NSSA cap for the period
-        nssa_cap_obj = NSSACap.objects.filter(active_from__lte=period).order_by('-active_from').first()
-        
+    def load_paye_rules():
+        """
+        Compiles PAYEThreshold and PAYETaxCredit once per run, keyed by the
+        deduction type an employee must carry to be eligible:
+          thresholds: {currency: {deduction_type_id: brackets}}, a band table
+                      that replaces the standard brackets for that currency
+          credits:    {deduction_type_id: {currency: amount}}
+        Threshold bands charge fixed_amount + rate on income above threshold_from,
+        which is rewritten into calculate_tax's (upper, rate, deduction) form.
+        Only the top band of a table is open-ended (threshold_to blank or 0);
+        any other layout raises PAYEThresholdError rather than being guessed at.
+        """
+        tables = {}
+        for band in PAYEThreshold.objects.select_related('deduction_type').order_by('deduction_type_id', 'currency', 'threshold_from'):
+            currency = "ZWG" if band.currency == "ZWL" else band.currency
+            tables.setdefault((band.deduction_type, currency), []).append(band)
+
+        thresholds = {"USD": {}, "ZWG": {}}
+        for (deduction_type, currency), bands in tables.items():
+            brackets = []
+            for position, band in enumerate(bands, start=1):
+                is_top = position == len(bands)
+                open_ended = not band.threshold_to # Blank or 0
+                if open_ended != is_top:
+                    raise PAYEThresholdError(
+                        f"{deduction_type.name} {currency} thresholds: only the top band may leave threshold_to "
+                        f"blank or 0 (band from {band.threshold_from})"
+                    )
+                if not open_ended and band.threshold_to <= band.threshold_from:
+                    raise PAYEThresholdError(
+                        f"{deduction_type.name} {currency} thresholds: band from {band.threshold_from} "
+                        f"ends at {band.threshold_to}"
+                    )
+                rate = float(band.rate)
+                upper = float('inf') if open_ended else float(band.threshold_to)
+                brackets.append((upper, rate, float(band.threshold_from) * rate - float(band.fixed_amount)))
+            thresholds[currency][deduction_type.id] = brackets
+
+        credits = {}
+        for credit in PAYETaxCredit.objects.order_by('id'):
+            amounts = credits.setdefault(credit.deduction_type_id, {"USD": 0.0, "ZWG": 0.0})
+            amounts["USD"] += float(credit.usd_amount)
+            amounts["ZWG"] += float(credit.zwl_amount)
+
+        return thresholds, credits
+
+    @staticmethod
+    def get_nssa_cap():
+        """Returns the NSSA cap currently in force (latest record wins)."""
+        return NSSACap.objects.order_by('-id').first()
+
+    @staticmethod
+    def get_nssa_contribution(salary: float, currency: str, nssa_cap_obj) -> dict:
+        empty = {
+            "currency": currency,
+            "pensionable_earnings": 0.0,
+            "employee_nssa": 0.0,
+            "employer_nssa": 0.0,
+            "total_nssa": 0.0
+        }
         if not nssa_cap_obj:
-            print("[PayrollProcessor] No NSSA Cap record found for period. Returning 0.")
-            return {
-                "currency": currency,
-                "pensionable_earnings": 0.0,
-                "employee_nssa": 0.0,
-                "employer_nssa": 0.0,
-                "total_nssa": 0.0
-            }
+            return empty
 
         rate = float(nssa_cap_obj.rate)
-        
+
         # Determine the ceiling based on currency
-        ceiling = 0.0
         if currency.upper() == "USD":
             ceiling = float(nssa_cap_obj.usd_cap)
-        elif currency.upper() == "ZWL" or currency.upper() == "ZIG": # Using ZIG to match current context
-            ceiling = float(nssa_cap_obj.zwl_cap) # Assuming zwl_cap now represents ZiG cap
+        elif currency.upper() in ("ZWL", "ZIG", "ZWG"):
+            ceiling = float(nssa_cap_obj.zwl_cap) # zwl_cap now represents the ZiG cap
         else:
             print(f"[PayrollProcessor] Unsupported NSSA currency: {currency}")
-            return {
-                "currency": currency,
-                "pensionable_earnings": 0.0,
-                "employee_nssa": 0.0,
-                "employer_nssa": 0.0,
-                "total_nssa": 0.0
-            }
+            return empty
 
         pensionable = min(salary, ceiling)
         employee_nssa = 0.0
@@ -79,124 +149,332 @@ class PayrollProcessor:
         if nssa_cap_obj.contribution_type in ["employer", "employee_and_employer"]:
             employer_nssa = round(pensionable * rate, 2)
 
-        result = {
+        return {
             "currency": currency,
             "pensionable_earnings": pensionable,
             "employee_nssa": employee_nssa,
             "employer_nssa": employer_nssa,
             "total_nssa": round(employee_nssa + employer_nssa, 2)
         }
-        print(f"[PayrollProcessor] NSSA result: {result}")
-        return result
 
     @staticmethod
     def get_pension_contribution(employee_deduction, salary, currency):
-        print(f"[PayrollProcessor] Calculating pension for {currency} salary: {salary}")
         if not employee_deduction or not employee_deduction.pension_fund:
-            print("[PayrollProcessor] No active pension deduction found for employee.")
             return 0.0
-        
+
         pension = employee_deduction.pension_fund
-        
+
         # Check if the pension fund applies to the current currency
         if pension.currency != currency.lower() and pension.currency != "both":
-            print(f"[PayrollProcessor] Pension fund '{pension.name}' does not match currency '{currency}'.")
             return 0.0
-            
+
         if not employee_deduction.pension_employee_contribution:
-            print("[PayrollProcessor] Employee pension contribution not active for this fund.")
             return 0.0
-            
+
         rate = float(pension.employee_rate)
-        contribution = round(float(salary) * rate, 2)
-        print(f"[PayrollProcessor] Pension contribution: {contribution}")
-        return contribution
+        return round(float(salary) * rate, 2)
 
     @staticmethod
-    @transaction.atomic
-    def create_employee_payroll(employee, period):
-        print(f"\n[PayrollProcessor] Creating payroll for employee: {employee.employeeid}, period: {period}")
+    def get_employer_pension_contribution(employee_deduction, salary, currency):
+        if not employee_deduction or not employee_deduction.pension_fund:
+            return 0.0
 
-        # Get relevant tax brackets for the period
-        usd_tax_brackets = Payroll.load_tax_brackets("USD", period)
-        zig_tax_brackets = Payroll.load_tax_brackets("ZWG", period) # Use ZWG as per your model choices
+        pension = employee_deduction.pension_fund
+        if pension.currency != currency.lower() and pension.currency != "both":
+            return 0.0
+
+        # The employer share is paid whether or not the employee contributes
+        return round(float(salary) * float(pension.employer_rate), 2)
+
+    @staticmethod
+    def load_run_context(period):
+        """
+        Loads the reference data every employee calculation needs, once per run:
+        tax brackets, PAYE thresholds and credits, exchange rate, NSSA cap and
+        active deductables by employee (with their medical aid, insurance and union rules).
+        """
+        # Raises rather than guessing when the period has no recent rate
+        exchange_rate = float(exchange_rates.rate_for(period))
+        print(f"[PayrollProcessor] Exchange rate used: {exchange_rate}")
 
-        try:
-            exchange_rate_obj = ZiGRateToUSD.objects.filter(date__lte=period).order_by('-date').first()
-            exchange_rate = float(exchange_rate_obj.rate) if exchange_rate_obj and exchange_rate_obj.rate is not None else 0.005
-            print(f"[PayrollProcessor] Exchange rate used: {exchange_rate}")
-        except Exception as e:
-            print(f"[PayrollProcessor] Error fetching exchange rate: {e}. Using default.")
-            exchange_rate = 0.005
+        # One query for every active deductable and the plans/options it references
+        evaluator = DeductionEvaluator.load()
 
-        deducts = EmployeeDeductables.objects.filter(employee=employee, active=True).first()
+        paye_thresholds, paye_credits = PayrollProcessor.load_paye_rules()
+
+        # Deduction types that are computed as statutory lines, not charged at their flat amount
+        statutory_types = set(NSSACap.objects.values_list('deduction_type_id', flat=True))
+        statutory_types.update(paye_credits, paye_thresholds["USD"], paye_thresholds["ZWG"])
+
+        return {
+            "statutory_deduction_types": statutory_types,
+            "usd_tax_brackets": PayrollProcessor.load_tax_brackets("USD", period),
+            "zig_tax_brackets": PayrollProcessor.load_tax_brackets("ZWG", period), # ZWG as per TaxBracket choices
+            "exchange_rate": exchange_rate,
+            "nssa_cap": PayrollProcessor.get_nssa_cap(),
+            "deductables": evaluator.deductables,
+            "deduction_evaluator": evaluator,
+            "paye_thresholds": paye_thresholds,
+            "paye_credits": paye_credits,
+        }
+
+    @staticmethod
+    def build_employee_payroll(employee, period, context):
+        """
+        Calculates one employee's payroll from a preloaded run context. Does not save.
+        The payslip lines are left on payroll.pending_line_items for save_line_items().
+        Allowances and deductions are read through employee.allowances/deductions,
+        so prefetch them when building many payrolls.
+        """
+        deducts = context["deductables"].get(employee.id)
+        lines = []
+
+        def line(category, name, currency, amount):
+            if amount:
+                lines.append(PayrollLineItem(category=category, name=name, currency=currency, amount=amount))
+
+        # Allowance and deduction types carry flat USD amounts
+        usd_allowances = 0.0
+        for allowance in employee.allowances.all():
+            usd_allowances += float(allowance.amount)
+            line('allowance', allowance.name, 'USD', allowance.amount)
+        usd_other_deductions = 0.0
+        deduction_type_ids = set()
+        for deduction in employee.deductions.all():
+            deduction_type_ids.add(deduction.id)
+            if deduction.id in context["statutory_deduction_types"]:
+                continue
+            usd_other_deductions += float(deduction.amount)
+            line('deduction', deduction.name, 'USD', deduction.amount)
 
-        # USD Calculations
         usd_salary = float(employee.usd_salary or 0)
-        usd_tax = PayrollProcessor.calculate_tax(usd_salary, usd_tax_brackets)
+        zig_salary = float(employee.zig_salary or 0)
 
-        usd_nssa_data = PayrollProcessor.get_nssa_contribution(usd_salary, "USD", period)
-        usd_nssa = usd_nssa_data['employee_nssa'] # Extract employee portion
+        # PAYE credits and threshold tables apply to employees carrying their deduction type.
+        # Credits add up; of several threshold tables the one giving the lowest tax applies.
+        usd_tables, zig_tables = [], []
+        usd_credit = zig_credit = 0.0
+        for deduction_type_id in sorted(deduction_type_ids):
+            credit = context["paye_credits"].get(deduction_type_id)
+            if credit:
+                usd_credit += credit["USD"]
+                zig_credit += credit["ZWG"]
+            if deduction_type_id in context["paye_thresholds"]["USD"]:
+                usd_tables.append(context["paye_thresholds"]["USD"][deduction_type_id])
+            if deduction_type_id in context["paye_thresholds"]["ZWG"]:
+                zig_tables.append(context["paye_thresholds"]["ZWG"][deduction_type_id])
+        usd_tables = usd_tables or [context["usd_tax_brackets"]]
+        zig_tables = zig_tables or [context["zig_tax_brackets"]]
 
+        # Medical aid, insurance and union come off net pay; benefits are taxed only
+        evaluated = context["deduction_evaluator"].evaluate(employee.id, {"USD": usd_salary, "ZWG": zig_salary})
+        usd_extra = evaluated.get("USD")
+        zig_extra = evaluated.get("ZWG")
+        for currency, result in evaluated.items():
+            for name, amount in result.deductions:
+                line('deduction', name, currency, amount)
+            for name, amount in result.benefits:
+                line('benefit', name, currency, amount)
+        if usd_extra:
+            usd_other_deductions += usd_extra.total_deductions
+        zig_other_deductions = zig_extra.total_deductions if zig_extra else 0.0
+        usd_benefits = usd_extra.total_benefits if usd_extra else 0.0
+        zig_benefits = zig_extra.total_benefits if zig_extra else 0.0
+
+        # USD Calculations (allowances and benefits are taxable, NSSA and pension use basic salary)
+        usd_tax = min(PayrollProcessor.calculate_tax(usd_salary + usd_allowances + usd_benefits, brackets, usd_credit) for brackets in usd_tables)
+        usd_nssa_split = PayrollProcessor.get_nssa_contribution(usd_salary, "USD", context["nssa_cap"])
+        usd_nssa = usd_nssa_split['employee_nssa']
         usd_pension = PayrollProcessor.get_pension_contribution(deducts, usd_salary, "USD")
-        
-        usd_net = max(usd_salary - usd_tax - usd_nssa - usd_pension, 0)
-        print(f"[PayrollProcessor] USD: gross={usd_salary}, tax={usd_tax}, nssa={usd_nssa}, pension={usd_pension}, net={usd_net}")
+        usd_net = max(usd_salary + usd_allowances - usd_tax - usd_nssa - usd_pension - usd_other_deductions, 0)
 
         # ZIG Calculations
-        zig_salary = float(employee.zig_salary or 0)
-        zig_tax = PayrollProcessor.calculate_tax(zig_salary, zig_tax_brackets)
+        zig_tax = min(PayrollProcessor.calculate_tax(zig_salary + zig_benefits, brackets, zig_credit) for brackets in zig_tables)
+        zig_nssa_split = PayrollProcessor.get_nssa_contribution(zig_salary, "ZWG", context["nssa_cap"])
+        zig_nssa = zig_nssa_split['employee_nssa']
+        zig_pension = PayrollProcessor.get_pension_contribution(deducts, zig_salary, "ZWL") # Matches PensionFund currency choices
+        zig_net = max(zig_salary - zig_tax - zig_nssa - zig_pension - zig_other_deductions, 0)
 
-        zig_nssa_data = PayrollProcessor.get_nssa_contribution(zig_salary, "ZWG", period) # Use ZWG here
-        zig_nssa = zig_nssa_data['employee_nssa'] # Extract employee portion
+        employer = {
+            "employer_nssa_usd": usd_nssa_split['employer_nssa'],
+            "employer_nssa_zig": zig_nssa_split['employer_nssa'],
+            "employer_pension_usd": PayrollProcessor.get_employer_pension_contribution(deducts, usd_salary, "USD"),
+            "employer_pension_zig": PayrollProcessor.get_employer_pension_contribution(deducts, zig_salary, "ZWL"),
+        }
 
-        zig_pension = PayrollProcessor.get_pension_contribution(deducts, zig_salary, "ZWL") # Currency for get_pension_contribution matches model choice
-        
-        zig_net = max(zig_salary - zig_tax - zig_nssa - zig_pension, 0)
-        print(f"[PayrollProcessor] ZIG: gross={zig_salary}, tax={zig_tax}, nssa={zig_nssa}, pension={zig_pension}, net={zig_net}")
+        for currency, tax, nssa, pension in (("USD", usd_tax, usd_nssa, usd_pension), ("ZWG", zig_tax, zig_nssa, zig_pension)):
+            line('statutory', 'PAYE', currency, tax)
+            line('statutory', 'NSSA', currency, nssa)
+            line('statutory', 'Pension', currency, pension)
+        line('employer', 'Employer NSSA', 'USD', employer["employer_nssa_usd"])
+        line('employer', 'Employer NSSA', 'ZWG', employer["employer_nssa_zig"])
+        line('employer', 'Employer Pension', 'USD', employer["employer_pension_usd"])
+        line('employer', 'Employer Pension', 'ZWG', employer["employer_pension_zig"])
 
-        payroll = Payroll.objects.create(
+        payroll = Payroll(
             employee=employee,
             period=period,
-            base_salary_usd=usd_salary,
-            net_salary_usd=usd_net,
+            base_salary_usd=round(usd_salary, 2),
+            net_salary_usd=round(usd_net, 2),
             tax_usd=usd_tax,
             nssa_usd=usd_nssa,
             pension_usd=usd_pension,
+            allowances_usd=round(usd_allowances, 2),
+            other_deductions_usd=round(usd_other_deductions, 2),
 
-            base_salary_zig=zig_salary,
-            net_salary_zig=zig_net,
+            base_salary_zig=round(zig_salary, 2),
+            net_salary_zig=round(zig_net, 2),
             tax_zig=zig_tax,
             nssa_zig=zig_nssa,
             pension_zig=zig_pension,
+            other_deductions_zig=round(zig_other_deductions, 2),
 
-            exchange_rate=exchange_rate,
+            exchange_rate=context["exchange_rate"],
             status='Draft',
             notes='Auto-generated payroll',
+            **employer,
         )
-        print(f"[PayrollProcessor] Payroll created for {employee.employeeid}")
+        payroll.pending_line_items = lines
         return payroll
 
+    @staticmethod
+    def save_line_items(payrolls):
+        """Writes the pending lines of saved payrolls in one bulk insert."""
+        items = []
+        for payroll in payrolls:
+            for item in getattr(payroll, 'pending_line_items', ()):
+                item.payroll_id = payroll.pk
+                items.append(item)
+            payroll.pending_line_items = []
+        PayrollLineItem.objects.bulk_create(items, batch_size=1000)
+        return len(items)
+
+    @staticmethod
+    def create_employee_payroll(employee, period):
+        print(f"[PayrollProcessor] Creating payroll for employee: {employee.employeeid}, period: {period}")
+        context = PayrollProcessor.load_run_context(period)
+        payroll = PayrollProcessor.build_employee_payroll(employee, period, context)
+        with transaction.atomic():
+            payroll.save()
+            PayrollProcessor.save_line_items([payroll])
+        return payroll
+
+    @staticmethod
+    def normalize_period(period):
+        if not period:
+            return now().replace(day=1).date()
+        return period.replace(day=1)
+
+    @staticmethod
+    def employees_missing_payroll(period):
+        """
+        Active employees in contract during the period's month that have no payroll
+        record for it yet. Archived periods are final: nobody is missing from them.
+        """
+        if payroll_archive.is_archived(period):
+            return Employees.objects.none()
+        existing = Payroll.objects.filter(period=period).values('employee_id')
+        start, end = periods.month_bounds(period)
+        return (
+            Employees.objects.filter(isActive=True)
+            .filter(contracts.in_contract_during(start, end))
+            .exclude(id__in=existing)
+        )
+
+    @staticmethod
+    def _lock_run(period):
+        """
+        Takes the per-period run lock. The PayrollRun row is created once and then
+        locked with SELECT ... FOR UPDATE, so a concurrent run for the same period
+        blocks here until the first one commits, then finds nothing left to do.
+        Must be called inside transaction.atomic().
+        """
+        run, _ = PayrollRun.objects.get_or_create(period=period)
+        return PayrollRun.objects.select_for_update().get(pk=run.pk)
+
     @staticmethod
     def create_monthly_payroll(period):
+        period = PayrollProcessor.normalize_period(period)
         print(f"\n[PayrollProcessor] Generating payroll for period: {period}")
-        if not period:
-            period = now().replace(day=1).date()
-        else:
-            period = period.replace(day=1)
-        print(f"[PayrollProcessor] Normalized period: {period}")
 
-        employees = Employees.objects.filter(isActive=True)
-        count = 0
+        # Cheap unlocked check first so the common "already generated" case
+        # never queues behind the run lock.
+        if not PayrollProcessor.employees_missing_payroll(period).exists():
+            print("[PayrollProcessor] Payroll already complete, nothing to generate")
+            return 0
 
-        for emp in employees:
-            print(f"\n[PayrollProcessor] Processing employee: {emp.employeeid}")
-            if Payroll.objects.filter(employee=emp, period=period).exists():
-                print("[PayrollProcessor] Payroll already exists, skipping")
-                continue
+        with transaction.atomic():
+            run = PayrollProcessor._lock_run(period)
+            run.status = 'running'
+            run.started_at = now()
+            run.save(update_fields=['status', 'started_at'])
 
-            PayrollProcessor.create_employee_payroll(emp, period)
-            count += 1
+            # Re-check under the lock: a concurrent run may have filled the period.
+            employees = list(
+                PayrollProcessor.employees_missing_payroll(period).prefetch_related('allowances', 'deductions')
+            )
+            payrolls = []
+            if employees:
+                context = PayrollProcessor.load_run_context(period)
+                created_at = now() # Shared stamp identifies this run's rows below
+                payrolls = [
+                    PayrollProcessor.build_employee_payroll(emp, period, context)
+                    for emp in employees
+                ]
+                for payroll in payrolls:
+                    payroll.created_at = payroll.updated_at = created_at
+                # Conflict-ignore insert: rows created by anything outside the
+                # lock (e.g. a manual POST) are skipped instead of aborting the run.
+                Payroll.objects.bulk_create(payrolls, batch_size=500, ignore_conflicts=True)
 
-        print(f"[PayrollProcessor] Payroll generation complete. Total new records: {count}")
-        return count
\ No newline at end of file
+                # ignore_conflicts returns no ids, so fetch the ones this run inserted
+                ids = dict(
+                    Payroll.objects.filter(period=period, created_at=created_at)
+                    .order_by().values_list('employee_id', 'id')
+                )
+                payrolls = [p for p in payrolls if p.employee_id in ids]
+                for payroll in payrolls:
+                    payroll.pk = ids[payroll.employee_id]
+                PayrollProcessor.save_line_items(payrolls)
+                # bulk_create bypasses signals, so hand the new records to the audit trail
+                audit.record_bulk(Payroll, {payroll.pk: audit.field_values(payroll) for payroll in payrolls}, action='create')
+
+            run.status = 'completed'
+            run.created_count = len(payrolls)
+            run.finished_at = now()
+            run.save(update_fields=['status', 'created_count', 'finished_at'])
+
+        print(f"[PayrollProcessor] Payroll generation complete. Total new records: {len(payrolls)}")
+        return len(payrolls)
+
+    @staticmethod
+    def transition_status(queryset, new_status):
+        """
+        Moves every record in the queryset that is allowed to reach new_status
+        with a single UPDATE ... WHERE status IN (...), touching only status and
+        updated_at. Returns counts per outcome; records whose current status does
+        not allow the transition are reported under "rejected" by status.
+        """
+        sources = Payroll.allowed_source_statuses(new_status)
+        queryset = queryset.order_by() # Drop Meta.ordering, it would join employees in
+
+        with transaction.atomic():
+            current = list(queryset.values_list('id', 'status'))
+            updated = queryset.filter(status__in=sources).update(status=new_status, updated_at=now())
+            # QuerySet.update() bypasses signals, so hand the changes to the audit trail
+            audit.record_bulk(Payroll, {
+                pk: {'status': [old_status, new_status]}
+                for pk, old_status in current if old_status in sources
+            })
+
+        by_status = Counter(old_status for _, old_status in current)
+
+        return {
+            "updated": updated,
+            "unchanged": by_status.get(new_status, 0),
+            "rejected": {
+                old_status: total for old_status, total in by_status.items()
+                if old_status != new_status and old_status not in sources
+            },
+            "matched": sum(by_status.values()),
+        }
@@ -0,0 +1,338 @@
+"""
+Payroll reports that aggregate in the database.
+
+Consolidated report: payroll amounts grouped by (period, department) in one
+query, with the ZiG components converted to USD using one rate per period
+(or one chosen date) from the rate series.
+
+Department cost report: headcount and cost of employment per department and
+period in both currencies, from one grouped query. Closed periods (every
+record Paid) are cached and reused while their record count and last update
+are unchanged. Rows are grouped by each employee's current department, so
+moving an employee to another department drops the cache (see signals.py).
+
+Variance report: employees whose net pay moved more than a threshold since the
+previous period, plus new starters and leavers, filtered in SQL.
+
+Every report reads archived periods (PayrollArchive) as well as live ones.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import (
+    Case, CharField, Count, DecimalField, Exists, F, FilteredRelation, Max, OuterRef, Q, Sum, Value, When
+)
+from django.db.models.functions import Abs
+
+from ..models import Payroll, PayrollArchive
+from . import payroll_archive
+from .exchange_rates import RateSeries
+
+CENT = Decimal('0.01')
+DEPARTMENT_COST_CACHE_KEY = 'payroll_reports:department_costs:%s:%s' # (department version, period)
+DEPARTMENT_VERSION_KEY = 'payroll_reports:department_version'
+DEPARTMENT_COST_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Report column -> (USD field, ZiG field)
+AMOUNT_COLUMNS = {
+    'gross': ('base_salary_usd', 'base_salary_zig'),
+    'allowances': ('allowances_usd', 'allowances_zig'),
+    'tax': ('tax_usd', 'tax_zig'),
+    'nssa': ('nssa_usd', 'nssa_zig'),
+    'pension': ('pension_usd', 'pension_zig'),
+    'other_deductions': ('other_deductions_usd', 'other_deductions_zig'),
+    'employer_nssa': ('employer_nssa_usd', 'employer_nssa_zig'),
+    'employer_pension': ('employer_pension_usd', 'employer_pension_zig'),
+    'net': ('net_salary_usd', 'net_salary_zig'),
+}
+
+
+def _empty_totals():
+    totals = {'headcount': 0}
+    for column in AMOUNT_COLUMNS:
+        totals[column] = {'usd': Decimal(0), 'zig': Decimal(0), 'usd_equivalent': Decimal(0)}
+    return totals
+
+
+def _add(totals, row):
+    totals['headcount'] += row['headcount']
+    for column in AMOUNT_COLUMNS:
+        for key in ('usd', 'zig', 'usd_equivalent'):
+            if totals[column][key] is not None and row[column][key] is not None:
+                totals[column][key] += row[column][key]
+            else:
+                totals[column][key] = None # Unconvertible somewhere in this group
+
+
+def period_department_totals(start, end, departments=None):
+    """One row per (period, department) with summed USD and ZiG amounts."""
+    sums = {}
+    for usd_field, zig_field in AMOUNT_COLUMNS.values():
+        sums[usd_field] = Sum(usd_field)
+        sums[zig_field] = Sum(zig_field)
+
+    def build(model):
+        queryset = model.objects.filter(period__gte=start, period__lte=end)
+        if departments:
+            queryset = queryset.filter(employee__department__in=departments)
+        return queryset.values('period', department=F('employee__department')).annotate(headcount=Count('id'), **sums)
+
+    return list(payroll_archive.combined(build, order_by=('period', 'department')))
+
+
+def consolidated_report(start, end, departments=None, rate_date=None):
+    """
+    USD-equivalent payroll totals per period, per department and overall.
+    ZiG amounts are converted at each period's rate, or at the rate on
+    rate_date for every period when one is given.
+    """
+    series = RateSeries.load(until=max(end, rate_date) if rate_date else end)
+    fixed_rate = series.rate_on(rate_date) if rate_date else None
+
+    rows, periods, departments_totals, missing_rates = [], {}, {}, set()
+    overall = _empty_totals()
+    for group in period_department_totals(start, end, departments):
+        rate = fixed_rate if rate_date else series.rate_on(group['period'])
+        if rate is None:
+            missing_rates.add(rate_date or group['period'])
+
+        row = {'period': group['period'], 'department': group['department'], 'headcount': group['headcount'], 'rate': rate}
+        for column, (usd_field, zig_field) in AMOUNT_COLUMNS.items():
+            # SQLite sums decimals as floats; round back to cents
+            usd = Decimal(group[usd_field] or 0).quantize(CENT)
+            zig = Decimal(group[zig_field] or 0).quantize(CENT)
+            row[column] = {
+                'usd': usd,
+                'zig': zig,
+                'usd_equivalent': (usd + zig * rate).quantize(CENT) if rate is not None else None,
+            }
+        rows.append(row)
+
+        period_totals = periods.setdefault(group['period'], dict(_empty_totals(), period=group['period'], rate=rate))
+        _add(period_totals, row)
+        _add(departments_totals.setdefault(group['department'], dict(_empty_totals(), department=group['department'])), row)
+        _add(overall, row)
+
+    return {
+        'from': start,
+        'to': end,
+        'rate_basis': 'date' if rate_date else 'period',
+        'rate_date': rate_date,
+        'rows': rows,
+        'periods': list(periods.values()),
+        'departments': sorted(departments_totals.values(), key=lambda d: d['department']),
+        'total': overall,
+        'missing_rates': sorted(missing_rates),
+    }
+
+
+# Department cost report: column -> source field per currency
+COST_COLUMNS = {
+    'gross': ('base_salary_usd', 'base_salary_zig'),
+    'allowances': ('allowances_usd', 'allowances_zig'),
+    'paye': ('tax_usd', 'tax_zig'),
+    'employer_nssa': ('employer_nssa_usd', 'employer_nssa_zig'),
+    'employer_pension': ('employer_pension_usd', 'employer_pension_zig'),
+    'net': ('net_salary_usd', 'net_salary_zig'),
+}
+CURRENCIES = {'usd': 0, 'zig': 1}
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(CENT)
+
+
+def _period_states(start, end):
+    """{period: (closed, record count, last update)} for periods with payroll in the range."""
+    return {
+        row['period']: (row['unpaid'] == 0, row['records'], row['last_update'])
+        for row in payroll_archive.combined(
+            lambda model: model.objects.filter(period__gte=start, period__lte=end)
+            .values('period')
+            .annotate(records=Count('id'), unpaid=Count('id', filter=~Q(status='Paid')), last_update=Max('updated_at'))
+        )
+    }
+
+
+def _department_cost_rows(periods):
+    """Cost rows for every department in the given periods, from one grouped query."""
+    sums = {}
+    for currency, index in CURRENCIES.items():
+        for column, fields in COST_COLUMNS.items():
+            sums[f'{column}_{currency}'] = Sum(fields[index])
+
+    rows = {}
+    for group in payroll_archive.combined(
+        lambda model: model.objects.filter(period__in=periods)
+        .values('period', department=F('employee__department'))
+        .annotate(headcount=Count('id'), **sums),
+        order_by=('period', 'department'),
+    ):
+        row = {'department': group['department'], 'headcount': group['headcount']}
+        for currency in CURRENCIES:
+            amounts = {column: _money(group[f'{column}_{currency}']) for column in COST_COLUMNS}
+            amounts['total_cost'] = (
+                amounts['gross'] + amounts['allowances'] + amounts['employer_nssa'] + amounts['employer_pension']
+            )
+            row[currency] = amounts
+        rows.setdefault(group['period'], []).append(row)
+    return rows
+
+
+def department_changed():
+    """Drops every cached department cost result by moving to a new department version."""
+    try:
+        cache.incr(DEPARTMENT_VERSION_KEY)
+    except ValueError:
+        cache.set(DEPARTMENT_VERSION_KEY, 2, None)
+
+
+def department_costs(start, end, departments=None):
+    """
+    Cost of employment per department for each period in [start, end], plus a
+    per-department trend across the range. Only periods without a cached
+    result are aggregated, all in a single query.
+    """
+    states = _period_states(start, end)
+    version = cache.get(DEPARTMENT_VERSION_KEY, 1)
+    closed_keys = {
+        period: DEPARTMENT_COST_CACHE_KEY % (version, period.isoformat())
+        for period, state in states.items() if state[0]
+    }
+    cached = cache.get_many(list(closed_keys.values()))
+
+    by_period = {}
+    for period, key in closed_keys.items():
+        entry = cached.get(key)
+        if entry is not None and entry['state'] == states[period]:
+            by_period[period] = entry['rows']
+
+    stale = [period for period in states if period not in by_period]
+    if stale:
+        computed = _department_cost_rows(stale)
+        for period in stale:
+            by_period[period] = computed.get(period, [])
+        cache.set_many({
+            closed_keys[period]: {'state': states[period], 'rows': by_period[period]}
+            for period in stale if period in closed_keys
+        }, DEPARTMENT_COST_CACHE_TIMEOUT)
+
+    periods, trend = [], {}
+    for period in sorted(by_period):
+        rows = [row for row in by_period[period] if not departments or row['department'] in departments]
+        periods.append({'period': period, 'closed': states[period][0], 'departments': rows})
+        for row in rows:
+            trend.setdefault(row['department'], []).append({
+                'period': period,
+                'headcount': row['headcount'],
+                'total_cost_usd': row['usd']['total_cost'],
+                'total_cost_zig': row['zig']['total_cost'],
+            })
+
+    return {
+        'from': start,
+        'to': end,
+        'periods': periods,
+        'trend': [{'department': name, 'series': series} for name, series in sorted(trend.items())],
+        'cached_periods': len(states) - len(stale),
+    }
+
+
+def previous_period(period):
+    return period.replace(year=period.year - 1, month=12) if period.month == 1 else period.replace(month=period.month - 1)
+
+
+def _change(current, previous):
+    if current is None or previous is None:
+        return None, None
+    current, previous = _money(current), _money(previous)
+    change = current - previous
+    percent = round(change / previous * 100, 2) if previous else None
+    return change, percent
+
+
+def payroll_variance(period, threshold_percent):
+    """
+    Compares each employee's net pay in `period` with the previous period.
+    Returns records whose USD or ZiG net moved by more than threshold_percent,
+    new starters (no previous record) and leavers (no current record). The
+    comparison (a self-join) and filtering run in one UNION query; unchanged rows never
+    leave the database.
+    """
+    previous = previous_period(period)
+    # Either period may have been archived; both tables share column names
+    current_model = payroll_archive.model_for(period)
+    previous_model = payroll_archive.model_for(previous)
+    prior_relation = 'employee__payrolls' if previous_model is Payroll else 'employee__archived_payrolls'
+    id_field = {Payroll: 'id', PayrollArchive: 'archived_id'} # Archived rows keep their payroll id here
+    factor = Value(Decimal(str(threshold_percent)) / 100, output_field=DecimalField())
+    columns = ['kind', 'payroll_id', 'employee_ref', 'employeeid', 'name', 'surname', 'department',
+               'net_usd', 'net_zig', 'prev_net_usd', 'prev_net_zig']
+
+    current = (
+        current_model.objects.filter(period=period)
+        # LEFT JOIN to the same employee's previous record (a self-join through employee)
+        .annotate(prior=FilteredRelation(prior_relation, condition=Q(**{f'{prior_relation}__period': previous})))
+        .annotate(
+            prior_id=F('prior__id'),
+            prev_net_usd=F('prior__net_salary_usd'),
+            prev_net_zig=F('prior__net_salary_zig'),
+        )
+        # |new - old| > old * threshold, which also catches a move up from zero
+        .annotate(
+            usd_excess=Abs(F('net_salary_usd') - F('prev_net_usd')) - F('prev_net_usd') * factor,
+            zig_excess=Abs(F('net_salary_zig') - F('prev_net_zig')) - F('prev_net_zig') * factor,
+        )
+        .filter(Q(prior_id__isnull=True) | Q(usd_excess__gt=0) | Q(zig_excess__gt=0))
+        .annotate(
+            kind=Case(When(prior_id__isnull=True, then=Value('new_starter')), default=Value('changed'), output_field=CharField()),
+            payroll_id=F(id_field[current_model]), employee_ref=F('employee_id'), employeeid=F('employee__employeeid'),
+            name=F('employee__firstname'), surname=F('employee__surname'), department=F('employee__department'),
+            net_usd=F('net_salary_usd'), net_zig=F('net_salary_zig'),
+        )
+        .values(*columns)
+        .order_by() # Compound statements only take an outer ORDER BY
+    )
+    null_amount = Value(None, output_field=DecimalField())
+    leavers = (
+        previous_model.objects.filter(period=previous)
+        .exclude(Exists(current_model.objects.filter(employee=OuterRef('employee'), period=period)))
+        .annotate(
+            kind=Value('leaver', output_field=CharField()),
+            payroll_id=F(id_field[previous_model]), employee_ref=F('employee_id'), employeeid=F('employee__employeeid'),
+            name=F('employee__firstname'), surname=F('employee__surname'), department=F('employee__department'),
+            net_usd=null_amount, net_zig=null_amount,
+            prev_net_usd=F('net_salary_usd'), prev_net_zig=F('net_salary_zig'),
+        )
+        .values(*columns)
+        .order_by()
+    )
+
+    result = {'changed': [], 'new_starter': [], 'leaver': []}
+    for row in current.union(leavers, all=True).order_by('department', 'name'):
+        change_usd, percent_usd = _change(row['net_usd'], row['prev_net_usd'])
+        change_zig, percent_zig = _change(row['net_zig'], row['prev_net_zig'])
+        result[row['kind']].append({
+            'payroll_id': row['payroll_id'],
+            'employee_id': row['employee_ref'],
+            'employeeid': row['employeeid'],
+            'employee_name': f"{row['name']} {row['surname']}",
+            'department': row['department'],
+            'net_usd': row['net_usd'] if row['net_usd'] is None else _money(row['net_usd']),
+            'previous_net_usd': row['prev_net_usd'] if row['prev_net_usd'] is None else _money(row['prev_net_usd']),
+            'change_usd': change_usd,
+            'change_usd_percent': percent_usd,
+            'net_zig': row['net_zig'] if row['net_zig'] is None else _money(row['net_zig']),
+            'previous_net_zig': row['prev_net_zig'] if row['prev_net_zig'] is None else _money(row['prev_net_zig']),
+            'change_zig': change_zig,
+            'change_zig_percent': percent_zig,
+        })
+
+    return {
+        'period': period,
+        'previous_period': previous,
+        'threshold_percent': threshold_percent,
+        'changed': result['changed'],
+        'new_starters': result['new_starter'],
+        'leavers': result['leaver'],
+    }
@@ -0,0 +1,14 @@
+"""
+Date helpers for monthly periods.
+
+Payroll, leave accrual and the reports all key their rows by a period date
+(the first of the month).
+"""
+import calendar
+from datetime import date
+
+
+def month_bounds(period):
+    """(first day, last day) of the month containing period."""
+    start = period.replace(day=1)
+    return start, date(start.year, start.month, calendar.monthrange(start.year, start.month)[1])
@@ -0,0 +1,129 @@
+"""
+Applicant funnel statistics per job and per department.
+
+Per-job counts come from one grouped query with conditional aggregation, and
+departments are rolled up from those rows in Python. Results are cached until an
+applicant or job changes (see signals.py).
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import now
+
+from ..models import Applicant, Job
+
+CACHE_VERSION_KEY = 'recruitment_analytics:version'
+CACHE_TIMEOUT = 60 * 60
+
+# Funnel stages in order; an applicant at a later stage has passed the earlier ones
+FUNNEL_STAGES = ['NEW', 'REV', 'INT', 'OFF', 'HIR']
+STATUS_FIELDS = {
+    'NEW': 'new_count',
+    'REV': 'review_count',
+    'INT': 'interview_count',
+    'OFF': 'offer_count',
+    'HIR': 'hired_count',
+    'REJ': 'rejected_count',
+}
+COUNT_FIELDS = ['applicant_count'] + list(STATUS_FIELDS.values())
+
+
+def invalidate():
+    """Drops every cached result by moving to a new cache version."""
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CACHE_VERSION_KEY, 2, None)
+
+
+def _cache_key(days):
+    version = cache.get_or_set(CACHE_VERSION_KEY, 1, None)
+    return f'recruitment_analytics:{version}:{days}'
+
+
+def _with_rates(row):
+    """Adds stage conversion rates (share of applicants that reached each stage)."""
+    total = row['applicant_count']
+    reached = 0
+    rates = {}
+    # Walk backwards so each stage includes everyone who went further
+    for stage in reversed(FUNNEL_STAGES[1:]):
+        reached += row[STATUS_FIELDS[stage]]
+        rates[STATUS_FIELDS[stage].replace('_count', '_rate')] = round(reached / total, 4) if total else 0.0
+    row['conversion'] = dict(reversed(list(rates.items())))
+
+    hired = row['hired_count']
+    seconds = row.pop('time_to_hire_total')
+    # Applicants created already Hired get hired_at a moment before application_date
+    row['avg_days_to_hire'] = round(max(seconds, 0) / hired / 86400, 1) if hired and seconds is not None else None
+    return row
+
+
+def job_funnels():
+    """One row per job with applicant counts by status, from a single grouped query."""
+    time_to_hire = ExpressionWrapper(
+        F('applicants__hired_at') - F('applicants__application_date'), output_field=DurationField()
+    )
+    annotations = {
+        'applicant_count': Count('applicants'),
+        'time_to_hire_total': Sum(time_to_hire, filter=Q(applicants__hired_at__isnull=False)),
+    }
+    for status, field in STATUS_FIELDS.items():
+        annotations[field] = Count('applicants', filter=Q(applicants__status=status))
+
+    rows = list(
+        Job.objects.order_by('-posted_date')
+        .values('id', 'title', 'department', 'status', 'application_deadline')
+        .annotate(**annotations)
+    )
+    for row in rows:
+        total = row['time_to_hire_total']
+        row['time_to_hire_total'] = total.total_seconds() if total is not None else None
+    return rows
+
+
+def department_funnels(job_rows):
+    """Rolls per-job rows up to departments without another query."""
+    departments = {}
+    for row in job_rows:
+        dept = departments.setdefault(row['department'], dict(
+            {field: 0 for field in COUNT_FIELDS}, department=row['department'], job_count=0, time_to_hire_total=None
+        ))
+        dept['job_count'] += 1
+        for field in COUNT_FIELDS:
+            dept[field] += row[field]
+        if row['time_to_hire_total'] is not None:
+            dept['time_to_hire_total'] = (dept['time_to_hire_total'] or 0) + row['time_to_hire_total']
+    return sorted(departments.values(), key=lambda d: d['department'])
+
+
+def applications_per_day(days):
+    since = now() - timedelta(days=days)
+    return [
+        {'date': row['day'], 'count': row['count']}
+        for row in Applicant.objects.filter(application_date__gte=since)
+        .annotate(day=TruncDate('application_date'))
+        .values('day')
+        .annotate(count=Count('id'))
+        .order_by('day')
+    ]
+
+
+def recruitment_summary(days=30):
+    key = _cache_key(days)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    job_rows = job_funnels()
+    departments = department_funnels(job_rows)
+    summary = {
+        'jobs': [_with_rates(row) for row in job_rows],
+        'departments': [_with_rates(row) for row in departments],
+        'applications_per_day': applications_per_day(days),
+        'generated_at': now(),
+    }
+    cache.set(key, summary, CACHE_TIMEOUT)
+    return summary
@@ -0,0 +1,192 @@
+"""
+Declarative reference data (tax brackets, NSSA caps, pension funds, payslip items).
+
+Reference sets are JSON or YAML files with a version and one list of rows per
+section, e.g.
+
+    {
+        "version": "2024.04",
+        "deduction_types": [{"name": "NSSA Contribution", "amount": 0}],
+        "nssa_caps": [{"deduction_type": "NSSA Contribution", "contribution_type": "employee",
+                       "usd_cap": 700, "zwl_cap": 0, "rate": 0.045}],
+        "tax_brackets": [{"currency": "USD", "active_from": "2024-01-01", "min_income": 0, ...}]
+    }
+
+Rows are matched to existing records by a natural key. Each section costs one
+SELECT; only new rows are inserted (bulk_create) and only changed rows are
+updated (bulk_update), so loading an unchanged set writes nothing. Rows are
+never deleted: a new tax table is a new set of brackets with a later
+active_from, and the old ones stay for recalculating past periods.
+"""
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+
+from django.db import transaction
+
+from ..models import AllowanceType, DeductionType, NSSACap, PayrollPeriod, PensionFund, TaxBracket
+from . import audit
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'reference_data'
+
+
+@dataclass(frozen=True)
+class Section:
+    model: type
+    key: tuple # Natural key fields
+    references: dict = field(default_factory=dict) # FK field -> (model, lookup field) for rows naming a related record
+
+
+# Applied in this order, so referenced rows exist before the rows that point at them
+SECTIONS = {
+    'allowance_types': Section(AllowanceType, ('name',)),
+    'deduction_types': Section(DeductionType, ('name',)),
+    'payroll_periods': Section(PayrollPeriod, ('name',)),
+    'pension_funds': Section(PensionFund, ('id',)),
+    'nssa_caps': Section(
+        NSSACap, ('deduction_type', 'contribution_type'),
+        references={'deduction_type': (DeductionType, 'name')},
+    ),
+    'tax_brackets': Section(TaxBracket, ('currency', 'active_from', 'min_income')),
+}
+
+
+class ReferenceDataError(Exception):
+    pass
+
+
+def read_file(path):
+    path = Path(path)
+    if path.suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ReferenceDataError(f'{path.name}: PyYAML is required to read YAML reference data.')
+        with path.open() as handle:
+            data = yaml.safe_load(handle)
+    else:
+        with path.open() as handle:
+            data = json.load(handle, parse_float=Decimal) # Money values stay exact
+
+    if not isinstance(data, dict):
+        raise ReferenceDataError(f'{path.name}: expected a mapping of section name to rows.')
+    unknown = set(data) - set(SECTIONS) - {'version'}
+    if unknown:
+        raise ReferenceDataError(f'{path.name}: unknown sections {", ".join(sorted(unknown))}.')
+    return data
+
+
+def default_files():
+    return sorted(p for p in DATA_DIR.iterdir() if p.suffix in ('.json', '.yaml', '.yml'))
+
+
+def _resolve_references(section, rows):
+    """Replaces related-record names with ids, one query per referenced model."""
+    rows = [dict(row) for row in rows]
+    for field_name, (model, lookup) in section.references.items():
+        names = {row[field_name] for row in rows if row.get(field_name) is not None}
+        ids = dict(model.objects.filter(**{f'{lookup}__in': names}).values_list(lookup, 'pk'))
+        missing = names - set(ids)
+        if missing:
+            raise ReferenceDataError(
+                f'{section.model.__name__}.{field_name}: no {model.__name__} named {", ".join(sorted(map(str, missing)))}.'
+            )
+        for row in rows:
+            if row.get(field_name) is not None:
+                row[f'{field_name}_id'] = ids[row.pop(field_name)]
+    return rows
+
+
+def _clean(section, row):
+    """Converts raw values to the model's Python types so they compare with loaded records."""
+    fields = {f.attname: f for f in section.model._meta.concrete_fields}
+    for name in section.references:
+        fields.setdefault(name, fields[f'{name}_id'])
+    cleaned = {}
+    for name, value in row.items():
+        if name not in fields:
+            raise ReferenceDataError(f'{section.model.__name__}: unknown field "{name}".')
+        model_field = fields[name]
+        if isinstance(value, float):
+            value = str(value) # YAML floats; avoids binary noise in DecimalFields
+        cleaned[model_field.attname] = model_field.to_python(value) if value is not None else None
+    return cleaned
+
+
+def _key_attnames(section):
+    return tuple(f'{name}_id' if name in section.references else name for name in section.key)
+
+
+def sync_section(name, rows):
+    """Brings one model in line with the given rows. Returns (created, updated)."""
+    section = SECTIONS[name]
+    model = section.model
+    key_fields = _key_attnames(section)
+    rows = [_clean(section, row) for row in _resolve_references(section, rows)]
+
+    existing = {}
+    for obj in model.objects.all():
+        # Duplicates from earlier manual entry: the first one is kept in sync
+        existing.setdefault(tuple(getattr(obj, f) for f in key_fields), obj)
+
+    to_create, to_update, changes_by_pk, changed_fields = [], [], {}, set()
+    seen = set()
+    for row in rows:
+        missing = [f for f in key_fields if f not in row]
+        if missing:
+            raise ReferenceDataError(f'{model.__name__}: row {row} is missing key field(s) {", ".join(missing)}.')
+        key = tuple(row[f] for f in key_fields)
+        if key in seen:
+            raise ReferenceDataError(f'{model.__name__}: duplicate row for {key}.')
+        seen.add(key)
+
+        obj = existing.get(key)
+        if obj is None:
+            to_create.append(model(**row))
+            continue
+
+        changes = {
+            attname: [getattr(obj, attname), value]
+            for attname, value in row.items()
+            if getattr(obj, attname) != value
+        }
+        if changes:
+            for attname, (_, value) in changes.items():
+                setattr(obj, attname, value)
+            to_update.append(obj)
+            changes_by_pk[obj.pk] = changes
+            changed_fields.update(changes)
+
+    if to_create:
+        model.objects.bulk_create(to_create)
+        audit.record_bulk(model, {
+            obj.pk: {f.attname: getattr(obj, f.attname) for f in model._meta.concrete_fields}
+            for obj in to_create if obj.pk is not None
+        }, action='create')
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(changed_fields))
+        audit.record_bulk(model, changes_by_pk)
+    return len(to_create), len(to_update)
+
+
+def load(paths=None, dry_run=False):
+    """
+    Applies the reference files in one transaction (rolled back when dry_run).
+    Returns [(file name, version, {section: (created, updated)})].
+    """
+    paths = list(paths) if paths else default_files()
+    documents = [(Path(path).name, read_file(path)) for path in paths]
+
+    results = []
+    with transaction.atomic():
+        for file_name, data in documents:
+            counts = {}
+            for name in SECTIONS:
+                if name in data:
+                    counts[name] = sync_section(name, data[name] or [])
+            results.append((file_name, data.get('version'), counts))
+        if dry_run:
+            # Applied for real so later sections can reference earlier ones, then discarded
+            transaction.set_rollback(True)
+    return results
@@ -0,0 +1,145 @@
+"""
+Full-text search over employees and applicants.
+
+On SQLite each searchable model has an FTS5 table (created in migration 0009)
+whose rowid is the model's primary key, so a single row can be replaced or
+removed by key when signals fire. Queries use prefix matching and bm25 ranking.
+Other databases fall back to unindexed icontains lookups.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from ..models import Applicant, Employees
+
+EMPLOYEE_TABLE = 'erp_employee_search'
+APPLICANT_TABLE = 'erp_applicant_search'
+
+# bm25 column weights: name, identifiers, details
+RANK_WEIGHTS = '10.0, 5.0, 1.0'
+
+MAX_RESULTS = 100
+
+EMPLOYEE_INDEX_SQL = f"""
+    INSERT OR REPLACE INTO {EMPLOYEE_TABLE} (rowid, name, identifiers, details)
+    SELECT id,
+           firstname || ' ' || surname,
+           employeeid || ' ' || email || ' ' || COALESCE(nationalid, ''),
+           department || ' ' || position
+    FROM erp_employees
+"""
+
+APPLICANT_INDEX_SQL = f"""
+    INSERT OR REPLACE INTO {APPLICANT_TABLE} (rowid, name, identifiers, details)
+    SELECT a.id, a.full_name, a.email, j.title
+    FROM erp_applicant a INNER JOIN erp_job j ON j.id = a.job_id
+"""
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Turns free text into an FTS5 query where every word is a quoted prefix term."""
+    terms = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+# ---- index maintenance (called from signals)
+
+def index_employee(employee_id):
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(EMPLOYEE_INDEX_SQL + " WHERE id = %s", [employee_id])
+
+
+def index_applicant(applicant_id):
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(APPLICANT_INDEX_SQL + " WHERE a.id = %s", [applicant_id])
+
+
+def index_job_applicants(job_id):
+    """Re-indexes a job's applicants, whose documents include the job title."""
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(APPLICANT_INDEX_SQL + " WHERE a.job_id = %s", [job_id])
+
+
+def remove(table, object_id):
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [object_id])
+
+
+def rebuild():
+    """Rebuilds both indexes from scratch. Returns (employees, applicants) indexed."""
+    if not fts_enabled():
+        return 0, 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {EMPLOYEE_TABLE}")
+        cursor.execute(EMPLOYEE_INDEX_SQL)
+        employees = cursor.rowcount
+        cursor.execute(f"DELETE FROM {APPLICANT_TABLE}")
+        cursor.execute(APPLICANT_INDEX_SQL)
+        applicants = cursor.rowcount
+        cursor.execute(f"INSERT INTO {EMPLOYEE_TABLE}({EMPLOYEE_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"INSERT INTO {APPLICANT_TABLE}({APPLICANT_TABLE}) VALUES ('optimize')")
+    return employees, applicants
+
+
+# ---- queries
+
+def _ranked_ids(table, match, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({table}, {RANK_WEIGHTS}) AS score FROM {table} "
+            f"WHERE {table} MATCH %s ORDER BY score LIMIT %s",
+            [match, limit],
+        )
+        return cursor.fetchall()
+
+
+def _in_rank_order(queryset, ranked):
+    objects = queryset.in_bulk([object_id for object_id, _ in ranked])
+    return [(objects[object_id], -score) for object_id, score in ranked if object_id in objects]
+
+
+def search_employees(text, limit=20):
+    """Returns [(employee, score)] best match first."""
+    queryset = Employees.objects.only(
+        'id', 'employeeid', 'firstname', 'surname', 'email', 'department', 'position', 'isActive'
+    )
+    if fts_enabled():
+        match = build_match_query(text)
+        if not match:
+            return []
+        return _in_rank_order(queryset, _ranked_ids(EMPLOYEE_TABLE, match, limit))
+
+    condition = Q()
+    for term in text.split():
+        condition &= (
+            Q(firstname__icontains=term) | Q(surname__icontains=term) | Q(employeeid__icontains=term)
+            | Q(email__icontains=term) | Q(nationalid__icontains=term)
+            | Q(department__icontains=term) | Q(position__icontains=term)
+        )
+    return [(employee, 0.0) for employee in queryset.filter(condition).order_by('firstname')[:limit]]
+
+
+def search_applicants(text, limit=20):
+    """Returns [(applicant, score)] best match first."""
+    queryset = Applicant.objects.select_related('job').only(
+        'id', 'full_name', 'email', 'status', 'job__id', 'job__title'
+    )
+    if fts_enabled():
+        match = build_match_query(text)
+        if not match:
+            return []
+        return _in_rank_order(queryset, _ranked_ids(APPLICANT_TABLE, match, limit))
+
+    condition = Q()
+    for term in text.split():
+        condition &= Q(full_name__icontains=term) | Q(email__icontains=term) | Q(job__title__icontains=term)
+    return [(applicant, 0.0) for applicant in queryset.filter(condition).order_by('full_name')[:limit]]
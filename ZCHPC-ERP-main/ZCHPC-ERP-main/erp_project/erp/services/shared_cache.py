@@ -0,0 +1,68 @@
+"""
+Whether the default cache is shared by every worker process.
+
+Invalidation of the cached job board and recruitment analytics, and token
+revocation markers, go through the Django cache. With a per-process backend
+(LocMemCache, DummyCache) they only reach the worker that made the change, so
+production settings configure Redis or the database cache instead.
+
+The token cache additionally needs the shared cache to be in memory (Redis,
+Memcached): it checks a revocation marker on every request, and with the
+database cache that check is itself a query.
+"""
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+PER_PROCESS_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+IN_MEMORY_BACKENDS = {
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django_redis.cache.RedisCache',
+}
+TOKEN_AUTHENTICATION = 'erp.authentication.CachedTokenAuthentication'
+
+
+def is_shared(alias='default'):
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+    return backend not in PER_PROCESS_BACKENDS
+
+
+def is_shared_in_memory(alias='default'):
+    """Shared and answered without a database query (Redis, Memcached)."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') in IN_MEMORY_BACKENDS
+
+
+@register('caches', deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared():
+        return []
+    return [Warning(
+        'The default cache is per-process.',
+        hint=(
+            'With several workers, job board and analytics invalidation only reach the worker that '
+            'made the change. Configure a shared cache (DJANGO_REDIS_URL or the database cache, '
+            'see settings_production.py).'
+        ),
+        id='erp.W001',
+    )]
+
+
+@register('caches', deploy=True)
+def check_token_cache(app_configs, **kwargs):
+    authentication = getattr(settings, 'REST_FRAMEWORK', {}).get('DEFAULT_AUTHENTICATION_CLASSES', [])
+    if TOKEN_AUTHENTICATION not in authentication or is_shared_in_memory():
+        return []
+    return [Error(
+        'CachedTokenAuthentication needs Redis or Memcached as the default cache.',
+        hint=(
+            'Without one it reads the token from the database on every request (one query, as '
+            "DRF's TokenAuthentication). Set DJANGO_REDIS_URL, or use "
+            "rest_framework.authentication.TokenAuthentication instead."
+        ),
+        id='erp.E002',
+    )]
@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from rest_framework.authtoken.models import Token
+
+from .authentication import revoke_user_tokens
+
+from .models import Applicant, CustomUser, EmployeeDeductables, Employees, Job, Payroll, TaxBracket, ZiGRateToUSD
+from .services import audit, job_board, payroll_reports, recruitment_analytics, search
+
+# ---- audit trail
+AUDITED_MODELS = [Employees, Payroll, EmployeeDeductables, TaxBracket, ZiGRateToUSD]
+
+
+def audit_snapshot(sender, instance, raw=False, **kwargs):
+    if not raw: # Skip fixture loading
+        audit.take_snapshot(instance)
+
+
+def audit_save(sender, instance, created, raw=False, **kwargs):
+    if not raw: # Skip fixture loading
+        audit.record_save(instance, created)
+
+
+def audit_delete(sender, instance, **kwargs):
+    audit.record_delete(instance)
+
+
+def audit_employee_m2m(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        field_name = 'allowances' if sender is Employees.allowances.through else 'deductions'
+        ids = getattr(instance, field_name).values_list('id', flat=True)
+        audit.record_related(instance, field_name, list(ids))
+
+
+for model in AUDITED_MODELS:
+    # Loaded records diff against their loaded values; only never-loaded instances read the row
+    pre_save.connect(audit_snapshot, sender=model, dispatch_uid=f'audit_snapshot_{model.__name__}')
+    post_save.connect(audit_save, sender=model, dispatch_uid=f'audit_save_{model.__name__}')
+    post_delete.connect(audit_delete, sender=model, dispatch_uid=f'audit_delete_{model.__name__}')
+
+m2m_changed.connect(audit_employee_m2m, sender=Employees.allowances.through, dispatch_uid='audit_employee_allowances')
+m2m_changed.connect(audit_employee_m2m, sender=Employees.deductions.through, dispatch_uid='audit_employee_deductions')
+
+
+# ---- full-text search index
+def index_employee(sender, instance, raw=False, **kwargs):
+    search.index_employee(instance.pk)
+
+
+def unindex_employee(sender, instance, **kwargs):
+    search.remove(search.EMPLOYEE_TABLE, instance.pk)
+
+
+def index_applicant(sender, instance, raw=False, **kwargs):
+    search.index_applicant(instance.pk)
+
+
+def unindex_applicant(sender, instance, **kwargs):
+    search.remove(search.APPLICANT_TABLE, instance.pk)
+
+
+def index_job_applicants(sender, instance, created, raw=False, **kwargs):
+    if not created: # A new job has no applicants yet
+        search.index_job_applicants(instance.pk)
+
+
+post_save.connect(index_employee, sender=Employees, dispatch_uid='search_index_employee')
+post_delete.connect(unindex_employee, sender=Employees, dispatch_uid='search_unindex_employee')
+post_save.connect(index_applicant, sender=Applicant, dispatch_uid='search_index_applicant')
+post_delete.connect(unindex_applicant, sender=Applicant, dispatch_uid='search_unindex_applicant')
+post_save.connect(index_job_applicants, sender=Job, dispatch_uid='search_index_job_applicants')
+
+
+# ---- cached recruitment analytics
+def invalidate_recruitment_analytics(sender, **kwargs):
+    recruitment_analytics.invalidate()
+
+
+for model in (Job, Applicant):
+    post_save.connect(invalidate_recruitment_analytics, sender=model, dispatch_uid=f'recruitment_analytics_save_{model.__name__}')
+    post_delete.connect(invalidate_recruitment_analytics, sender=model, dispatch_uid=f'recruitment_analytics_delete_{model.__name__}')
+
+
+# ---- cached public job board
+def invalidate_job_board(sender, **kwargs):
+    job_board.invalidate()
+
+
+post_save.connect(invalidate_job_board, sender=Job, dispatch_uid='job_board_save')
+post_delete.connect(invalidate_job_board, sender=Job, dispatch_uid='job_board_delete')
+
+
+# ---- cached department cost report
+def track_department_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None: # A new employee has no payroll in any period yet
+        return
+    if update_fields is not None and 'department' not in update_fields:
+        return
+    # Runs after audit_snapshot, so records that were never loaded have their stored values too
+    if getattr(instance, '_loaded_values', {}).get('department') != instance.department:
+        # After commit, so a report run in between cannot cache the old grouping under the new version
+        transaction.on_commit(payroll_reports.department_changed)
+
+
+pre_save.connect(track_department_change, sender=Employees, dispatch_uid='department_costs_employee_department')
+
+
+# ---- cached token authentication
+def revoke_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # Logging in only touches last_login; anything else may be a deactivation or password change
+    if not created and update_fields != frozenset(['last_login']):
+        revoke_user_tokens(instance.pk)
+
+
+def revoke_on_token_delete(sender, instance, **kwargs):
+    revoke_user_tokens(instance.user_id)
+
+
+post_save.connect(revoke_on_user_save, sender=CustomUser, dispatch_uid='token_cache_user_save')
+post_delete.connect(revoke_on_token_delete, sender=Token, dispatch_uid='token_cache_token_delete')
@@ -1,3 +1,1066 @@
-from django.test import TestCase
+import json
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, time as clock, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import parse_http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .authentication import REVOKED_KEY, CachedTokenAuthentication, token_cache
+from .models import (
+    AllowanceType, AuditLog, CustomUser, DeductionType, EmployeeDeductables, Employees, InsuranceOption, Job, LeaveLedger,
+    MedicalAidPlan, MedicalAidProvider, NSSACap, PAYETaxCredit, PAYEThreshold, PensionFund, Payroll, PayrollLineItem, TaxBracket,
+    Union, ZiGRateToUSD,
+)
+from .renderers import ORJSONRenderer
+from .serializers.employee_serializers import EmployeeRegistrationSerializer
+from .serializers.tax_tables_serializers import EmployeeSerializer
+from .services import job_board, leave_accrual, metrics, payroll_archive, payroll_export, payroll_reports, shared_cache
+from .services.deduction_evaluator import DeductionEvaluator
+from .services.payroll_processor import PAYEThresholdError, PayrollProcessor
+from .view import payroll_view
+
+PERIOD = date(2024, 3, 1)
+
+
+def make_employee(n):
+    return Employees.objects.create(
+        firstname=f'First{n}', surname=f'Last{n}', email=f'employee{n}@example.com',
+        nationalid=f'ID{n}', phone='0770000000', position='Clerk', department='HR',
+    )
+
+
+def make_payroll(employee, status, period=PERIOD):
+    return Payroll.objects.create(
+        employee=employee, period=period, status=status,
+        base_salary_usd=1000, net_salary_usd=900, base_salary_zig=0, net_salary_zig=0, exchange_rate=1,
+    )
+
+
+class BulkPayrollStatusTests(TestCase):
+    url = '/payroll/status/bulk/'
+
+    def setUp(self):
+        self.client = APIClient()
+        statuses = ['Draft', 'Draft', 'Pending', 'Processed', 'Paid', 'Failed']
+        self.payrolls = [make_payroll(make_employee(n), status) for n, status in enumerate(statuses)]
+
+    def post(self, body):
+        return self.client.post(self.url, body, format='json')
+
+    def statuses(self):
+        return dict(Payroll.objects.values_list('id', 'status'))
+
+    def test_allowed_source_statuses_follow_the_transition_table(self):
+        self.assertEqual(Payroll.allowed_source_statuses('Pending'), ['Draft'])
+        self.assertEqual(Payroll.allowed_source_statuses('Paid'), ['Processed'])
+        self.assertEqual(sorted(Payroll.allowed_source_statuses('Failed')), ['Draft', 'Pending', 'Processed'])
+        self.assertEqual(Payroll.allowed_source_statuses('Draft'), ['Failed'])
+
+    def test_period_transition_counts_outcomes(self):
+        response = self.post({'status': 'Pending', 'period': '2024-03'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['unchanged'], 1)
+        self.assertEqual(response.data['rejected'], {'Processed': 1, 'Paid': 1, 'Failed': 1})
+        self.assertEqual(response.data['matched'], 6)
+        self.assertNotIn('not_found', response.data)
+        self.assertEqual(list(self.statuses().values()).count('Pending'), 3)
+
+    def test_rejected_records_keep_their_status(self):
+        paid = self.payrolls[4]
+        response = self.post({'status': 'Draft', 'ids': [paid.id]})
+
+        self.assertEqual(response.data['updated'], 0)
+        self.assertEqual(response.data['rejected'], {'Paid': 1})
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, 'Paid')
+
+    def test_ids_report_not_found(self):
+        processed = self.payrolls[3]
+        response = self.post({'status': 'Paid', 'ids': [processed.id, processed.id, 999999]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['matched'], 1)
+        self.assertEqual(response.data['not_found'], 1)
+
+    def test_period_and_ids_combine(self):
+        make_payroll(make_employee(99), 'Draft', period=date(2024, 4, 1))
+        draft = self.payrolls[0]
+        response = self.post({'status': 'Pending', 'period': '2024-03', 'ids': [draft.id]})
+
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['matched'], 1)
+
+    def test_invalid_requests_are_rejected_before_any_update(self):
+        before = self.statuses()
+        for body in (
+            {'status': 'Pending', 'ids': 5},
+            {'status': 'Pending', 'ids': ['x']},
+            {'status': 'Pending', 'ids': [True]},
+            {'status': 'Pending', 'ids': [1.5]},
+            {'status': 'Unknown', 'period': '2024-03'},
+            {'status': 'Pending'},
+            {'status': 'Pending', 'ids': []},
+            {'status': 'Pending', 'period': '03/2024'},
+        ):
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+        self.assertEqual(self.statuses(), before)
+
+
+class MissingExchangeRateTests(TestCase):
+
+    def setUp(self):
+        make_employee(1)
+
+    def generate(self):
+        request = APIRequestFactory().post('/', {'period': '2024-03'}, format='json')
+        return payroll_view.generate_monthly_payroll(request)
+
+    def test_missing_rate_is_a_conflict_like_payroll_list(self):
+        response = self.generate()
+        self.assertEqual(response.status_code, 409)
+        listed = APIClient().get('/all/payslips/', {'period': '2024-03', 'generate': 'true'})
+        self.assertEqual(listed.status_code, 409)
+        self.assertEqual(response.data, listed.data)
+
+    def test_stale_rate_is_a_conflict(self):
+        ZiGRateToUSD.objects.create(date=date(2024, 1, 1), rate=Decimal('25'))
+        response = self.generate()
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('2024-01-01', response.data['error'])
+        self.assertFalse(Payroll.objects.exists())
+
+    def test_current_rate_generates(self):
+        ZiGRateToUSD.objects.create(date=PERIOD, rate=Decimal('25'))
+        self.assertEqual(self.generate().status_code, 201)
+
+
+class ZiGRateImportTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_impossible_dates_are_rejected(self):
+        self.assertEqual(self.client.get('/zig-rates/gaps/', {'from': '2024-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get('/zig-rates/gaps/', {'to': '2024-13-01'}).status_code, 400)
+        for until in ('2024-02-30', 'soon'):
+            with self.subTest(until=until):
+                response = self.client.post(
+                    f'/zig-rates/import/?fill=true&until={until}', {'rates': [{'date': '2024-02-01', 'rate': '25'}]}, format='json',
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(ZiGRateToUSD.objects.exists())
+
+    def test_created_filled_and_changed_rates_are_audited(self):
+        ZiGRateToUSD.objects.create(date=date(2024, 2, 2), rate=Decimal('25'))
+        with self.captureOnCommitCallbacks(execute=True): # Audit entries are written on commit
+            response = self.client.post('/zig-rates/import/?fill=true', {'rates': [
+                {'date': '2024-02-01', 'rate': '24'}, {'date': '2024-02-02', 'rate': '26'}, {'date': '2024-02-05', 'rate': '27'},
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        ids = dict(ZiGRateToUSD.objects.values_list('date', 'id'))
+        logged = {
+            (entry.action, entry.entity_id): entry.changes
+            for entry in AuditLog.objects.filter(entity='zigratetousd').exclude(action='create', entity_id=str(ids[date(2024, 2, 2)]))
+        }
+        self.assertEqual(logged[('update', str(ids[date(2024, 2, 2)]))], {'rate': ['25.0000', '26']})
+        created = {changes['date']: changes['rate'] for (action, _), changes in logged.items() if action == 'create'}
+        # Imported days and the forward-filled 3rd and 4th
+        self.assertEqual(created, {'2024-02-01': '24', '2024-02-03': '26', '2024-02-04': '26', '2024-02-05': '27'})
+
+    def test_command_rejects_an_impossible_until(self):
+        with self.assertRaisesMessage(CommandError, '2024-02-30'):
+            call_command('import_zig_rates', 'rates.csv', '--fill', '--until', '2024-02-30')
+
+
+class ConsolidatedReportTests(TestCase):
+
+    def test_impossible_rate_date_is_rejected(self):
+        for rate_date in ('2024-02-30', 'today'):
+            with self.subTest(rate_date=rate_date):
+                response = APIClient().get('/payroll/reports/consolidated/', {'from': '2024-01', 'to': '2024-02', 'rate_date': rate_date})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['error'], 'Invalid rate_date. Use YYYY-MM-DD')
+
+
+class DepartmentCostCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.employees = [make_employee(n) for n in range(3)]
+        Employees.objects.filter(pk=self.employees[2].pk).update(department='IT')
+        self.payrolls = [make_payroll(employee, 'Paid') for employee in self.employees]
+
+    def report(self):
+        return payroll_reports.department_costs(PERIOD, PERIOD)
+
+    def headcounts(self, report):
+        return {row['department']: row['headcount'] for row in report['periods'][0]['departments']}
+
+    def test_closed_period_is_served_from_cache(self):
+        first = self.report()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.report()
+
+        self.assertEqual(first['cached_periods'], 0)
+        self.assertEqual(second['cached_periods'], 1)
+        self.assertEqual(second['periods'], first['periods'])
+        self.assertEqual(len(queries), 1) # Period states only; no cost aggregation
+        self.assertEqual(self.headcounts(second), {'HR': 2, 'IT': 1})
+
+    def test_open_period_is_not_cached(self):
+        Payroll.objects.filter(pk=self.payrolls[0].pk).update(status='Processed')
+        self.report()
+        self.assertEqual(self.report()['cached_periods'], 0)
+
+    def test_changed_record_misses_the_cache(self):
+        self.report()
+        self.payrolls[0].net_salary_usd = 950
+        self.payrolls[0].save()
+
+        report = self.report()
+        self.assertEqual(report['cached_periods'], 0)
+        self.assertEqual(report['periods'][0]['departments'][0]['usd']['net'], Decimal('1850.00'))
+
+    def test_department_change_misses_the_cache(self):
+        self.report()
+        employee = Employees.objects.get(pk=self.employees[0].pk)
+        employee.department = 'IT'
+        with self.captureOnCommitCallbacks(execute=True):
+            employee.save()
+
+        report = self.report()
+        self.assertEqual(report['cached_periods'], 0)
+        self.assertEqual(self.headcounts(report), {'HR': 1, 'IT': 2})
+        self.assertEqual(self.report()['cached_periods'], 1)
+
+    def test_other_employee_changes_keep_the_cache(self):
+        self.report()
+        employee = Employees.objects.get(pk=self.employees[0].pk)
+        employee.position = 'Manager'
+        with self.captureOnCommitCallbacks(execute=True):
+            employee.save()
+
+        self.assertEqual(self.report()['cached_periods'], 1)
+
+
+class PAYECreditAndThresholdTests(TestCase):
+    """
+    Worked example: USD 1000 a month.
+      standard brackets   1000 * 25% - 35                  = 215    + 3% AIDS levy = 221.45
+      credit of 50        215 - 50                         = 165                  = 169.95
+      table A (from 500)  20% of (1000 - 500)              = 100                  = 103.00
+      table B (from 400)  10 + 25% of (1000 - 400)         = 160                  = 164.80
+      A and B             the lower, A                     = 100                  = 103.00
+      A and the credit    100 - 50                         = 50                   = 51.50
+    """
+
+    def setUp(self):
+        ZiGRateToUSD.objects.create(date=PERIOD, rate=Decimal('25'))
+        for low, high, rate, deduction in ((0, 100, '0', 0), (100, 300, '0.2', 20), (300, None, '0.25', 35)):
+            TaxBracket.objects.create(
+                currency='USD', min_income=low, max_income=high, rate=Decimal(rate), deduction=deduction,
+                active_from=date(2024, 1, 1),
+            )
+        # B gets the higher id: picking the table by id alone would choose it
+        self.table_a = DeductionType.objects.create(name='Disabled', amount=0)
+        self.table_b = DeductionType.objects.create(name='Blind', amount=0)
+        self.credit = DeductionType.objects.create(name='Elderly', amount=0)
+        self.band(self.table_a, 0, 500, '0', 0)
+        self.band(self.table_a, 500, None, '0.2', 0)
+        self.band(self.table_b, 0, 400, '0', 0)
+        self.band(self.table_b, 400, 0, '0.25', 10)
+        PAYETaxCredit.objects.create(deduction_type=self.credit, usd_amount=50, zwl_amount=0)
+        self.employee = make_employee(1)
+        Employees.objects.filter(pk=self.employee.pk).update(usd_salary=1000)
+
+    def band(self, deduction_type, low, high, rate, fixed):
+        return PAYEThreshold.objects.create(
+            deduction_type=deduction_type, currency='USD', threshold_from=low, threshold_to=high,
+            rate=Decimal(rate), fixed_amount=fixed,
+        )
+
+    def tax_with(self, *deduction_types):
+        self.employee.deductions.set(deduction_types)
+        Payroll.objects.all().delete()
+        PayrollProcessor.create_monthly_payroll(PERIOD)
+        return float(Payroll.objects.get().tax_usd)
+
+    def test_worked_example(self):
+        self.assertEqual(self.tax_with(), 221.45)
+        self.assertEqual(self.tax_with(self.credit), 169.95)
+        self.assertEqual(self.tax_with(self.table_a), 103.0)
+        self.assertEqual(self.tax_with(self.table_b), 164.8)
+        self.assertEqual(self.tax_with(self.table_a, self.table_b), 103.0)
+        self.assertEqual(self.tax_with(self.table_a, self.credit), 51.5)
+
+    def test_top_band_must_be_open_ended(self):
+        PAYEThreshold.objects.filter(deduction_type=self.table_a, threshold_from=500).update(threshold_to=900)
+        with self.assertRaisesMessage(PAYEThresholdError, 'only the top band'):
+            PayrollProcessor.load_paye_rules()
+
+        request = APIRequestFactory().post('/', {'period': '2024-03'}, format='json')
+        self.assertEqual(payroll_view.generate_monthly_payroll(request).status_code, 409)
+        self.assertFalse(Payroll.objects.exists())
+
+    def test_lower_bands_must_be_closed(self):
+        self.band(self.table_b, 1000, None, '0.3', 160)
+        with self.assertRaisesMessage(PAYEThresholdError, 'Blind USD thresholds'):
+            PayrollProcessor.load_paye_rules()
+
+
+class EmployerContributionTests(TestCase):
+    def setUp(self):
+        ZiGRateToUSD.objects.create(date=PERIOD, rate=Decimal('25'))
+        nssa = DeductionType.objects.create(name='NSSA', amount=0)
+        NSSACap.objects.create(
+            deduction_type=nssa, usd_cap=700, zwl_cap=20000, rate=Decimal('0.0450'), contribution_type='employee_and_employer',
+        )
+        fund = PensionFund.objects.create(id='fund', name='Fund', employee_rate=Decimal('0.05'), employer_rate=Decimal('0.10'), currency='both')
+        self.employee = make_employee(1)
+        Employees.objects.filter(pk=self.employee.pk).update(usd_salary=1000, zig_salary=5000)
+        EmployeeDeductables.objects.create(employee=self.employee, currency='USD', pension_fund=fund, pension_employee_contribution=False)
+
+    def test_payroll_run_stores_employer_nssa_and_pension(self):
+        PayrollProcessor.create_monthly_payroll(PERIOD)
+        payroll = Payroll.objects.get()
+
+        self.assertEqual(payroll.employer_nssa_usd, Decimal('31.50')) # Capped at 700
+        self.assertEqual(payroll.employer_nssa_zig, Decimal('225.00'))
+        # Paid even though the employee does not contribute
+        self.assertEqual(payroll.employer_pension_usd, Decimal('100.00'))
+        self.assertEqual(payroll.employer_pension_zig, Decimal('500.00'))
+        self.assertEqual(payroll.pension_usd, Decimal('0'))
+        self.assertEqual(
+            sorted(payroll.line_items.filter(category='employer').values_list('name', 'currency', 'amount')),
+            [
+                ('Employer NSSA', 'USD', Decimal('31.50')), ('Employer NSSA', 'ZWG', Decimal('225.00')),
+                ('Employer Pension', 'USD', Decimal('100.00')), ('Employer Pension', 'ZWG', Decimal('500.00')),
+            ],
+        )
+        # Employer contributions are a cost, not a deduction: net only loses the employee's NSSA (no tax brackets here)
+        self.assertEqual(payroll.net_salary_usd, Decimal('968.50'))
+        self.assertEqual(payroll.net_salary_zig, Decimal('4775.00'))
+
+
+class PayslipLineItemTests(TestCase):
+    url = '/payroll/payslips/'
+
+    def setUp(self):
+        for day in (PERIOD, date(2024, 4, 1)):
+            ZiGRateToUSD.objects.create(date=day, rate=Decimal('25'))
+        TaxBracket.objects.create(currency='USD', min_income=0, max_income=None, rate=Decimal('0.1'), deduction=0, active_from=date(2024, 1, 1))
+        self.client = APIClient()
+
+    def add_employees(self, first, count):
+        for n in range(first, first + count):
+            employee = make_employee(n)
+            Employees.objects.filter(pk=employee.pk).update(usd_salary=1000 + n)
+
+    def generate(self, period=PERIOD):
+        with CaptureQueriesContext(connection) as queries:
+            PayrollProcessor.create_monthly_payroll(period)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_line_items_are_written_in_one_insert(self):
+        self.add_employees(0, 2)
+        small = self.generate()
+        self.add_employees(2, 5)
+        large = self.generate(date(2024, 4, 1))
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(sum('INSERT INTO "erp_payrolllineitem"' in sql for sql in large), 1)
+        for payroll in Payroll.objects.filter(period=date(2024, 4, 1)).select_related('employee'):
+            paye = payroll.line_items.get(name='PAYE', currency='USD')
+            self.assertEqual(paye.amount, payroll.tax_usd) # Each run row got its own lines
+
+    def test_rows_inserted_by_someone_else_keep_their_lines(self):
+        self.add_employees(0, 3)
+        manual = make_payroll(Employees.objects.order_by('id').first(), 'Draft')
+        # The run still sees every employee, as if the manual row landed after its check
+        with mock.patch.object(PayrollProcessor, 'employees_missing_payroll', return_value=Employees.objects.all()):
+            created = PayrollProcessor.create_monthly_payroll(PERIOD)
+
+        self.assertEqual(created, 2)
+        self.assertFalse(manual.line_items.exists())
+        self.assertEqual(
+            set(PayrollLineItem.objects.values_list('payroll_id', flat=True)),
+            set(Payroll.objects.exclude(pk=manual.pk).values_list('id', flat=True)),
+        )
+
+    def test_payslips_take_a_fixed_number_of_queries(self):
+        self.add_employees(0, 2)
+        PayrollProcessor.create_monthly_payroll(PERIOD)
+        with self.assertNumQueries(3): # Archive check, payrolls with employees, line items
+            small = self.client.get(self.url, {'period': '2024-03'})
+        self.add_employees(2, 5)
+        PayrollProcessor.create_monthly_payroll(PERIOD)
+        with self.assertNumQueries(3):
+            large = self.client.get(self.url, {'period': '2024-03'})
+
+        self.assertEqual((small.data['count'], large.data['count']), (2, 7))
+        self.assertTrue(all(payslip['line_items'] for payslip in large.data['data']))
+
+
+class DeductionEvaluatorTests(TestCase):
+    def setUp(self):
+        provider = MedicalAidProvider.objects.create(id='cimas', name='Cimas')
+        self.plan = MedicalAidPlan.objects.create(provider=provider, name='Essential', usd_amount=50, zwl_amount=1300)
+        self.funeral = InsuranceOption.objects.create(
+            id='funeral-pct', name='Funeral 1%', insurance_type='funeral', calculation_type='percentage',
+            rate=Decimal('0.0100'), min_amount_usd=5, max_amount_usd=20, min_amount_zwl=100, max_amount_zwl=400,
+        )
+        self.life = InsuranceOption.objects.create(
+            id='life-fixed', name='Life', insurance_type='life', calculation_type='fixed', usd_amount=Decimal('7.50'), zwl_amount=200,
+        )
+        self.annual_union = Union.objects.create(id='annual', name='Annual', usd_amount=120, zwl_amount=2400, frequency='annual')
+        self.monthly_union = Union.objects.create(id='monthly', name='Monthly', usd_amount=4, zwl_amount=80, frequency='monthly')
+
+    def deductable(self, n, **fields):
+        fields = {'currency': 'USD', 'medical_aid': self.plan, 'funeral_cover': self.funeral, 'life_insurance': self.life, **fields}
+        return EmployeeDeductables.objects.create(employee=make_employee(n), **fields)
+
+    def deductions(self, deduct, salary, currency='USD'):
+        result = DeductionEvaluator.load().evaluate(deduct.employee_id, {currency: salary})
+        return dict(result[currency].deductions)
+
+    def test_fixed_amounts_apply_as_they_are(self):
+        deductions = self.deductions(self.deductable(1), 1000.0)
+        self.assertEqual(deductions['Medical Aid (Essential)'], 50.0)
+        self.assertEqual(deductions['Life Insurance'], 7.5)
+
+    def test_percentage_is_clamped_to_the_minimum_and_maximum(self):
+        deduct = self.deductable(1)
+        for salary, expected in ((300.0, 5.0), (1000.0, 10.0), (5000.0, 20.0)):
+            with self.subTest(salary=salary):
+                self.assertEqual(self.deductions(deduct, salary)['Funeral Cover'], expected)
+
+    def test_zig_deductable_uses_the_zig_amounts_and_limits(self):
+        deduct = self.deductable(1, currency='ZWL')
+        deductions = self.deductions(deduct, 50000.0, currency='ZWG')
+        self.assertEqual(deductions['Medical Aid (Essential)'], 1300.0)
+        self.assertEqual(deductions['Funeral Cover'], 400.0)
+        self.assertEqual(deductions['Life Insurance'], 200.0)
+
+    def test_annual_union_dues_are_spread_over_the_year(self):
+        self.assertEqual(self.deductions(self.deductable(1, union=self.annual_union), 1000.0)['Union (Annual)'], 10.0)
+        self.assertEqual(self.deductions(self.deductable(2, union=self.monthly_union), 1000.0)['Union (Monthly)'], 4.0)
+
+    def test_benefits_are_kept_apart_from_deductions(self):
+        deduct = self.deductable(1, housing_benefit=150, school_fees_benefit=0)
+        result = DeductionEvaluator.load().evaluate(deduct.employee_id, {'USD': 1000.0})['USD']
+        self.assertEqual(result.benefits, [('Housing Benefit', 150.0)])
+        self.assertEqual(result.total_deductions, 67.5)
+
+    def test_every_deductable_loads_in_one_query(self):
+        deducts = [self.deductable(n, union=self.annual_union) for n in range(3)]
+        with self.assertNumQueries(1):
+            evaluator = DeductionEvaluator.load()
+            for deduct in deducts:
+                evaluator.evaluate(deduct.employee_id, {'USD': 1000.0})
+
+
+class FieldSelectionTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.fund = PensionFund.objects.create(id='NPS', name='National', employee_rate=Decimal('0.05'), employer_rate=Decimal('0.05'), currency='both')
+        allowance = AllowanceType.objects.create(name='Housing', amount=100)
+        deduction = DeductionType.objects.create(name='Union', amount=5)
+        for n in range(3):
+            employee = make_employee(n)
+            employee.allowances.add(allowance)
+            employee.deductions.add(deduction)
+            EmployeeDeductables.objects.create(employee=employee, currency='USD', pension_fund=self.fund)
+
+    def test_relations_are_nested_by_default(self):
+        [row, *_] = self.client.get('/employee-deductables/').data
+        self.assertEqual(row['employee']['firstname'], 'First0')
+        self.assertEqual(row['pension_fund']['name'], 'National')
+
+        with self.assertNumQueries(3): # Employees, then allowances and deductions for all of them
+            employees = self.client.get('/all/employees/').data
+        self.assertEqual([a['name'] for a in employees[0]['allowances']], ['Housing'])
+        self.assertEqual([d['name'] for d in employees[0]['deductions']], ['Union'])
+
+    def test_fields_narrow_the_nested_output(self):
+        rows = self.client.get('/employee-deductables/', {'fields': 'id,employee.firstname'}).data
+        self.assertEqual(set(rows[0]), {'id', 'employee'})
+        self.assertEqual(rows[0]['employee'], {'firstname': 'First0'})
+
+        with self.assertNumQueries(1):
+            employees = self.client.get('/all/employees/', {'fields': 'employeeid,firstname'}).data
+        self.assertEqual(set(employees[0]), {'employeeid', 'firstname'})
+
+    def test_expand_picks_what_is_nested(self):
+        [row, *_] = self.client.get('/employee-deductables/', {'expand': 'pension_fund'}).data
+        self.assertIsInstance(row['employee'], int)
+        self.assertEqual(row['pension_fund']['id'], 'NPS')
+
+        [row, *_] = self.client.get('/employee-deductables/', {'expand': 'none'}).data
+        self.assertEqual(row['pension_fund'], 'NPS')
+
+
+class ORJSONRendererTests(TestCase):
+    def assertSameBytes(self, data, **context):
+        self.assertEqual(ORJSONRenderer().render(data, 'application/json', context), JSONRenderer().render(data, 'application/json', context))
+
+    def test_matches_json_renderer_bytes(self):
+        harare = dt_timezone(timedelta(hours=2))
+        self.assertSameBytes({
+            'decimals': [Decimal('1000.00'), Decimal('0.1'), Decimal('-2.50'), Decimal('12345678.9012')],
+            'date': date(2024, 3, 1),
+            'datetimes': [
+                datetime(2024, 3, 1, 8, 30, tzinfo=dt_timezone.utc),
+                datetime(2024, 3, 1, 8, 30, 15, 123456, tzinfo=dt_timezone.utc),
+                datetime(2024, 3, 1, 10, 30, tzinfo=harare),
+                datetime(2024, 3, 1, 8, 30),
+            ],
+            'time': clock(8, 30, 15, 500),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'text': 'Tendai Moyo \u2028 ZiG \u2029 \u00e9',
+            1: None,
+            'nested': [{'ok': True, 'amount': 1.5}],
+        })
+
+    def test_fallbacks_match_as_well(self):
+        self.assertSameBytes({'big': 2 ** 70})
+        self.assertSameBytes({'amount': Decimal('1.10')}, indent=2)
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class PayrollArchiveTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employee = make_employee(1)
+        self.january = make_payroll(self.employee, 'Paid', period=date(2024, 1, 1))
+        self.january.line_items.create(category='statutory', name='PAYE', currency='USD', amount=Decimal('50'))
+        self.february = make_payroll(self.employee, 'Draft', period=date(2024, 2, 1))
+        make_payroll(make_employee(2), 'Paid', period=date(2024, 1, 1))
+
+    def records(self, **params):
+        return self.client.get('/payroll/records/', params).data
+
+    def test_employee_history_includes_archived_periods(self):
+        before = self.records(employee_id=self.employee.employeeid)
+        self.assertEqual(payroll_archive.archive_period(date(2024, 1, 1)), 2)
+
+        after = self.records(employee_id=self.employee.employeeid)
+        self.assertEqual([(row['id'], row['period']) for row in after], [
+            (self.february.id, '2024-02-01'), (self.january.id, '2024-01-01'),
+        ])
+        # Same rows as before archiving; archived ones also say when they were archived
+        self.assertEqual([{k: v for k, v in row.items() if k != 'archived_at'} for row in after], before)
+        self.assertEqual([row['period'] for row in self.records(status='Paid')], ['2024-01-01', '2024-01-01'])
+        self.assertEqual(self.client.get('/async/payroll/records/', {'employee_id': self.employee.employeeid}).json(), after)
+
+    def test_period_reads_route_to_the_archive(self):
+        payroll_archive.archive_period(date(2024, 1, 1))
+        self.assertFalse(Payroll.objects.filter(period=date(2024, 1, 1)).exists())
+        rows = self.records(period='2024-01', employee_id=self.employee.employeeid)
+        self.assertEqual([row['id'] for row in rows], [self.january.id])
+        [payslip] = self.client.get('/payroll/payslips/', {'period': '2024-01', 'employee_id': self.employee.employeeid}).data['data']
+        self.assertEqual(payslip['line_items'], [{'category': 'statutory', 'name': 'PAYE', 'currency': 'USD', 'amount': '50.00'}])
+
+    def test_unpaid_periods_are_not_archived(self):
+        with self.assertRaises(payroll_archive.ArchiveError):
+            payroll_archive.archive_period(date(2024, 2, 1))
+        self.assertEqual(payroll_archive.archivable_periods(months=0, today=date(2024, 3, 15)), [date(2024, 1, 1)])
+
+    def test_restore_brings_back_ids_and_lines(self):
+        payroll_archive.archive_period(date(2024, 1, 1))
+        self.assertEqual(payroll_archive.restore_period(date(2024, 1, 1)), 2)
+
+        restored = Payroll.objects.get(id=self.january.id)
+        self.assertEqual(list(restored.line_items.values_list('name', 'amount')), [('PAYE', Decimal('50'))])
+        self.assertFalse(payroll_archive.is_archived(date(2024, 1, 1)))
+
+
+class PayrollExportFingerprintTests(TestCase):
+    def setUp(self):
+        self.january = make_payroll(make_employee(1), 'Paid', period=date(2024, 1, 1))
+        self.february = make_payroll(make_employee(2), 'Draft', period=date(2024, 2, 1))
+
+    def fingerprints(self):
+        return payroll_export.period_fingerprints()
+
+    def test_one_fingerprint_per_period(self):
+        with self.assertNumQueries(1):
+            fingerprints = self.fingerprints()
+        self.assertEqual(fingerprints[date(2024, 1, 1)]['rows'], 1)
+        self.assertEqual(fingerprints[date(2024, 1, 1)]['max_id'], self.january.id)
+        self.assertEqual(list(fingerprints), [date(2024, 1, 1), date(2024, 2, 1)])
+
+    def test_changes_move_only_their_period(self):
+        before = self.fingerprints()
+        self.february.status = 'Pending'
+        self.february.save()
+        after = self.fingerprints()
+        self.assertEqual(after[date(2024, 1, 1)], before[date(2024, 1, 1)])
+        self.assertNotEqual(after[date(2024, 2, 1)]['last_update'], before[date(2024, 2, 1)]['last_update'])
+
+        make_payroll(make_employee(3), 'Draft', period=date(2024, 2, 1))
+        self.assertEqual(self.fingerprints()[date(2024, 2, 1)]['rows'], 2)
+
+    def test_archiving_keeps_the_fingerprint(self):
+        before = self.fingerprints()
+        payroll_archive.archive_period(date(2024, 1, 1))
+        self.assertEqual(self.fingerprints(), before)
+
+    @skipUnless(payroll_export.pa is not None, 'pyarrow is not installed')
+    def test_incremental_export_rewrites_changed_periods_only(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        first = payroll_export.export(directory.name)
+        self.assertEqual(first['exported'], ['2024-01', '2024-02'])
+        self.assertEqual(payroll_export.export(directory.name)['skipped'], ['2024-01', '2024-02'])
+
+        self.february.status = 'Pending'
+        self.february.save()
+        self.january.delete()
+        result = payroll_export.export(directory.name)
+        self.assertEqual((result['exported'], result['skipped'], result['removed']), (['2024-02'], [], ['2024-01']))
+        self.assertEqual(list(payroll_export.read_manifest(directory.name)['periods']), ['2024-02'])
+
+        self.assertEqual(payroll_export.export(directory.name, fmt='arrow')['exported'], ['2024-02'])
+
+
+class LeaveAccrualTests(TestCase):
+    """Policies from settings: default 2.5 days a month (cap 30), Contract 1.5 (cap 0)."""
+
+    def employee(self, n, balance, employee_type='Permanent', **contract):
+        employee = make_employee(n)
+        Employees.objects.filter(pk=employee.pk).update(leave_days=balance, employee_type=employee_type, **contract)
+        return employee
+
+    def balance(self, employee):
+        return Employees.objects.get(pk=employee.pk).leave_days
+
+    def test_partial_months_are_prorated(self):
+        full = self.employee(1, 0)
+        joined = self.employee(2, 0, contractFrom=date(2024, 2, 15))
+        leaving = self.employee(3, 0, 'Contract', contractTo=date(2024, 2, 10))
+        gone = self.employee(4, 0, contractTo=date(2024, 1, 31))
+
+        result = leave_accrual.accrue(date(2024, 2, 1))
+
+        self.assertEqual(self.balance(full), Decimal('2.50'))
+        self.assertEqual(self.balance(joined), Decimal('1.29')) # 2.5 * 15/29
+        self.assertEqual(self.balance(leaving), Decimal('0.52')) # 1.5 * 10/29
+        self.assertEqual(self.balance(gone), Decimal('0'))
+        self.assertEqual(result['employees'], 3)
+        self.assertEqual(result['accrued_days'], Decimal('4.31'))
+
+    def test_balances_above_the_cap_expire_at_the_start_of_the_leave_year(self):
+        over = self.employee(1, 40)
+        contract = self.employee(2, 5, 'Contract')
+
+        result = leave_accrual.accrue(date(2024, 1, 1))
+
+        self.assertEqual(self.balance(over), Decimal('32.50')) # 40 -> 30, then + 2.5
+        self.assertEqual(self.balance(contract), Decimal('1.50')) # 5 -> 0, then + 1.5
+        self.assertEqual(result['expired_days'], Decimal('15'))
+        self.assertEqual(
+            list(LeaveLedger.objects.filter(employee=over).order_by('id').values_list('entry_type', 'days', 'balance')),
+            [('expiry', Decimal('-10'), Decimal('30')), ('accrual', Decimal('2.5'), Decimal('32.5'))],
+        )
+        # Caps only apply at the start of the leave year
+        leave_accrual.accrue(date(2024, 2, 1))
+        self.assertEqual(self.balance(over), Decimal('35.00'))
+
+    def test_a_month_is_accrued_once(self):
+        employee = self.employee(1, 0)
+        leave_accrual.accrue(date(2024, 3, 1))
+        again = leave_accrual.accrue(date(2024, 3, 1))
+
+        self.assertEqual(again['employees'], 0)
+        self.assertEqual(self.balance(employee), Decimal('2.50'))
+        self.assertEqual(LeaveLedger.objects.count(), 1)
+
+        # A dry run reports without writing
+        preview = leave_accrual.accrue(date(2024, 4, 1), dry_run=True)
+        self.assertEqual(preview['accrued_days'], Decimal('2.50'))
+        self.assertEqual(self.balance(employee), Decimal('2.50'))
+
+    def test_leave_days_stays_a_json_number(self):
+        employee = self.employee(1, 21)
+        employee.refresh_from_db()
+        for serializer_class in (EmployeeSerializer, EmployeeRegistrationSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                rendered = json.loads(JSONRenderer().render(serializer_class(employee).data))
+                self.assertEqual(rendered['leave_days'], 21)
+
+
+class ContractExpiryTests(TestCase):
+    url = '/contracts/scan/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        today = date.today()
+        self.expired, self.current = make_employee(1), make_employee(2)
+        Employees.objects.filter(pk=self.expired.pk).update(contractTo=today - timedelta(days=1))
+        Employees.objects.filter(pk=self.current.pk).update(contractTo=today + timedelta(days=10))
+        self.user = CustomUser.objects.create_user(
+            username='contractor', email='contractor@example.com', password='x', contractTo=today - timedelta(days=1),
+        )
+        self.admin = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        self.client = APIClient()
+
+    def active(self):
+        return (
+            dict(Employees.objects.values_list('id', 'isActive')),
+            CustomUser.objects.values_list('isActive', 'is_active').get(pk=self.user.pk),
+        )
+
+    def test_expiring_contracts_are_listed(self):
+        response = self.client.get(self.url, {'days': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['employees']], [self.current.pk])
+
+    def test_deactivation_needs_a_staff_user(self):
+        before = self.active()
+        self.assertIn(self.client.post(self.url).status_code, (401, 403))
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+        self.assertEqual(self.active(), before)
+
+    def test_dry_run_changes_nothing(self):
+        before = self.active()
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(f'{self.url}?dry_run=true')
+        self.assertEqual(response.data['deactivated'], {'employees': 1, 'users': 1})
+        self.assertEqual(self.active(), before)
+
+    def test_expired_contracts_are_deactivated_and_tokens_revoked(self):
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deactivated'], {'employees': 1, 'users': 1})
+        employees, user = self.active()
+        self.assertEqual(employees, {self.expired.pk: False, self.current.pk: True})
+        self.assertEqual(user, (False, False))
+        self.assertIsNotNone(cache.get(REVOKED_KEY % self.user.pk))
+        entry = AuditLog.objects.get(entity='employees', entity_id=str(self.expired.pk), action='update')
+        self.assertEqual(entry.changes, {'isActive': [True, False]})
+
+
+class AsyncViewParityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        employees = [make_employee(n) for n in range(3)]
+        Employees.objects.filter(pk=employees[0].pk).update(usd_salary=Decimal('1234.50'), leave_days=Decimal('7.50'))
+        for employee in employees:
+            make_payroll(employee, 'Paid', period=date(2024, 1, 1))
+            make_payroll(employee, 'Draft')
+        payroll_archive.archive_period(date(2024, 1, 1))
+        ZiGRateToUSD.objects.create(date=PERIOD, rate=Decimal('25.1234'))
+        TaxBracket.objects.create(currency='USD', min_income=0, max_income=100, rate=Decimal('0'), deduction=0, active_from=date(2024, 1, 1))
+        Job.objects.create(
+            title='Analyst', department='IT', location='Harare', description='-', requirements='-',
+            application_deadline=date(2099, 1, 1), status='OP',
+        )
+
+    def assertSameBody(self, sync_url, async_url, params=None):
+        expected = self.client.get(sync_url, params or {}, HTTP_ACCEPT='application/json')
+        actual = self.client.get(async_url, params or {})
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(actual.status_code, 200)
+        self.assertNotIn(expected.content, (b'[]', b'{}'))
+        self.assertEqual(actual.content, expected.content)
+        return expected, actual
+
+    def test_payroll_records(self):
+        for params in ({}, {'period': '2024-03'}, {'period': '2024-01'}, {'status': 'Paid'}, {'employee_id': 'EMP0001'}):
+            with self.subTest(params=params):
+                self.assertSameBody('/payroll/records/', '/async/payroll/records/', params)
+
+    def test_employees(self):
+        for params in ({}, {'fields': 'employeeid,firstname,leave_days'}, {'expand': 'none'}):
+            with self.subTest(params=params):
+                self.assertSameBody('/all/employees/', '/async/employees/', params)
+
+    def test_reference_data(self):
+        for kind in ('zig-rates', 'tax-brackets'):
+            with self.subTest(kind=kind):
+                self.assertSameBody(f'/{kind}/', f'/async/reference/{kind}/')
+        self.assertEqual(self.client.get('/async/reference/nothing/').status_code, 404)
+
+    def test_public_jobs(self):
+        expected, actual = self.assertSameBody('/jobs/', '/async/jobs/')
+        self.assertEqual(actual['ETag'], expected['ETag'])
+        self.assertEqual(actual['Last-Modified'], expected['Last-Modified'])
+
+
+class AuditTrailTests(TransactionTestCase):
+
+    def entries(self, **filters):
+        return list(AuditLog.objects.filter(entity='employees', **filters).order_by('id'))
+
+    def test_saving_a_loaded_record_does_not_read_it_again(self):
+        ZiGRateToUSD.objects.create(date=PERIOD, rate=Decimal('25'))
+        rate = ZiGRateToUSD.objects.get()
+        rate.rate = Decimal('26')
+        with CaptureQueriesContext(connection) as queries:
+            rate.save()
+        self.assertEqual([q['sql'].split()[0] for q in queries if q['sql'].startswith(('SELECT', 'UPDATE', 'INSERT'))], ['UPDATE', 'INSERT'])
+        rate.rate = Decimal('27')
+        rate.save()
+
+        changes = [entry.changes for entry in AuditLog.objects.filter(entity='zigratetousd', action='update').order_by('id')]
+        self.assertEqual(changes, [{'rate': ['25.0000', '26']}, {'rate': ['26', '27']}])
+
+    def test_never_loaded_instance_is_diffed_against_the_stored_row(self):
+        employee = make_employee(1)
+        Employees.objects.filter(pk=employee.pk).update(position='Manager')
+        unloaded = Employees(**{f.attname: getattr(employee, f.attname) for f in Employees._meta.concrete_fields})
+        unloaded.department = 'Finance'
+        unloaded.save()
+        [entry] = self.entries(action='update')
+        self.assertEqual(entry.changes, {'position': ['Manager', 'Clerk'], 'department': ['HR', 'Finance']})
+
+    def test_saves_in_one_transaction_are_written_together_and_collapse(self):
+        employee = make_employee(1)
+        with transaction.atomic():
+            employee.position = 'Manager'
+            employee.save()
+            employee.position = 'Director'
+            employee.department = 'Finance'
+            employee.save()
+            self.assertEqual(self.entries(action='update'), [])
+
+        [entry] = self.entries(action='update')
+        self.assertEqual(entry.changes, {'position': ['Clerk', 'Director'], 'department': ['HR', 'Finance']})
+
+    def test_rolled_back_transaction_is_not_audited(self):
+        employee = make_employee(1)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            employee.position = 'Manager'
+            employee.save()
+            raise RuntimeError
+        self.assertEqual(self.entries(action='update'), [])
+
+        # The next transaction starts with a fresh buffer
+        employee.refresh_from_db()
+        with transaction.atomic():
+            employee.department = 'Finance'
+            employee.save()
+        [entry] = self.entries(action='update')
+        self.assertEqual(entry.changes, {'department': ['HR', 'Finance']})
+
+    def test_rolled_back_savepoint_is_not_audited(self):
+        first, second = make_employee(1), make_employee(2)
+        with transaction.atomic():
+            first.position = 'Manager'
+            first.save()
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                second.position = 'Manager'
+                second.save()
+                raise RuntimeError
+            second.refresh_from_db()
+            with transaction.atomic():
+                second.department = 'Finance'
+                second.save()
+
+        changes = {entry.entity_id: entry.changes for entry in self.entries(action='update')}
+        self.assertEqual(changes, {
+            str(first.pk): {'position': ['Clerk', 'Manager']},
+            str(second.pk): {'department': ['HR', 'Finance']},
+        })
+
+    def test_out_of_range_bounds_are_rejected(self):
+        for bounds in ({'from': '2024-02-30'}, {'to': '2024-13-01T00:00:00'}, {'from': '2024-01-01T25:00:00'}):
+            with self.subTest(bounds=bounds):
+                self.assertEqual(APIClient().get('/audit/', bounds).status_code, 400)
+        self.assertEqual(APIClient().get('/audit/', {'from': '2024-02-29', 'to': '2024-03-01'}).status_code, 200)
+
+    def test_bulk_generated_payroll_is_audited(self):
+        ZiGRateToUSD.objects.create(date=PERIOD, rate=Decimal('25'))
+        for n in range(3):
+            make_employee(n)
+        created = PayrollProcessor.create_monthly_payroll(PERIOD)
+
+        self.assertEqual(created, 3)
+        logged = AuditLog.objects.filter(entity='payroll', action='create')
+        self.assertEqual(
+            sorted(logged.values_list('entity_id', flat=True)),
+            sorted(str(pk) for pk in Payroll.objects.values_list('id', flat=True)),
+        )
+        self.assertEqual(logged.first().changes['period'], PERIOD.isoformat())
+
+
+class PublicJobBoardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.jobs = [
+            Job.objects.create(
+                title=f'Job {n}', department='IT', location='Harare', description='-', requirements='-',
+                application_deadline=date(2099, 1, 1), status='OP',
+            )
+            for n in range(2)
+        ]
+
+    def test_closing_the_newest_job_does_not_move_last_modified_back(self):
+        first = self.client.get('/jobs/')
+        self.assertEqual(len(first.data), 2)
+
+        newest = self.jobs[-1]
+        newest.status = 'CL'
+        newest.save()
+
+        response = self.client.get('/jobs/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([job['id'] for job in response.data], [self.jobs[0].id])
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(first['Last-Modified']))
+
+    def test_anonymous_detail_is_served_from_the_board(self):
+        expired = Job.objects.create(
+            title='Expired', department='IT', location='Harare', description='-', requirements='-',
+            application_deadline=date(2020, 1, 1), status='OP',
+        )
+        self.client.get('/jobs/') # Builds the board
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'/jobs/{self.jobs[0].id}/').data['title'], 'Job 0')
+            self.assertEqual(self.client.get('/jobs/999999/').status_code, 404)
+            # Hidden from the list, so not served on its own either
+            self.assertEqual(self.client.get(f'/jobs/{expired.id}/').status_code, 404)
+
+        staff = CustomUser.objects.create_user(username='hr', email='hr@example.com', password='x')
+        self.client.force_authenticate(staff)
+        self.assertEqual(self.client.get(f'/jobs/{expired.id}/').status_code, 200)
+
+    def test_unchanged_board_revalidates(self):
+        first = self.client.get('/jobs/')
+        cache.delete(job_board.CACHE_KEY) # Rebuilt with the same content
+
+        response = self.client.get('/jobs/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Last-Modified'], first['Last-Modified'])
+
+
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/erp-test-cache'}}
+DATABASE_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'erp_test_cache'}}
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = CustomUser.objects.create_user(username='clerk', email='clerk@example.com', password='x')
+        self.token = Token.objects.create(user=self.user)
+        self.backend = CachedTokenAuthentication()
+
+    def test_per_process_cache_reads_the_token_every_time(self):
+        with self.assertNumQueries(1):
+            self.backend.authenticate_credentials(self.token.key)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    @override_settings(CACHES=DATABASE_CACHE)
+    def test_database_cache_reads_the_token_every_time(self):
+        with self.assertNumQueries(1): # The token lookup, and no marker read on top
+            self.backend.authenticate_credentials(self.token.key)
+        self.assertIsNone(token_cache.get(self.token.key))
+        with self.settings(REST_FRAMEWORK={'DEFAULT_AUTHENTICATION_CLASSES': [shared_cache.TOKEN_AUTHENTICATION]}):
+            self.assertEqual([e.id for e in shared_cache.check_token_cache(None)], ['erp.E002'])
+
+    # Redis and Memcached are not available here: a file cache stands in for the shared in-memory one
+    @override_settings(CACHES=SHARED_CACHE)
+    @mock.patch.object(shared_cache, 'is_shared_in_memory', return_value=True)
+    def test_shared_cache_reuses_the_lookup_with_a_fresh_user_per_request(self, _):
+        cache.clear()
+        first, _ = self.backend.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            second, token = self.backend.authenticate_credentials(self.token.key)
+        self.assertEqual(first.pk, second.pk)
+        self.assertIsNot(first, second)
+        self.assertIs(token.user, second)
+
+    @override_settings(CACHES=SHARED_CACHE)
+    @mock.patch.object(shared_cache, 'is_shared_in_memory', return_value=True)
+    def test_revocation_marker_reaches_other_workers(self, _):
+        cache.clear()
+        self.backend.authenticate_credentials(self.token.key)
+        # Another worker deactivates the user: only the shared marker reaches this one
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.set(REVOKED_KEY % self.user.pk, time.time() + 1)
+        with self.assertRaises(AuthenticationFailed):
+            self.backend.authenticate_credentials(self.token.key)
+
+
+class MetricsAccessTests(TestCase):
+    url = '/metrics/'
+
+    def test_anonymous_scrape_is_denied_by_default(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff_user_is_allowed(self):
+        staff = CustomUser.objects.create_user(username='ops', email='ops@example.com', password='x', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_listed_address_is_allowed(self):
+        with self.settings(PERF_METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+        with self.settings(PERF_METRICS_ALLOWED_IPS=['*']):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+@override_settings(PERF_METRICS_ALLOWED_IPS=['*'])
+class MetricsAggregationTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def scrape(self):
+        return self.client.get('/metrics/').content.decode()
+
+    def test_scrape_adds_up_every_worker_file(self):
+        other_worker = metrics.MetricsRegistry()
+        other_worker.observe_request('^tax-brackets/$', 'GET', 200, 0.02, 100)
+        other_worker.observe_sample('^tax-brackets/$', 'GET', 3, 0.01, 0.002)
+        with mock.patch('os.getpid', return_value=1), self.settings(PERF_METRICS_DIR=self.directory):
+            other_worker.flush(self.directory)
+
+        with self.settings(PERF_METRICS_DIR=self.directory):
+            self.client.get('/tax-brackets/')
+            self.client.get('/tax-brackets/')
+            text = self.scrape()
+
+        labels = 'route="^tax-brackets/$",method="GET"'
+        self.assertIn(f'erp_http_request_duration_seconds_count{{{labels},status="2xx"}} 3', text)
+        self.assertIn(f'erp_db_queries_per_request_count{{{labels}}} 3', text)
+        self.assertIn(f'erp_renderer_duration_seconds_count{{{labels}}} 3', text)
+
+    def test_without_a_directory_only_this_process_is_reported(self):
+        self.client.get('/tax-brackets/')
+        self.assertIn('erp_http_request_duration_seconds_count{route="^tax-brackets/$",method="GET",status="2xx"} 1', self.scrape())
@@ -4,7 +4,7 @@ from django.urls import path
 from .view.payroll_view import *
 from rest_framework.authtoken.views import obtain_auth_token
 from rest_framework.routers import DefaultRouter
-from .view import hr_view, payroll_view
+from .view import async_view, audit_view, hr_view, metrics_view, payroll_view
 from .views import JobViewSet, ApplicantViewSet
 
 router = DefaultRouter()
@@ -44,15 +44,37 @@ urlpatterns = [
     # hr module
     path('register/employee/', hr_view.register_employee, name='register_employee'),
     path('all/employees/', hr_view.get_all_employees, name='get_all_users'),
+    path('search/', hr_view.search_people, name='search_people'),
+    path('recruitment/analytics/', hr_view.recruitment_analytics_summary, name='recruitment_analytics'),
+    path('contracts/scan/', hr_view.contract_scan, name='contract_scan'),
     
     # payroll module
+    path('payroll/records/', payroll_view.get_payroll_records, name='payroll_records'),
     path('all/payslips/', payroll_view.payroll_list, name='payslip_list'),
+    path('payroll/payslips/', payroll_view.payslips, name='itemized_payslips'),
     # path('delete/payslip/', payroll_view.delete_employee_slip, name='delete_employee_slip'),
     path('delete/payslip/', payroll_view.DeletePayrollSlipView.as_view(), name='delete_payslip'),
+    path('payroll/status/bulk/', payroll_view.bulk_update_payroll_status, name='bulk_update_payroll_status'),
+    path('payroll/reports/consolidated/', payroll_view.consolidated_payroll_report, name='consolidated_payroll_report'),
+    path('payroll/reports/department-costs/', payroll_view.department_cost_report, name='department_cost_report'),
+    path('payroll/reports/variance/', payroll_view.payroll_variance_report, name='payroll_variance_report'),
+    path('payroll/export/', payroll_view.payroll_export_file, name='payroll_export_file'),
 
     # urls.py
     path('update-employee-salary/<str:employee_id>/', UpdateEmployeeSalaryView.as_view()),
     
+    # monitoring
+    path('metrics/', metrics_view.prometheus_metrics, name='metrics'),
+
+    # async reads for dashboards (full benefit when served over ASGI)
+    path('async/payroll/records/', async_view.payroll_records, name='async_payroll_records'),
+    path('async/employees/', async_view.employees, name='async_employees'),
+    path('async/reference/<str:kind>/', async_view.reference_data, name='async_reference_data'),
+    path('async/jobs/', async_view.public_jobs, name='async_public_jobs'),
+
+    # audit trail
+    path('audit/', audit_view.get_audit_log, name='audit_log'),
+
     # In your_app/urls.py
     path('api/', include(router.urls)),
     # Add your authentication URLs here, e.g., for login/logout
@@ -0,0 +1,108 @@
+"""
+Async versions of the read-heavy dashboard endpoints.
+
+Same data as get_payroll_records, get_all_employees, the reference-data
+viewsets and the public job board, but written against the async ORM. Served
+by an ASGI worker (see gunicorn.conf.py), a request waiting on the database
+no longer holds up the worker, so one process serves many concurrent
+dashboard requests. They are plain Django views, rendered with ORJSONRenderer
+so the bytes match the DRF endpoints. They still work under WSGI, only without
+the concurrency.
+
+Compare both paths with: python manage.py bench_async
+"""
+from datetime import datetime
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from ..models import Employees, Payroll, PayrollArchive
+from ..renderers import ORJSONRenderer
+from ..serializers import employee_serializers, payroll_serializer
+from ..services import job_board, payroll_archive
+from ..views import client_copy_is_current, set_public_cache_headers
+from . import payroll_view
+
+# /async/reference/<kind>/ -> the viewset whose list it mirrors
+REFERENCE_DATA = {
+    'zig-rates': payroll_view.ZiGRateToUSDViewSet,
+    'nssa-caps': payroll_view.NSSACapViewSet,
+    'pension-funds': payroll_view.PensionFundViewSet,
+    'tax-brackets': payroll_view.TaxBracketViewSet,
+    'payroll-periods': payroll_view.PayrollPeriodViewSet,
+    'allowance-types': payroll_view.AllowanceTypeViewSet,
+    'deduction-types': payroll_view.DeductionTypeViewSet,
+}
+
+renderer = ORJSONRenderer()
+
+
+def json_response(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+async def fetch(queryset):
+    """Evaluates a queryset (prefetches included) without blocking the event loop."""
+    return [obj async for obj in queryset]
+
+
+@require_GET
+async def payroll_records(request):
+    """Payroll records filtered by ?period=YYYY-MM, ?status= and ?employee_id=."""
+    period = request.GET.get('period')
+    status_filter = request.GET.get('status')
+    employee_id = request.GET.get('employee_id')
+
+    filters = {}
+    if status_filter:
+        filters['status'] = status_filter
+    if employee_id:
+        filters['employee__employeeid'] = employee_id
+
+    if not period:
+        # Without a period the records can span archived months: read both tables
+        rows = await payroll_archive.arecords(filters)
+        return json_response(payroll_serializer.serialize_records(rows))
+
+    try:
+        parsed_period = datetime.strptime(period, '%Y-%m').date().replace(day=1)
+    except ValueError:
+        return json_response({"error": "Invalid period format. Use YYYY-MM"}, status=400)
+
+    queryset = Payroll.objects.all().select_related('employee')
+    serializer_class = payroll_serializer.PayrollSerializer
+    if await payroll_archive.ais_archived(parsed_period):
+        queryset = PayrollArchive.objects.select_related('employee').order_by('employee__firstname')
+        serializer_class = payroll_serializer.ArchivedPayrollSerializer
+    queryset = queryset.filter(period=parsed_period, **filters)
+
+    return json_response(serializer_class(await fetch(queryset), many=True).data)
+
+
+@require_GET
+async def employees(request):
+    """Employees with ?fields= and ?expand=, as get_all_employees."""
+    serializer_class = employee_serializers.EmployeePayslipSerializer
+    queryset = serializer_class.optimize_queryset(Employees.objects.all(), request)
+    return json_response(serializer_class(await fetch(queryset), many=True, context={'request': request}).data)
+
+
+@require_GET
+async def reference_data(request, kind):
+    """The list of one reference table: zig-rates, tax-brackets, nssa-caps, ..."""
+    viewset = REFERENCE_DATA.get(kind)
+    if viewset is None:
+        return json_response({"error": f"Unknown reference data '{kind}'. Use one of: {', '.join(REFERENCE_DATA)}"}, status=404)
+    rows = await fetch(viewset.queryset.all())
+    return json_response(viewset.serializer_class(rows, many=True, context={'request': request}).data)
+
+
+@require_GET
+async def public_jobs(request):
+    """The public job board (open jobs), with the same validators as anonymous GET /jobs/."""
+    board = await job_board.aget_public_board()
+    if client_copy_is_current(request, board['etag'], board['last_modified']):
+        response = HttpResponse(status=304)
+    else:
+        response = json_response(board['list'])
+    return set_public_cache_headers(response, board['etag'], board['last_modified'])
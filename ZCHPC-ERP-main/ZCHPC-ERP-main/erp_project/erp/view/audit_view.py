@@ -0,0 +1,65 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ..models import AuditLog
+from ..serializers.audit_serializer import AuditLogSerializer
+
+MAX_AUDIT_RESULTS = 1000
+
+
+def _parse_bound(value, end_of_day=False):
+    """Parses an ISO datetime or date; a bare date covers the whole day. None if invalid."""
+    try:
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError: # Well formed but out of range, e.g. 2024-02-30
+        return None
+    if parsed is None:
+        if day is None:
+            return None
+        if end_of_day:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@api_view(['GET'])
+def get_audit_log(request):
+    """
+    Audit entries, newest first. Filters: entity (e.g. payroll, employees),
+    entity_id, from / to (ISO date or datetime) and limit.
+    """
+    params = request.query_params
+    queryset = AuditLog.objects.select_related('actor')
+
+    entity = params.get('entity')
+    entity_id = params.get('entity_id')
+    if entity:
+        queryset = queryset.filter(entity=entity.lower())
+    if entity_id:
+        if not entity:
+            return Response({"error": "entity_id requires entity"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(entity_id=entity_id)
+
+    # Plain range filters so the (entity, entity_id, timestamp) index is usable
+    for param, lookup in (('from', 'timestamp__gte'), ('to', 'timestamp__lt')):
+        if params.get(param):
+            bound = _parse_bound(params[param], end_of_day=(param == 'to'))
+            if bound is None:
+                return Response({"error": f"Invalid {param} value. Use YYYY-MM-DD or an ISO datetime"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**{lookup: bound})
+
+    try:
+        limit = min(int(params.get('limit', 100)), MAX_AUDIT_RESULTS)
+    except ValueError:
+        return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = AuditLogSerializer(queryset[:limit], many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
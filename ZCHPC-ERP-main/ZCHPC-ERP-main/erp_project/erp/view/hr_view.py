@@ -1,8 +1,9 @@
 from ..serializers import employee_serializers
-from rest_framework import status
+from rest_framework import permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
 from ..models import Employees
+from ..services import contracts, recruitment_analytics, search
 
 # employee registration
 @api_view(['POST'])
@@ -33,10 +34,105 @@ def register_employee(request):
         )
 
 @api_view(['GET'])
-def get_all_employees(request): 
-    users = Employees.objects.all()
+def get_all_employees(request):
+    """Employees, allowances and deductions nested; ?fields= and ?expand= narrow it and the query loads only what is rendered."""
+    serializer_class = employee_serializers.EmployeePayslipSerializer
+    users = serializer_class.optimize_queryset(Employees.objects.all(), request)
     # serializer = employee_serializers.EmployeeRegistrationSerializer(users, many=True)
-    serializer = employee_serializers.EmployeePayslipSerializer(users, many=True)
+    serializer = serializer_class(users, many=True, context={'request': request})
 
     
     return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def search_people(request):
+    """
+    Ranked prefix search over employees and applicants.
+    ?q=<text>&type=all|employees|applicants&limit=20
+    """
+    text = request.query_params.get('q', '').strip()
+    kind = request.query_params.get('type', 'all')
+    if not text:
+        return Response({"error": "q parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if kind not in ('all', 'employees', 'applicants'):
+        return Response({"error": "type must be all, employees or applicants"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), search.MAX_RESULTS))
+    except ValueError:
+        return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = {"query": text}
+    if kind in ('all', 'employees'):
+        results["employees"] = [
+            {
+                "id": employee.id,
+                "employeeid": employee.employeeid,
+                "firstname": employee.firstname,
+                "surname": employee.surname,
+                "email": employee.email,
+                "department": employee.department,
+                "position": employee.position,
+                "isActive": employee.isActive,
+                "score": round(score, 4),
+            }
+            for employee, score in search.search_employees(text, limit)
+        ]
+    if kind in ('all', 'applicants'):
+        results["applicants"] = [
+            {
+                "id": applicant.id,
+                "full_name": applicant.full_name,
+                "email": applicant.email,
+                "status": applicant.status,
+                "job": applicant.job.id,
+                "job_title": applicant.job.title,
+                "score": round(score, 4),
+            }
+            for applicant, score in search.search_applicants(text, limit)
+        ]
+    return Response(results, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def recruitment_analytics_summary(request):
+    """
+    Applicant funnel per job and per department, conversion rates, time-to-hire
+    and applications per day over the last ?days=30.
+    """
+    try:
+        days = max(1, min(int(request.query_params.get('days', 30)), 365))
+    except ValueError:
+        return Response({"error": "days must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(recruitment_analytics.recruitment_summary(days), status=status.HTTP_200_OK)
+
+
+class IsAdminUserOrReadOnly(permissions.IsAdminUser):
+    def has_permission(self, request, view):
+        return request.method in permissions.SAFE_METHODS or super().has_permission(request, view)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUserOrReadOnly])
+def contract_scan(request):
+    """
+    GET: contracts (employees and users) ending within ?days=30.
+    POST (staff only): deactivates everything whose contract has ended and
+    revokes the users' tokens (?dry_run=true to preview).
+    """
+    if request.method == 'GET':
+        try:
+            days = max(0, min(int(request.query_params.get('days', 30)), 366))
+        except ValueError:
+            return Response({"error": "days must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"days": days, **contracts.expiring(days)}, status=status.HTTP_200_OK)
+
+    dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    print(f"[contract_scan] Deactivating expired contracts (dry_run={dry_run})")
+    deactivated = contracts.deactivate_expired(dry_run=dry_run)
+    return Response({
+        "dry_run": dry_run,
+        "deactivated": {key: len(rows) for key, rows in deactivated.items()},
+        **deactivated,
+    }, status=status.HTTP_200_OK)
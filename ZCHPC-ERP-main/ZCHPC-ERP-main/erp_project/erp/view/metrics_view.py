@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from ..services import metrics
+
+
+def prometheus_metrics(request):
+    """
+    Request metrics of all workers in Prometheus text format (see
+    services/metrics.py). Served to staff users and to the addresses in
+    PERF_METRICS_ALLOWED_IPS ('*' for anyone).
+    """
+    allowed = getattr(settings, 'PERF_METRICS_ALLOWED_IPS', None) or []
+    user = getattr(request, 'user', None)
+    if not (
+        '*' in allowed
+        or request.META.get('REMOTE_ADDR') in allowed
+        or (user is not None and user.is_staff)
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,17 +1,23 @@
+import os
+import tempfile
+
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.utils.dateparse import parse_date
 
 from ..serializers.employee_serializers import EmployeePayslipSerializer
 
 from ..serializers.tax_tables_serializers import EmployeeDeductablesSerializer, NSSACapSerializer, PensionFundSerializer, TaxBracketSerializer, ZiGRateSerializer
-from ..models import AllowanceType, DeductionType, EmployeeDeductables, Employees, NSSACap, Payroll, PayrollPeriod, PensionFund, TaxBracket, ZiGRateToUSD
+from ..models import AllowanceType, DeductionType, EmployeeDeductables, Employees, NSSACap, Payroll, PayrollArchive, PayrollPeriod, PensionFund, TaxBracket, ZiGRateToUSD
 from ..serializers import payroll_serializer
-from ..services.payroll_processor import PayrollProcessor
+from ..services.payroll_processor import PAYEThresholdError, PayrollProcessor
+from ..services import exchange_rates, payroll_archive, payroll_export, payroll_reports
 from rest_framework import viewsets
+from rest_framework.decorators import action
 
 
 @api_view(['POST'])
@@ -30,6 +36,9 @@ def generate_monthly_payroll(request):
             {"message": f"Successfully created {count} payroll records"},
             status=status.HTTP_201_CREATED
         )
+    except (exchange_rates.MissingExchangeRateError, PAYEThresholdError) as e:
+        print("[generate_monthly_payroll] Reference data needs fixing:", str(e))
+        return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
     except Exception as e:
         print("[generate_monthly_payroll] ERROR:", str(e))
         return Response(
@@ -46,27 +55,37 @@ def get_payroll_records(request):
 
     print("[get_payroll_records] Params:", request.query_params)
 
-    queryset = Payroll.objects.all().select_related('employee')
-
-    if period:
-        try:
-            parsed_period = datetime.strptime(period, '%Y-%m').date().replace(day=1)
-            print("[get_payroll_records] Filtering by period:", parsed_period)
-            queryset = queryset.filter(period=parsed_period)
-        except ValueError:
-            print("[get_payroll_records] Invalid period format:", period)
-            return Response({"error": "Invalid period format. Use YYYY-MM"}, status=400)
-
+    filters = {}
     if status_filter:
         print("[get_payroll_records] Filtering by status:", status_filter)
-        queryset = queryset.filter(status=status_filter)
-
+        filters['status'] = status_filter
     if employee_id:
         print("[get_payroll_records] Filtering by employee_id:", employee_id)
-        queryset = queryset.filter(employee__employeeid=employee_id)
+        filters['employee__employeeid'] = employee_id
+
+    if not period:
+        # Without a period the records can span archived months: read both tables
+        rows = payroll_archive.records(filters)
+        print(f"[get_payroll_records] Query count: {len(rows)}")
+        return Response(payroll_serializer.serialize_records(rows))
+
+    try:
+        parsed_period = datetime.strptime(period, '%Y-%m').date().replace(day=1)
+        print("[get_payroll_records] Filtering by period:", parsed_period)
+    except ValueError:
+        print("[get_payroll_records] Invalid period format:", period)
+        return Response({"error": "Invalid period format. Use YYYY-MM"}, status=400)
+
+    queryset = Payroll.objects.all().select_related('employee')
+    serializer_class = payroll_serializer.PayrollSerializer
+    if payroll_archive.is_archived(parsed_period):
+        print("[get_payroll_records] Reading archived period")
+        queryset = PayrollArchive.objects.select_related('employee').order_by('employee__firstname')
+        serializer_class = payroll_serializer.ArchivedPayrollSerializer
+    queryset = queryset.filter(period=parsed_period, **filters)
 
     print(f"[get_payroll_records] Query count: {queryset.count()}")
-    serializer = payroll_serializer.PayrollSerializer(queryset, many=True)
+    serializer = serializer_class(queryset, many=True)
     return Response(serializer.data)
 
 @api_view(['POST'])
@@ -75,32 +94,70 @@ def update_payroll_status(request, payroll_id):
     print("[update_payroll_status] ID:", payroll_id)
     print("[update_payroll_status] Body:", request.data)
 
-    try:
-        payroll = Payroll.objects.get(id=payroll_id)
-        new_status = request.data.get('status')
-        print("[update_payroll_status] New status:", new_status)
-
-        if new_status not in dict(Payroll.STATUS_CHOICES).keys():
-            print("[update_payroll_status] Invalid status:", new_status)
-            return Response(
-                {"error": "Invalid status"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        payroll.status = new_status
-        payroll.save()
-        print("[update_payroll_status] Updated successfully.")
-
+    new_status = request.data.get('status')
+    if new_status not in dict(Payroll.STATUS_CHOICES).keys():
+        print("[update_payroll_status] Invalid status:", new_status)
         return Response(
-            {"message": "Payroll status updated successfully"},
-            status=status.HTTP_200_OK
+            {"error": "Invalid status"},
+            status=status.HTTP_400_BAD_REQUEST
         )
-    except Payroll.DoesNotExist:
+
+    result = PayrollProcessor.transition_status(Payroll.objects.filter(id=payroll_id), new_status)
+    if not result["matched"]:
         print("[update_payroll_status] Payroll not found.")
         return Response(
             {"error": "Payroll record not found"},
             status=status.HTTP_404_NOT_FOUND
         )
+    if result["rejected"]:
+        current = next(iter(result["rejected"]))
+        return Response(
+            {"error": f"Cannot move payroll from {current} to {new_status}"},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    print("[update_payroll_status] Updated successfully.")
+    return Response(
+        {"message": "Payroll status updated successfully"},
+        status=status.HTTP_200_OK
+    )
+
+@api_view(['POST'])
+def bulk_update_payroll_status(request):
+    """
+    Move many payroll records to a new status in one UPDATE.
+    Body: {"status": "Pending", "period": "YYYY-MM"} and/or {"ids": [1, 2, 3]}
+    """
+    new_status = request.data.get('status')
+    period_str = request.data.get('period')
+    ids = request.data.get('ids')
+
+    if new_status not in dict(Payroll.STATUS_CHOICES).keys():
+        return Response({"error": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
+    if ids is not None and (
+        not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)
+    ):
+        return Response({"error": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if not period_str and not ids:
+        return Response({"error": "Provide a period (YYYY-MM) or a list of ids"}, status=status.HTTP_400_BAD_REQUEST)
+    print("[bulk_update_payroll_status] Status:", new_status, "Period:", period_str, "IDs:", len(ids or []))
+
+    queryset = Payroll.objects.all()
+    if period_str:
+        try:
+            period = datetime.strptime(period_str, '%Y-%m').date().replace(day=1)
+        except ValueError:
+            return Response({"error": "Invalid period format. Use YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(period=period)
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+
+    result = PayrollProcessor.transition_status(queryset, new_status)
+    if ids:
+        result["not_found"] = len(set(ids)) - result["matched"]
+    result["status"] = new_status
+    print("[bulk_update_payroll_status] Result:", result)
+    return Response(result, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 def get_current_rate(request):
@@ -119,9 +176,13 @@ def get_current_rate(request):
 
 @api_view(['GET'])
 def payroll_list(request):
-    """Get payroll records for a specific month, generate if not exists"""
+    """
+    Get payroll records for a specific month, generating any missing ones.
+    Pass ?generate=false for a read-only listing that never generates.
+    """
     period_str = request.query_params.get('period')
-    print("[payroll_list] Received period:", period_str)
+    generate = request.query_params.get('generate', 'true').lower() not in ('0', 'false', 'no')
+    print("[payroll_list] Received period:", period_str, "generate:", generate)
 
     if not period_str:
         print("[payroll_list] Missing period.")
@@ -134,35 +195,33 @@ def payroll_list(request):
         period = datetime.strptime(period_str, '%Y-%m').date().replace(day=1)
         print("[payroll_list] Parsed period:", period)
 
-        payroll_exists = Payroll.objects.filter(period=period).exists()
-        print("[payroll_list] Existing payroll check:", payroll_exists)
-
-        if not payroll_exists:
-            print("[payroll_list] Generating payroll...")
-            PayrollProcessor.create_monthly_payroll(period)
-
-        active_employees = Employees.objects.filter(isActive=True)
-        print("[payroll_list] Active employees count:", active_employees.count())
+        # Archived periods are final and read from the archive, never regenerated
+        archived = payroll_archive.is_archived(period)
 
-        for employee in active_employees:
-            exists = Payroll.objects.filter(employee=employee, period=period).exists()
-            if not exists:
-                print(f"[payroll_list] Creating payroll for {employee.employeeid}")
-                PayrollProcessor.create_employee_payroll(employee, period)
+        # Generation takes the per-period run lock, so concurrent callers wait
+        # for the in-flight run and then find nothing left to create.
+        created = PayrollProcessor.create_monthly_payroll(period) if generate and not archived else 0
 
-        payrolls = Payroll.objects.filter(period=period).select_related('employee')
-        print("[payroll_list] Payrolls fetched:", payrolls.count())
-
-        serializer = payroll_serializer.PayrollSerializer(payrolls, many=True)
+        if archived:
+            payrolls = PayrollArchive.objects.filter(period=period).select_related('employee').order_by('employee__firstname')
+            serializer = payroll_serializer.ArchivedPayrollSerializer(payrolls, many=True)
+        else:
+            payrolls = Payroll.objects.filter(period=period).select_related('employee')
+            serializer = payroll_serializer.PayrollSerializer(payrolls, many=True)
+        data = serializer.data
         print("[payroll_list] Serialization complete")
 
         return Response({
             "period": period_str,
-            "generated": not payroll_exists,
-            "count": payrolls.count(),
-            "data": serializer.data
+            "archived": archived,
+            "generated": created > 0,
+            "count": len(data),
+            "data": data
         })
 
+    except (exchange_rates.MissingExchangeRateError, PAYEThresholdError) as e:
+        print("[payroll_list] Reference data needs fixing:", str(e))
+        return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
     except ValueError as ve:
         print("[payroll_list] ValueError:", str(ve))
         return Response(
@@ -176,6 +235,159 @@ def payroll_list(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+def payslips(request):
+    """
+    Itemized payslips for a period (?period=YYYY-MM, optional ?employee_id=).
+    Two queries however many payslips: the payrolls with their employees, then all their lines.
+    """
+    period_str = request.query_params.get('period')
+    if not period_str:
+        return Response({"error": "Period parameter (YYYY-MM) is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        period = datetime.strptime(period_str, '%Y-%m').date().replace(day=1)
+    except ValueError:
+        return Response({"error": "Invalid period format. Use YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if payroll_archive.is_archived(period):
+        queryset = PayrollArchive.objects.filter(period=period).select_related('employee').order_by('employee__firstname')
+        serializer_class = payroll_serializer.ArchivedPayslipSerializer
+    else:
+        queryset = Payroll.objects.filter(period=period).select_related('employee').prefetch_related('line_items')
+        serializer_class = payroll_serializer.PayslipSerializer
+    employee_id = request.query_params.get('employee_id')
+    if employee_id:
+        queryset = queryset.filter(employee__employeeid=employee_id)
+
+    data = serializer_class(queryset, many=True).data
+    print(f"[payslips] {len(data)} payslips for {period}")
+    return Response({"period": period_str, "count": len(data), "data": data})
+
+def _parse_month(value):
+    return datetime.strptime(value, '%Y-%m').date().replace(day=1)
+
+def _report_params(params):
+    """
+    Parses the common report filters: from, to (YYYY-MM, default the last 12
+    months) and department (repeatable or comma separated).
+    Raises ValueError with a message for the client.
+    """
+    try:
+        end = _parse_month(params['to']) if params.get('to') else PayrollProcessor.normalize_period(None)
+        if params.get('from'):
+            start = _parse_month(params['from'])
+        else:
+            start = end.replace(year=end.year - 1, month=end.month + 1) if end.month < 12 else end.replace(month=1)
+    except ValueError:
+        raise ValueError("Invalid period format. Use YYYY-MM")
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    departments = [d.strip() for value in params.getlist('department') for d in value.split(',') if d.strip()]
+    return start, end, departments or None
+
+@api_view(['GET'])
+def consolidated_payroll_report(request):
+    """
+    USD-equivalent payroll totals per period and department.
+    Params: from, to, department (see _report_params) and rate_date
+    (YYYY-MM-DD; default converts at each period's rate).
+    """
+    params = request.query_params
+    print("[consolidated_payroll_report] Params:", params)
+    try:
+        start, end, departments = _report_params(params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    rate_date = None
+    if params.get('rate_date'):
+        try:
+            rate_date = parse_date(params['rate_date'])
+        except ValueError: # Well formed but impossible, e.g. 2024-02-30
+            rate_date = None
+        if rate_date is None:
+            return Response({"error": "Invalid rate_date. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+    report = payroll_reports.consolidated_report(start, end, departments, rate_date)
+    print(f"[consolidated_payroll_report] {len(report['rows'])} rows, missing rates: {report['missing_rates']}")
+    return Response(report)
+
+@api_view(['GET'])
+def department_cost_report(request):
+    """
+    Headcount, gross, PAYE, employer NSSA, employer pension, net and total cost
+    per department per period in USD and ZiG. Params: from, to, department.
+    """
+    print("[department_cost_report] Params:", request.query_params)
+    try:
+        start, end, departments = _report_params(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    report = payroll_reports.department_costs(start, end, departments)
+    print(f"[department_cost_report] {len(report['periods'])} periods, {report['cached_periods']} from cache")
+    return Response(report)
+
+@api_view(['GET'])
+def payroll_variance_report(request):
+    """
+    Employees whose net pay moved more than ?threshold percent (default 10) between
+    ?period (YYYY-MM, default the current month) and the month before, plus new
+    starters and leavers.
+    """
+    params = request.query_params
+    print("[payroll_variance_report] Params:", params)
+    try:
+        period = _parse_month(params['period']) if params.get('period') else PayrollProcessor.normalize_period(None)
+    except ValueError:
+        return Response({"error": "Invalid period format. Use YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        threshold = float(params.get('threshold', 10))
+    except ValueError:
+        threshold = -1
+    if not 0 <= threshold < float('inf'):
+        return Response({"error": "threshold must be a non-negative number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    report = payroll_reports.payroll_variance(period, threshold)
+    print(f"[payroll_variance_report] {len(report['changed'])} changed, "
+          f"{len(report['new_starters'])} new, {len(report['leavers'])} left")
+    return Response(report)
+
+@api_view(['GET'])
+def payroll_export_file(request):
+    """
+    One period of payroll with employee dimensions as a columnar file:
+    ?period=YYYY-MM&type=parquet|arrow. For bulk history use the export_payroll command.
+    """
+    params = request.query_params
+    print("[payroll_export_file] Params:", params)
+    try:
+        period = _parse_month(params.get('period', ''))
+    except ValueError:
+        return Response({"error": "period is required, format YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = params.get('type', 'parquet') # Not ?format=, which DRF reserves for renderer selection
+    if fmt not in payroll_export.FORMATS:
+        return Response({"error": "type must be parquet or arrow"}, status=status.HTTP_400_BAD_REQUEST)
+    if not payroll_archive.model_for(period).objects.filter(period=period).exists():
+        return Response({"error": f"No payroll for {period:%Y-%m}"}, status=status.HTTP_404_NOT_FOUND)
+
+    fd, path = tempfile.mkstemp(suffix='.' + fmt)
+    os.close(fd)
+    try:
+        rows = payroll_export.write_period(period, path, fmt)
+        with open(path, 'rb') as f:
+            content = f.read() # One compressed period; small enough to send from memory
+    except payroll_export.ExportError as e:
+        return Response({"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    finally:
+        os.remove(path)
+
+    print(f"[payroll_export_file] {rows} rows, {len(content)} bytes")
+    content_type = 'application/vnd.apache.parquet' if fmt == 'parquet' else 'application/vnd.apache.arrow.file'
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="payroll-{period:%Y-%m}.{fmt}"'
+    return response
+
 from rest_framework.views import APIView
 
 class DeletePayrollSlipView(APIView):
@@ -209,6 +421,58 @@ class ZiGRateToUSDViewSet(viewsets.ModelViewSet):
     serializer_class = ZiGRateSerializer
     filterset_fields = ['date'] # Allow filtering by date
 
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_rates(self, request):
+        """
+        Upserts many rates at once. Send a CSV (text/csv body or a 'file' upload,
+        header date,rate) or JSON {"rates": [{"date": ..., "rate": ...}], "fill": true}.
+        ?fill=true forward-fills missing days; ?until=YYYY-MM-DD extends the fill.
+        """
+        params = request.query_params
+        options = {}
+        try:
+            if request.content_type.startswith('text/csv'):
+                # Raw CSV body; DRF has no CSV parser, so request.data is not touched
+                rates = exchange_rates.parse_csv(request.body.decode('utf-8-sig'))
+            elif request.FILES.get('file') is not None:
+                rates = exchange_rates.parse_csv(request.FILES['file'].read().decode('utf-8-sig'))
+                options = request.data
+            elif isinstance(request.data, list):
+                rates = exchange_rates.parse_rows(request.data)
+            else:
+                rates = exchange_rates.parse_rows(request.data.get('rates', []))
+                options = request.data
+        except exchange_rates.RateImportError as e:
+            print("[import_rates] Invalid rows:", e.errors[:5])
+            return Response({"error": "Invalid rate data", "details": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        fill = str(params.get('fill', options.get('fill', False))).lower() in ('1', 'true', 'yes')
+        try:
+            until = parse_date(params['until']) if params.get('until') else None
+        except ValueError: # Well formed but impossible, e.g. 2024-02-30
+            until = None
+        if params.get('until') and until is None:
+            return Response({"error": "Invalid until date. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = exchange_rates.import_rates(rates, fill=fill, until=until)
+        except exchange_rates.RateImportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        print("[import_rates] Result:", {k: v for k, v in result.items() if k != 'missing_days'})
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def gaps(self, request):
+        """Days without a rate between ?from and ?to (YYYY-MM-DD, default the last 30 days)."""
+        try:
+            end = parse_date(request.query_params.get('to', '')) or datetime.now().date()
+            start = parse_date(request.query_params.get('from', '')) or end - timedelta(days=30)
+        except ValueError: # Well formed but impossible, e.g. 2024-02-30
+            return Response({"error": "Invalid date. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"error": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        missing = exchange_rates.missing_days(start, end)
+        return Response({"from": start, "to": end, "count": len(missing), "missing_days": missing})
+
 class NSSACapViewSet(viewsets.ModelViewSet):
     queryset = NSSACap.objects.all()
     serializer_class = NSSACapSerializer
@@ -219,10 +483,17 @@ class PensionFundViewSet(viewsets.ModelViewSet):
     serializer_class = PensionFundSerializer
 
 class EmployeeDeductablesViewSet(viewsets.ModelViewSet):
-    queryset = EmployeeDeductables.objects.all().select_related('employee', 'pension_fund')
+    queryset = EmployeeDeductables.objects.all()
     serializer_class = EmployeeDeductablesSerializer
     filterset_fields = ['employee__employeeid', 'active']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            # Join and load only what ?fields= / ?expand= will render
+            queryset = self.serializer_class.optimize_queryset(queryset, self.request)
+        return queryset
+
 class TaxBracketViewSet(viewsets.ModelViewSet):
     queryset = TaxBracket.objects.all()
     serializer_class = TaxBracketSerializer
@@ -11,6 +11,11 @@ from django.contrib.auth import login, authenticate, logout
 from .forms import SignUpForm, SignInForm
 # from .serializers import JobSerializer, ApplicantSerializer
 from .serializers.job_serializer import *
+from .services import job_board
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.http import Http404
+
+PUBLIC_JOBS_MAX_AGE = 60 # Seconds browsers and proxies may reuse the public job board
 
 
 def signup_view(request):
@@ -125,8 +130,54 @@ class JobViewSet(viewsets.ModelViewSet):
             return Job.objects.filter(status='OP')
         return super().get_queryset()
 
+    # Anonymous reads are served from the cached public board (services/job_board.py)
+    # with validators: no Job query in steady state. The board itself is read from the
+    # cache backend, which is only free of database queries with Redis or Memcached.
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        board = job_board.get_public_board()
+        return public_cached_response(request, board['list'], board['etag'], board['last_modified'])
+
+    def retrieve(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            try:
+                entry = job_board.get_public_board()['jobs'].get(int(kwargs[self.lookup_field]))
+            except (TypeError, ValueError):
+                entry = None
+            if entry is None:
+                # Not on the board: unknown, closed or past its deadline, as in the list
+                raise Http404('No Job matches the given query.')
+            return public_cached_response(request, entry['data'], entry['etag'], entry['last_modified'])
+        return super().retrieve(request, *args, **kwargs)
+
+
+def client_copy_is_current(request, etag, last_modified):
+    """True when the request's If-None-Match / If-Modified-Since validators match."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def set_public_cache_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = f'public, max-age={PUBLIC_JOBS_MAX_AGE}'
+    return response
+
+
+def public_cached_response(request, data, etag, last_modified):
+    """Response with ETag/Last-Modified validators; 304 when the client copy is current."""
+    if client_copy_is_current(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    return set_public_cache_headers(response, etag, last_modified)
+
 class ApplicantViewSet(viewsets.ModelViewSet):
-    queryset = Applicant.objects.all()
+    queryset = Applicant.objects.select_related('job') # job_title is read for every row
     serializer_class = ApplicantSerializer
     # Only authenticated HR users should manage applicants
     permission_classes = [permissions.IsAuthenticated] # You'd add a custom HR permission here later
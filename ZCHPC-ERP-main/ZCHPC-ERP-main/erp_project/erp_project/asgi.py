@@ -2,6 +2,7 @@
 ASGI config for erp_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with gunicorn and uvicorn workers; settings are in ../gunicorn.conf.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -46,17 +46,17 @@ INSTALLED_APPS = [
 INTERNAL_IPS = ["127.0.0.1"]
 
 MIDDLEWARE = [
+    'erp.middleware.PerformanceMiddleware', # Outermost so it times the whole stack
+    'erp.middleware.CompressionMiddleware', # gzip/brotli; inside PerformanceMiddleware so sizes are wire bytes
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'corsheaders.middleware.CorsMiddleware', # Must come before CommonMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'erp.middleware.AuditContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "django_browser_reload.middleware.BrowserReloadMiddleware",
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware',
-     'django.middleware.common.CommonMiddleware',
     'django_browser_reload.middleware.BrowserReloadMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
@@ -103,6 +103,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3', # This defines the path to your database file
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent writers (e.g. two payroll
+            # runs for the same period) queue up instead of failing with
+            # "database is locked" when upgrading a read transaction.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -186,3 +193,62 @@ STATIC_URL = '/static/'
 # ]
 
 AUTH_USER_MODEL = 'erp.CustomUser'
+
+# Per-process cache: fine for runserver. Multi-worker deployments need a shared
+# cache (see settings_production.py and erp/services/shared_cache.py).
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'erp.authentication.CachedTokenAuthentication', # Caches token -> user lookups
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'erp.renderers.ORJSONRenderer', # Same output as JSONRenderer, uses orjson when installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 300 # Seconds
+TOKEN_EXPIRY_SECONDS = None # e.g. 60 * 60 * 24 * 7 to expire tokens after a week
+
+# Payroll refuses to use a ZiG rate older than this many days (None disables the check)
+ZIG_RATE_MAX_AGE_DAYS = 7
+
+# Monthly leave accrual per Employees.employee_type ('default' covers unlisted types).
+# Balances above carry_over_cap expire on the first run of each leave year.
+LEAVE_ACCRUAL_POLICY = {
+    'default': {'monthly_days': 2.5, 'carry_over_cap': 30},
+    'Contract': {'monthly_days': 1.5, 'carry_over_cap': 0},
+    'Intern': {'monthly_days': 1, 'carry_over_cap': 0},
+}
+LEAVE_YEAR_START_MONTH = 1
+
+# Closed payroll periods older than this move to PayrollArchive (manage.py archive_payroll)
+PAYROLL_ARCHIVE_AFTER_MONTHS = 24
+
+# Request metrics (erp.middleware.PerformanceMiddleware, served at /metrics/)
+PERF_SAMPLE_RATE = 1.0 # Share of requests that get SQL/render timing and Server-Timing
+PERF_SLOW_REQUEST_MS = 1000 # Sampled requests slower than this are logged with their top queries
+PERF_SERVER_TIMING = True
+PERF_METRICS_DIR = None # Directory where each worker writes its metrics for /metrics/ to add up; None serves this process's only
+PERF_METRICS_ALLOWED_IPS = [] # Scraper addresses allowed without login, e.g. ['10.0.0.5']; '*' opens /metrics/ to anyone. Staff users are always allowed
+
+# Response compression (erp.middleware.CompressionMiddleware); brotli is used when installed
+COMPRESS_MIN_SIZE = 1024 # Bytes; smaller bodies are not worth compressing
+COMPRESS_BROTLI_QUALITY = 5 # 0-11; mid values suit dynamic responses
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'erp.performance': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
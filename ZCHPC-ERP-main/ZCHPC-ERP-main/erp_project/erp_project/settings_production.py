@@ -0,0 +1,95 @@
+"""
+Production settings for erp_project.
+
+Select with DJANGO_SETTINGS_MODULE=erp_project.settings_production. Starts from
+the development settings and strips them down: no debug apps, one copy of each
+middleware, persistent database connections, cached template loading and a
+JSON-only API and a cache shared by all workers. Deployment values come from
+the environment.
+
+Measure the difference with: python manage.py bench_startup
+"""
+import os
+
+from .settings import * # noqa: F401,F403
+from .settings import DATABASES, INSTALLED_APPS, REST_FRAMEWORK, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY) # noqa: F405
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+# Development helpers are not loaded at all, so they cost nothing at import time
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'django_browser_reload']
+
+MIDDLEWARE = [
+    'erp.middleware.PerformanceMiddleware',
+    'erp.middleware.CompressionMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware', # Admin and sign-in pages
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'erp.middleware.AuditContextMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware', # Required by the admin
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Database: PostgreSQL when DJANGO_DB_NAME is set, otherwise the bundled SQLite file.
+# Connections are kept open between requests instead of reconnecting each time.
+if os.environ.get('DJANGO_DB_NAME'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['DJANGO_DB_NAME'],
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DJANGO_DB_PORT', '5432'),
+        }
+    }
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_CONN_MAX_AGE', 600))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Shared by all workers, so cache invalidation and token revocation reach every
+# one of them. Redis when DJANGO_REDIS_URL is set, otherwise a database table
+# (create it once with: python manage.py createcachetable). The database cache
+# costs a query per read: the token cache and the job board only skip the
+# database with Redis, and check --deploy flags the token cache without it.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'erp_cache',
+        }
+    }
+
+# Templates are compiled once per process
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+    if processor != 'django.template.context_processors.debug'
+]
+
+# JSON only; the browsable API renderer is a development aid
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_RENDERER_CLASSES=['erp.renderers.ORJSONRenderer'])
+
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0.05))
+# Set by gunicorn.conf.py so /metrics/ covers every worker, not just the one that answers
+PERF_METRICS_DIR = os.environ.get('PERF_METRICS_DIR') or None
+# Comma-separated scraper addresses; behind a local reverse proxy every client looks like 127.0.0.1
+PERF_METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('PERF_METRICS_ALLOWED_IPS', '').split(',') if ip]
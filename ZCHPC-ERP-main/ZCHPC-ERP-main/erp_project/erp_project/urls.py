@@ -13,6 +13,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter # Import DefaultRouter
@@ -26,6 +27,9 @@ router = DefaultRouter()
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('erp.urls')), # This assumes your main ERP app has its own urls.py
-    path("__reload__/", include("django_browser_reload.urls")),
     path('api/', include(router.urls)), # This line will now work
-]
\ No newline at end of file
+]
+
+# Development only; the production settings profile leaves the app out
+if 'django_browser_reload' in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__reload__/", include("django_browser_reload.urls")))
\ No newline at end of file